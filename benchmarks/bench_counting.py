@@ -0,0 +1,109 @@
+"""
+bench_counting.py
+
+This module compares the ways the analysis counts the values of a column on a large
+synthetic game_set: a collections.Counter over the column followed by a sort of the
+frequencies in Python (as descriptive_analysis.ipynb used to do) against the vectorized
+frequency tables of counting.py, on the column as read from csv and as a categorical
+column read from Parquet. Every result is checked against the Counter one.
+
+Usage:
+    python benchmarks/bench_counting.py --rows 10000000
+"""
+
+import os  # type: ignore
+import sys  # type: ignore
+import time  # type: ignore
+import argparse  # type: ignore
+from collections import Counter  # type: ignore
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from counting import as_dict, frequency_table  # type: ignore  # noqa: E402
+from benchmarks.synthetic_imdb import GENRES, PROFESSIONS  # type: ignore  # noqa: E402
+
+# (column, filter) pairs counted by the notebook
+COUNTS = [
+    ("first_profession", None),
+    ("second_profession", None),
+    ("adult", None),
+    ("genre_1", {"type": "movie"}),
+    ("genre_1", {"type": "tv series"}),
+]
+
+
+def counting_columns(n_rows, seed=0):
+    """
+    Generates the columns of a game_set counted by the notebook, with the string dtype
+    pd.read_csv gives them.
+    """
+    rng = np.random.default_rng(seed)
+    professions = np.array([p.replace("_", " ") for p in PROFESSIONS], dtype=object)
+    others = np.array(PROFESSIONS + [None], dtype=object)
+    genres = np.array(GENRES, dtype=object)
+    first = professions[rng.integers(0, len(professions), n_rows)]
+    second = others[rng.integers(0, len(others), n_rows)]
+    kind = np.where(rng.random(n_rows) < 0.25, "tv series", "movie")
+    frame = pd.DataFrame(
+        {
+            "first_profession": first,
+            "second_profession": second,
+            "type": kind,
+            "genre_1": genres[rng.integers(0, len(genres), n_rows)],
+        }
+    ).astype("str")
+    frame["adult"] = (rng.random(n_rows) < 0.02).astype(int)
+    return frame
+
+
+def counter_table(frame, column, where=None):
+    """
+    The previous counting: Counter over the column, then the frequencies sorted in Python.
+    """
+    values = frame[column]
+    if where:
+        for key, value in where.items():
+            values = values[frame[key] == value]
+    counts = Counter(values.dropna())
+    categories = list(counts.keys())
+    frequencies = list(counts.values())
+    sorted_indices = sorted(range(len(frequencies)), key=lambda i: frequencies[i], reverse=True)
+    return {categories[i]: frequencies[i] for i in sorted_indices}
+
+
+def timed(func, *args):
+    """
+    Returns the result of a call and the seconds it took.
+    """
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    frame = counting_columns(args.rows, args.seed)
+    categorical = frame.astype({column: "category" for column in frame if column != "adult"})
+
+    print(f"{args.rows} rows")
+    print(f"{'count':<32}{'Counter s':>11}{'str s':>9}{'category s':>12}{'speedup':>9}")
+    for column, where in COUNTS:
+        expected, counter_seconds = timed(counter_table, frame, column, where)
+        table, str_seconds = timed(frequency_table, frame, column, where)
+        table_categorical, categorical_seconds = timed(frequency_table, categorical, column, where)
+        assert as_dict(table) == expected and as_dict(table_categorical) == expected
+        label = column + (f" ({', '.join(map(str, where.values()))})" if where else "")
+        print(
+            f"{label:<32}{counter_seconds:>11.3f}{str_seconds:>9.3f}{categorical_seconds:>12.3f}"
+            f"{counter_seconds / categorical_seconds:>8.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+bench_engine.py
+
+This module drives thousands of simulated games through the headless QuizEngine,
+with no input/output, and reports how many games and questions per second it sustains.
+Each simulated player picks a random choice at every round.
+With --question-cache the engine reuses the rendered questions (see question_cache.py)
+and the hit rate of the cache is reported, with --weighting the rows of the questions are
+drawn by popularity or recency (see sampler.py).
+
+Usage:
+    python benchmarks/bench_engine.py --rows 1000000 --games 20000 --rounds 10
+    python benchmarks/bench_engine.py --rows 1000000 --games 20000 --question-cache 100000
+"""
+
+import os  # type: ignore
+import sys  # type: ignore
+import time  # type: ignore
+import random  # type: ignore
+import argparse  # type: ignore
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataset_io import GAME_COLUMNS, to_columnar  # type: ignore  # noqa: E402
+from engine import QuizEngine  # type: ignore  # noqa: E402
+from pools import DIFFICULTIES  # type: ignore  # noqa: E402
+from question_cache import QuestionCache  # type: ignore  # noqa: E402
+from sampler import WEIGHTINGS  # type: ignore  # noqa: E402
+from benchmarks.synthetic_imdb import game_set  # type: ignore  # noqa: E402
+
+
+def play(engine, dif, n_round):
+    """
+    Plays a whole game answering at random.
+
+    Args:
+        engine: The QuizEngine.
+        dif: The difficulty level.
+        n_round: Number of rounds.
+
+    Returns:
+        The GameSummary of the game.
+    """
+    session = engine.start_game(dif, n_round)
+    for _ in range(n_round):
+        question = engine.next_question(session)
+        engine.submit_answer(session, random.choice(question.choices))
+    return engine.finish(session)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--games", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--question-cache", type=int, help="size of the question cache")
+    parser.add_argument("--question-spill", help="spill file of the question cache")
+    parser.add_argument("--weighting", choices=WEIGHTINGS, default="uniform")
+    args = parser.parse_args()
+
+    question_cache = None
+    if args.question_cache:
+        question_cache = QuestionCache(args.question_cache, args.question_spill)
+    dataset = to_columnar(game_set(args.rows)[GAME_COLUMNS])
+    engine = QuizEngine(dataset, question_cache=question_cache, weighting=args.weighting)
+    start = time.perf_counter()
+    for dif in DIFFICULTIES:
+        engine.distractor_index(dif)  # build pools, row stores and distractor indexes
+    print(f"pools prepared in {time.perf_counter() - start:.2f} s")
+
+    print(f"{'difficulty':<12}{'games/s':>12}{'questions/s':>14}")
+    for dif in DIFFICULTIES:
+        start = time.perf_counter()
+        for _ in range(args.games):
+            play(engine, dif, args.rounds)
+        elapsed = time.perf_counter() - start
+        games_per_second = args.games / elapsed
+        print(f"{dif:<12}{games_per_second:>12.0f}{games_per_second * args.rounds:>14.0f}")
+    if question_cache is not None:
+        print(f"question cache: {question_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+bench_incremental.py
+
+This module compares a full build of the merge_set, the game_set and the regions with an
+incremental build (see incremental.py) after a small fraction of a synthetic IMDb dump has
+changed. Every delta changes, removes and adds the same number of people, titles and releases,
+and the incremental datasets are checked against the ones of a full build. The last row
+('0.0%') builds the same dump again, with nothing to process.
+
+Usage:
+    python benchmarks/bench_incremental.py --names 1000000 --titles 500000 --deltas 0.001 0.01 0.1
+"""
+
+import os  # type: ignore
+import sys  # type: ignore
+import time  # type: ignore
+import argparse  # type: ignore
+import tempfile  # type: ignore
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dataset_merge  # type: ignore  # noqa: E402
+from schema import apply_schema  # type: ignore  # noqa: E402
+from incremental import incremental_build  # type: ignore  # noqa: E402
+from benchmarks.synthetic_imdb import (  # type: ignore  # noqa: E402
+    name_basics,
+    title_akas,
+    title_basics,
+)
+
+
+def full_build(data_dir):
+    """
+    Builds the merge_set, the game_set and the regions from scratch, as dataset_merge.py does.
+    """
+    roles_df = dataset_merge.load_roles(os.path.join(data_dir, "name.basics.tsv"))
+    movie_df = dataset_merge.load_movies(os.path.join(data_dir, "title.basics.tsv"))
+    region_df = dataset_merge.load_regions(
+        os.path.join(data_dir, "title.akas.tsv"), movie_df["movie_id"]
+    )
+    merge_set = dataset_merge.build_merge_set(roles_df, movie_df)
+    return merge_set, apply_schema(dataset_merge.build_game_set(merge_set)), region_df
+
+
+def apply_delta(frame, column, fraction, rng):
+    """
+    Changes the 'column' of a fraction of the rows, removes as many rows and adds as many
+    new rows at the end (copies of random rows with a new key).
+
+    Args:
+        frame: A frame returned by title_basics or name_basics.
+        column: The column to change.
+        fraction: Fraction of the rows changed, removed and added.
+        rng: A numpy random Generator.
+
+    Returns:
+        The new frame.
+    """
+    n = max(int(len(frame) * fraction), 1)
+    key = frame.columns[0]
+    changed = rng.choice(len(frame), size=n, replace=False)
+    frame.iloc[changed, frame.columns.get_loc(column)] = "Changed " + frame[column].iloc[changed]
+    frame = frame.drop(frame.index[rng.choice(len(frame), size=n, replace=False)])
+    added = frame.iloc[rng.choice(len(frame), size=n, replace=False)].copy()
+    added[key] = added[key].str[:2] + "x" + added[key].str[2:] + f"{rng.integers(10**6)}"
+    return pd.concat([frame, added], ignore_index=True)
+
+
+def write_dump(names, titles, akas, data_dir):
+    """
+    Writes the three TSV files of a synthetic dump.
+    """
+    names.to_csv(os.path.join(data_dir, "name.basics.tsv"), sep="\t", index=False)
+    titles.to_csv(os.path.join(data_dir, "title.basics.tsv"), sep="\t", index=False)
+    akas.to_csv(os.path.join(data_dir, "title.akas.tsv"), sep="\t", index=False)
+
+
+def identical(result, expected):
+    """
+    Returns whether the datasets of an incremental build are the ones of a full build.
+    """
+    merge_set, game_set, region_df = expected
+    return (
+        result.merge_set.equals(merge_set)
+        and result.game_set.equals(game_set)
+        and result.game_set.dtypes.equals(game_set.dtypes)
+        and result.region_df.equals(region_df.reset_index(drop=True))
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--names", type=int, default=1_000_000)
+    parser.add_argument("--titles", type=int, default=500_000)
+    parser.add_argument("--deltas", type=float, nargs="+", default=[0.001, 0.01, 0.1])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    names = name_basics(args.names, args.titles)
+    titles = title_basics(args.titles)
+    akas = title_akas(args.titles)
+    with tempfile.TemporaryDirectory() as data_dir:
+        state_dir = os.path.join(data_dir, "state")
+        write_dump(names, titles, akas, data_dir)
+        start = time.perf_counter()
+        incremental_build(data_dir, state_dir)
+        print(f"first incremental build (no state): {time.perf_counter() - start:.2f} s")
+
+        rows = []
+        for fraction in args.deltas + [0.0]:
+            if fraction:
+                names = apply_delta(names, "primaryName", fraction, rng)
+                titles = apply_delta(titles, "primaryTitle", fraction, rng)
+                akas = apply_delta(akas, "region", fraction, rng)
+                write_dump(names, titles, akas, data_dir)
+
+            start = time.perf_counter()
+            expected = full_build(data_dir)
+            full_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            result = incremental_build(data_dir, state_dir)
+            incremental_seconds = time.perf_counter() - start
+            rows.append((fraction, full_seconds, incremental_seconds, identical(result, expected)))
+
+        print(f"{'delta':>8}{'full s':>10}{'incremental s':>16}{'identical':>11}")
+        for fraction, full_seconds, incremental_seconds, same in rows:
+            print(f"{fraction:>8.1%}{full_seconds:>10.2f}{incremental_seconds:>16.2f}{same!s:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+bench_load.py
+
+This module compares the ways the game can load the game_set: parsing the whole csv file
+(as game.py used to do) against reading only the columns used by the game from the
+Parquet file written by dataset_merge.py.
+Each load runs in a forked process: wall time and peak resident memory are reported.
+
+Usage:
+    python benchmarks/bench_load.py --rows 1000000
+"""
+
+import os  # type: ignore
+import sys  # type: ignore
+import argparse  # type: ignore
+import tempfile  # type: ignore
+import pandas as pd  # type: ignore
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataset_io import GAME_COLUMNS, load_dataset, save_dataset  # type: ignore  # noqa: E402
+from benchmarks.measure import measure  # type: ignore  # noqa: E402
+from benchmarks.synthetic_imdb import game_set  # type: ignore  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        save_dataset(game_set(args.rows, args.seed), "game_set", data_dir)
+        loaders = {
+            "csv, all columns": lambda: pd.read_csv(os.path.join(data_dir, "game_set.csv")),
+            "parquet, game columns": lambda: load_dataset(
+                "game_set", columns=GAME_COLUMNS, data_dir=data_dir
+            ),
+        }
+        print(f"{'loader':<24}{'time (s)':>10}{'peak (MB)':>12}")
+        for label, loader in loaders.items():
+            _, elapsed, peak = measure(loader)
+            print(f"{label:<24}{elapsed:>10.2f}{peak:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
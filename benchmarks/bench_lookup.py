@@ -0,0 +1,93 @@
+"""
+bench_lookup.py
+
+This module compares the lookups of names and titles in the game_set with pandas boolean
+masks (as the notebook did, e.g. game_set.loc[game_set['name_surname'] == 'Steve Carell'])
+against the lookup index of lookup_index.py, for exact values and for prefixes (the key
+without its last character, as typed in a type-ahead answer). Both select the rows of the
+game_set; the time of the index lookup alone (the row positions) is reported too.
+It also reports the time to build, save and load the index.
+
+Usage:
+    python benchmarks/bench_lookup.py --rows 1000000 --lookups 200
+"""
+
+import os  # type: ignore
+import sys  # type: ignore
+import time  # type: ignore
+import random  # type: ignore
+import argparse  # type: ignore
+import tempfile  # type: ignore
+import numpy as np  # type: ignore
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schema import apply_schema  # type: ignore  # noqa: E402
+from lookup_index import LOOKUP_COLUMNS, LookupIndex  # type: ignore  # noqa: E402
+from benchmarks.synthetic_imdb import game_set  # type: ignore  # noqa: E402
+
+
+def per_lookup(func, keys):
+    """
+    Returns the mean milliseconds of a lookup function over some keys.
+    """
+    start = time.perf_counter()
+    for key in keys:
+        func(key)
+    return (time.perf_counter() - start) / len(keys) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    dataset = apply_schema(game_set(args.rows, args.seed))
+    as_text = dataset.astype({column: "str" for column in LOOKUP_COLUMNS})
+    print(
+        f"{'lookup':<32}{'pandas mask (ms)':>18}{'index (ms)':>12}{'speedup':>10}"
+        f"{'positions (ms)':>16}"
+    )
+    with tempfile.TemporaryDirectory() as data_dir:
+        for column in LOOKUP_COLUMNS:
+            start = time.perf_counter()
+            LookupIndex.from_column(dataset[column]).save(data_dir, column)
+            built = time.perf_counter() - start
+            start = time.perf_counter()
+            index = LookupIndex.load(data_dir, column)
+            loaded = time.perf_counter() - start
+            print(f"{column}: index built and saved in {built:.2f} s, loaded in {loaded:.4f} s")
+
+            values = dataset[column].dropna().to_numpy()
+            keys = [str(values[random.randrange(len(values))]) for _ in range(args.lookups)]
+            prefixes = [key[:-1] for key in keys]
+            for label, frame in [("categorical", dataset), ("str", as_text)]:
+                series = frame[column]
+                exact_mask = per_lookup(lambda key: frame.loc[series == key], keys)
+                prefix_mask = per_lookup(
+                    lambda key: frame.loc[series.str.lower().str.startswith(key.lower())],
+                    prefixes,
+                )
+                exact_index = per_lookup(lambda key: frame.iloc[index.exact(key)], keys)
+                prefix_index = per_lookup(lambda key: frame.iloc[index.prefix(key)], prefixes)
+                timings = [
+                    ("exact", exact_mask, exact_index, per_lookup(index.exact, keys)),
+                    ("prefix", prefix_mask, prefix_index, per_lookup(index.prefix, prefixes)),
+                ]
+                for kind, mask, found, positions in timings:
+                    name = f"{column} {kind} ({label})"
+                    print(
+                        f"{name:<32}{mask:>18.3f}{found:>12.3f}{mask / found:>9.0f}x"
+                        f"{positions:>16.4f}"
+                    )
+            # the index finds the same rows as the masks
+            for key in keys[:20]:
+                expected = np.flatnonzero((dataset[column] == key).to_numpy())
+                assert (index.exact(key) == expected).all()
+
+
+if __name__ == "__main__":
+    main()
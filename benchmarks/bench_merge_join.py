@@ -0,0 +1,77 @@
+"""
+bench_merge_join.py
+
+This module compares the join stage of dataset_merge.py against the previous approach
+(four separate joins on 'movie_1', ..., 'movie_4', concatenation and a full-row
+drop_duplicates) on a synthetic IMDb-shaped dataset.
+Each approach runs in a forked process: wall time and the peak resident memory
+reached on top of the inputs are reported for both.
+
+Usage:
+    python benchmarks/bench_merge_join.py --names 1000000 --titles 500000
+"""
+
+import os  # type: ignore
+import sys  # type: ignore
+import argparse  # type: ignore
+import pandas as pd  # type: ignore
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dataset_merge  # type: ignore  # noqa: E402
+from benchmarks.measure import measure  # type: ignore  # noqa: E402
+from benchmarks.synthetic_imdb import name_basics, parsed, title_basics  # type: ignore  # noqa: E402
+
+
+def four_way_join(roles_df, movie_df):
+    """
+    The previous join stage: one inner join per 'movie_*' column.
+
+    Args:
+        roles_df: The roles DataFrame.
+        movie_df: The movies DataFrame.
+
+    Returns:
+        The merge_set DataFrame.
+    """
+    merge_sets = [
+        pd.merge(roles_df, movie_df, left_on=movie, right_on="movie_id").drop(
+            ["movie_1", "movie_2", "movie_3", "movie_4", "name_id"], axis=1
+        )
+        for movie in ["movie_1", "movie_2", "movie_3", "movie_4"]
+    ]
+    merge_set = pd.concat(merge_sets)
+    merge_set.drop_duplicates(inplace=True)
+    merge_set["first_profession"] = merge_set["first_profession"].str.replace("_", " ")
+    merge_set["start_year"] = (
+        pd.to_numeric(merge_set["start_year"], errors="coerce").fillna(0).astype(int)
+    )
+    merge_set.drop_duplicates(inplace=True)
+    return merge_set
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--names", type=int, default=200_000)
+    parser.add_argument("--titles", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    roles_df = dataset_merge.clean_roles(
+        parsed(name_basics(args.names, args.titles, args.seed), dataset_merge.ROLES_COLUMNS)
+    )
+    movie_df = dataset_merge.clean_movies(
+        parsed(title_basics(args.titles, args.seed), dataset_merge.MOVIES_COLUMNS)
+    )
+    print(f"roles_df: {len(roles_df)} rows, movie_df: {len(movie_df)} rows")
+
+    _, old_time, old_peak = measure(four_way_join, roles_df, movie_df)
+    n_rows, new_time, new_peak = measure(dataset_merge.build_merge_set, roles_df, movie_df)
+    print(f"merge_set: {n_rows} rows")
+    print(f"{'approach':<22}{'time (s)':>10}{'peak (MB)':>12}")
+    print(f"{'four joins + dedup':<22}{old_time:>10.2f}{old_peak:>12.1f}")
+    print(f"{'melt + single join':<22}{new_time:>10.2f}{new_peak:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+bench_parallel.py
+
+This module runs the whole dataset_merge.py build on a synthetic IMDb dump with
+1, 2, 4, ... worker processes and reports the wall-clock time of every stage,
+to show how the parallel mode scales with the number of cores.
+
+Usage:
+    python benchmarks/bench_parallel.py --names 1000000 --titles 500000 --workers 1 2 4 8
+"""
+
+import os  # type: ignore
+import sys  # type: ignore
+import argparse  # type: ignore
+import tempfile  # type: ignore
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataset_merge import build  # type: ignore  # noqa: E402
+from benchmarks.synthetic_imdb import write_imdb  # type: ignore  # noqa: E402
+
+
+def default_workers():
+    """
+    Returns 1, 2, 4, ... up to the number of cores of the machine.
+    """
+    workers = [1]
+    while workers[-1] * 2 <= (os.cpu_count() or 1):
+        workers.append(workers[-1] * 2)
+    return workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--names", type=int, default=1_000_000)
+    parser.add_argument("--titles", type=int, default=500_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        write_imdb(data_dir, args.names, args.titles)
+        timings = {}
+        for workers in args.workers:
+            output_dir = os.path.join(data_dir, f"workers_{workers}")
+            os.makedirs(output_dir)
+            timings[workers] = build(data_dir, output_dir, workers=workers).times
+
+    stages = list(timings[args.workers[0]])
+    print(f"{'stage':<12}" + "".join(f"{f'{w} workers':>12}" for w in args.workers))
+    for stage in stages:
+        print(f"{stage:<12}" + "".join(f"{timings[w][stage]:>12.2f}" for w in args.workers))
+    totals = {w: sum(timings[w].values()) for w in args.workers}
+    print(f"{'total':<12}" + "".join(f"{totals[w]:>12.2f}" for w in args.workers))
+    base = totals[args.workers[0]]
+    print(f"{'speedup':<12}" + "".join(f"{base / totals[w]:>11.2f}x" for w in args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+bench_questions.py
+
+This module measures how many questions per second QuizGame generates on a large synthetic
+game_set, comparing the current row store against the previous approach (reset_index on
+the whole dataset, random.choice over the index and one .iloc lookup per column).
+
+Usage:
+    python benchmarks/bench_questions.py --rows 1000000
+"""
+
+import os  # type: ignore
+import sys  # type: ignore
+import time  # type: ignore
+import random  # type: ignore
+import argparse  # type: ignore
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataset_io import GAME_COLUMNS, to_columnar  # type: ignore  # noqa: E402
+from quiz import QuizGame  # type: ignore  # noqa: E402
+from benchmarks.synthetic_imdb import game_set  # type: ignore  # noqa: E402
+
+
+def legacy_question(dataset):
+    """
+    The previous implementation of QuizGame.first_question.
+
+    Args:
+        dataset: The pandas DataFrame the question is generated from.
+
+    Returns:
+        The dataset after reset_index, the question string and the correct answer.
+    """
+    dataset = dataset.reset_index(drop=True)
+    indices = random.choice(dataset.index)
+    title = dataset["title"].iloc[indices]
+    name_surname = dataset["name_surname"].iloc[indices]
+    role = dataset["first_profession"].iloc[indices]
+    movie_type = dataset["type"].iloc[indices]
+    correct_answer = dataset["start_year"].iloc[indices]
+    question = f"In which year was the {movie_type} '{title}' of {name_surname} as a {role} component produced ?"
+    return dataset, question, correct_answer
+
+
+def questions_per_second(generate, seconds):
+    """
+    Calls a question generator repeatedly for a given time.
+
+    Args:
+        generate: Function generating one question.
+        seconds: Duration of the measurement.
+
+    Returns:
+        The number of questions generated per second.
+    """
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        generate()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    dataset = to_columnar(game_set(args.rows)[GAME_COLUMNS])
+    game = QuizGame(dataset)
+    start = time.perf_counter()
+    game.engine.distractor_index(None)
+    print(f"row store and distractor index built in {time.perf_counter() - start:.2f} s")
+
+    generators = {
+        "legacy (reset_index + iloc)": lambda: legacy_question(dataset),
+        "first_question": game.first_question,
+        "second_question": game.second_question,
+        "third_question": game.third_question,
+        "fourth_question": game.fourth_question,
+    }
+    print(f"{'generator':<30}{'questions/s':>14}")
+    for label, generate in generators.items():
+        print(f"{label:<30}{questions_per_second(generate, args.seconds):>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
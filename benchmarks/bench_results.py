@@ -0,0 +1,126 @@
+"""
+bench_results.py
+
+This module measures the results store of results_store.py: the latency a recorded answer
+adds to a round (queued for the writer thread, against an INSERT committed in the round), the
+number of rows per second the writer inserts, and the time of the leaderboard queries (best
+games of a difficulty, last games of a player) once the database holds many games.
+
+Usage:
+    python benchmarks/bench_results.py --games 1000000 --rounds 10
+"""
+
+import os  # type: ignore
+import sys  # type: ignore
+import time  # type: ignore
+import random  # type: ignore
+import argparse  # type: ignore
+import tempfile  # type: ignore
+import numpy as np  # type: ignore
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import GameSummary, medal  # type: ignore  # noqa: E402
+from pools import DIFFICULTIES  # type: ignore  # noqa: E402
+from distractors import ANSWER_KINDS  # type: ignore  # noqa: E402
+from results_store import INSERT_ANSWER, ResultsStore, connect  # type: ignore  # noqa: E402
+
+
+def latencies(func, n):
+    """
+    Returns the p50 and p99 microseconds of n calls of func(i).
+    """
+    times = np.empty(n)
+    for i in range(n):
+        start = time.perf_counter()
+        func(i)
+        times[i] = time.perf_counter() - start
+    return np.percentile(times, 50) * 1e6, np.percentile(times, 99) * 1e6
+
+
+def record_games(store, n_games, n_round, players):
+    """
+    Records random games, with their answers, in a results store.
+    """
+    for _ in range(n_games):
+        game_id = store.new_game_id()
+        score = 0
+        for round_number in range(1, n_round + 1):
+            correct = random.random() < 0.6
+            score = score + 1 if correct else max(score - 0.5, 0)
+            kind = ANSWER_KINDS[round_number % len(ANSWER_KINDS)]
+            store.record_answer(game_id, round_number, kind, correct, "1994", "1995", score)
+        time_involved = random.uniform(20, 200)
+        summary = GameSummary(
+            score,
+            n_round,
+            random.choice(DIFFICULTIES),
+            time_involved,
+            medal(score, n_round, time_involved),
+        )
+        store.record_game(game_id, random.choice(players), summary)
+
+
+def per_query(func, n=200):
+    """
+    Returns the mean milliseconds of n calls of func().
+    """
+    start = time.perf_counter()
+    for _ in range(n):
+        func()
+    return (time.perf_counter() - start) / n * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--games", type=int, default=200_000)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--players", type=int, default=10_000)
+    parser.add_argument("--calls", type=int, default=5_000, help="answers timed one by one")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    players = [f"player{i}" for i in range(args.players)]
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "results.db")
+        # latency added to a round by recording its answer
+        connection = connect(path)
+
+        def committed(i):
+            with connection:
+                connection.execute(INSERT_ANSWER, (0, i, "title", 1, "a", "a", 1.0))
+
+        p50, p99 = latencies(committed, args.calls)
+        connection.close()
+        print(f"{'answer recorded':<28}{'p50 (us)':>10}{'p99 (us)':>10}")
+        print(f"{'INSERT committed':<28}{p50:>10.1f}{p99:>10.1f}")
+        store = ResultsStore(path)
+        p50, p99 = latencies(
+            lambda i: store.record_answer(1, i, "title", 1, "a", "a", 1.0), args.calls
+        )
+        print(f"{'queued (ResultsStore)':<28}{p50:>10.1f}{p99:>10.1f}")
+
+        # write throughput
+        start = time.perf_counter()
+        record_games(store, args.games, args.rounds, players)
+        queued = time.perf_counter() - start
+        store.flush()
+        written = time.perf_counter() - start
+        n_rows = args.games * (args.rounds + 1)
+        print(
+            f"{args.games} games ({n_rows} rows) queued in {queued:.1f} s, "
+            f"written in {written:.1f} s ({n_rows / written:.0f} rows/s)"
+        )
+
+        # leaderboard queries
+        size = os.path.getsize(path) / 2**20
+        print(f"database: {size:.0f} MB")
+        top = per_query(lambda: store.top(random.choice(DIFFICULTIES), 10))
+        history = per_query(lambda: store.history(random.choice(players), 10))
+        print(f"top 10 of a difficulty: {top:.3f} ms, last 10 games of a player: {history:.3f} ms")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+bench_sampler.py
+
+This module checks and measures the row sampler of sampler.py: the time to build the alias
+table of integer weights and of popularity weights (the number of rows of the title of every
+row), the largest error of the distribution the table implies, and whether a game asking about
+every title of a small pool ever repeats one. Every alias table must be built within --timeout
+seconds: rounding leftovers once made the construction loop forever on such weights.
+
+Usage:
+    python benchmarks/bench_sampler.py --rows 1000000 --seeds 20 --timeout 60
+"""
+
+import os  # type: ignore
+import sys  # type: ignore
+import time  # type: ignore
+import signal  # type: ignore
+import random  # type: ignore
+import argparse  # type: ignore
+import numpy as np  # type: ignore
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sampler import MAX_REDRAWS, alias_table  # type: ignore  # noqa: E402
+
+
+class KeyStore:
+    """
+    The part of a RowStore a RowSampler reads: the number of rows and the title codes.
+    """
+
+    def __init__(self, keys):
+        self.size = len(keys)
+        self.codes = {"title": keys}
+        self.values = {}
+
+
+def weights_of(kind, n, rng):
+    """
+    Returns random weights of n rows: 'integer' (1 to 49) or 'popularity' (rows per title).
+    """
+    if kind == "integer":
+        return rng.integers(1, 50, n)
+    keys = rng.integers(0, max(n // 3, 1), n)
+    return np.bincount(keys)[keys].astype(np.float64)
+
+
+def implied_error(weights, prob, alias):
+    """
+    Returns the largest error of the probabilities implied by an alias table, relative to the
+    probability of a row drawn uniformly.
+    """
+    n = len(weights)
+    implied = (prob + np.bincount(alias, weights=1 - prob, minlength=n)) / n
+    return np.abs(implied - weights / np.sum(weights)).max() * n
+
+
+def timed_out(signum, frame):
+    raise TimeoutError("an alias table was not built in time")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seeds", type=int, default=20)
+    parser.add_argument("--timeout", type=int, default=60, help="seconds for every table")
+    parser.add_argument("--titles", type=int, default=200, help="titles of the small pool")
+    args = parser.parse_args()
+
+    from sampler import RowSampler  # type: ignore
+
+    signal.signal(signal.SIGALRM, timed_out)
+    print(f"{'weights':<12}{'rows':>10}{'build ms (max)':>16}{'max error':>12}")
+    for kind in ["integer", "popularity"]:
+        for n in [1_000, 100_000, args.rows]:
+            seconds = []
+            error = 0.0
+            for seed in range(args.seeds):
+                weights = weights_of(kind, n, np.random.default_rng(seed))
+                signal.alarm(args.timeout)
+                start = time.perf_counter()
+                prob, alias = alias_table(weights)
+                seconds.append(time.perf_counter() - start)
+                signal.alarm(0)
+                error = max(error, implied_error(weights, prob, alias))
+            print(f"{kind:<12}{n:>10}{max(seconds) * 1e3:>16.1f}{error:>12.1e}")
+
+    # a game asking about every title of a small pool, most rows on a few titles
+    rng = np.random.default_rng(0)
+    keys = np.repeat(np.arange(args.titles), rng.zipf(1.5, args.titles).clip(max=10_000))
+    sampler = RowSampler(KeyStore(keys.astype(np.int64)), "uniform")
+    random.seed(0)
+    seen = set()
+    drawn = [int(keys[sampler.draw(seen)]) for _ in range(sampler.n_titles)]
+    repeated = len(drawn) - len(set(drawn))
+    print(
+        f"game of {sampler.n_titles} rounds on {len(keys)} rows of {args.titles} titles "
+        f"(redraws before the uniform fallback: {MAX_REDRAWS}): {repeated} titles repeated"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+bench_shared.py
+
+This module compares the memory used by N quiz worker processes when every worker loads
+its own copy of the pools (Parquet files) and when the workers attach to the shared
+memory-mapped snapshot written by shared_dataset.py.
+Each worker prepares every difficulty level, plays some games and reports its resident
+memory (RSS) and its proportional share of the pages shared with the other workers (PSS).
+
+Usage:
+    python benchmarks/bench_shared.py --rows 1000000 --workers 8
+"""
+
+import os  # type: ignore
+import sys  # type: ignore
+import time  # type: ignore
+import argparse  # type: ignore
+import tempfile  # type: ignore
+import multiprocessing  # type: ignore
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataset_io import GAME_COLUMNS, to_columnar  # type: ignore  # noqa: E402
+from engine import QuizEngine  # type: ignore  # noqa: E402
+from pools import DIFFICULTIES, build_pools, load_pool  # type: ignore  # noqa: E402
+from shared_dataset import attach_engine, publish  # type: ignore  # noqa: E402
+from benchmarks.synthetic_imdb import game_set  # type: ignore  # noqa: E402
+from benchmarks.bench_engine import play  # type: ignore  # noqa: E402
+
+
+def memory_usage():
+    """
+    Returns the RSS and PSS of the current process in MB (Linux only).
+    """
+    usage = {}
+    with open("/proc/self/smaps_rollup") as smaps:
+        for line in smaps:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                usage[key] = int(value.split()[0]) / 1024  # kB
+    return usage["Rss"], usage["Pss"]
+
+
+def worker(mode, path, n_games, ready, done, results):
+    """
+    Body of a worker process: prepares the pools, plays games and reports its memory
+    once every worker is running, so that the shared pages are counted once in total.
+    """
+    start = time.perf_counter()
+    engine = attach_engine(path) if mode == "shared" else QuizEngine(data_dir=path)
+    for dif in DIFFICULTIES:
+        engine.distractor_index(dif)
+        for _ in range(n_games):
+            play(engine, dif, 10)
+    elapsed = time.perf_counter() - start
+    ready.wait()
+    results.put((elapsed, *memory_usage()))
+    done.wait()
+
+
+def run(mode, path, n_workers, n_games):
+    """
+    Starts the workers of a mode and returns their mean time and their total RSS and PSS.
+    """
+    context = multiprocessing.get_context("spawn")  # every worker starts from a fresh interpreter
+    ready = context.Barrier(n_workers + 1)
+    done = context.Barrier(n_workers + 1)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(mode, path, n_games, ready, done, results))
+        for _ in range(n_workers)
+    ]
+    for process in processes:
+        process.start()
+    ready.wait()
+    measures = [results.get() for _ in processes]
+    done.wait()
+    for process in processes:
+        process.join()
+    return (
+        sum(m[0] for m in measures) / n_workers,
+        sum(m[1] for m in measures),
+        sum(m[2] for m in measures),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--games", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        build_pools(to_columnar(game_set(args.rows)[GAME_COLUMNS]), data_dir)
+        snapshot = os.path.join(data_dir, "snapshot")
+        publish({dif: load_pool(dif, data_dir) for dif in DIFFICULTIES}, snapshot)
+
+        print(f"{args.workers} workers, {args.games} games per difficulty each")
+        print(f"{'mode':<10}{'seconds':>10}{'RSS MB':>10}{'PSS MB':>10}")
+        for mode, path in [("private", data_dir), ("shared", snapshot)]:
+            elapsed, rss, pss = run(mode, path, args.workers, args.games)
+            print(f"{mode:<10}{elapsed:>10.2f}{rss:>10.0f}{pss:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+bench_startup.py
+
+This module measures how fast game.py starts, as a player sees it: the time from launching the
+game to its first prompt (the difficulty level), the time from the choice of the level to the
+next prompt (the number of rounds) and the time from the number of rounds to the first
+question. The player answers every prompt after '--think' seconds, the time a person takes to
+read and type (with --think 0 the fast start cannot hide the import of the engine). Both the
+default start (the pool is loaded from its Parquet file once the level is chosen) and the fast
+start from the snapshot of the pools (python game.py --snapshot, see fast_start.py) are
+measured, on a synthetic game_set whose pools and snapshot are written to a temporary folder.
+
+Usage:
+    python benchmarks/bench_startup.py --rows 1000000 --runs 5 --think 1.0
+"""
+
+import os  # type: ignore
+import sys  # type: ignore
+import time  # type: ignore
+import select  # type: ignore
+import argparse  # type: ignore
+import tempfile  # type: ignore
+import subprocess  # type: ignore
+import numpy as np  # type: ignore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pools import build_pools  # type: ignore  # noqa: E402
+from shared_dataset import publish  # type: ignore  # noqa: E402
+from fast_start import SNAPSHOT_DIR  # type: ignore  # noqa: E402
+from benchmarks.synthetic_imdb import game_set  # type: ignore  # noqa: E402
+
+TARGET_MS = 200
+MODES = {"parquet": [], "snapshot": ["--snapshot"]}
+
+
+def wait_for(process, marker, output):
+    """
+    Reads the output of the game until it contains a marker.
+
+    Args:
+        process: The Popen of the game.
+        marker: The text to wait for.
+        output: The bytearray of the output read so far, extended in place.
+
+    Returns:
+        The time at which the marker was read.
+    """
+    while marker.encode() not in output:
+        ready, _, _ = select.select([process.stdout], [], [], 60)
+        chunk = os.read(process.stdout.fileno(), 65536) if ready else b""
+        if not chunk:
+            raise RuntimeError(f"the game stopped before '{marker}': {output.decode()[-500:]}")
+        output += chunk
+    del output[:]
+    return time.perf_counter()
+
+
+def start_game(data_dir, options, think, difficulty):
+    """
+    Launches game.py, answers its prompts like a player and stops it at the first question.
+
+    Args:
+        data_dir: Folder with the pools and the snapshot.
+        options: Options of game.py.
+        think: Seconds the player waits before answering a prompt.
+        difficulty: The level chosen.
+
+    Returns:
+        The milliseconds to the first prompt, to the rounds prompt after the level is chosen and
+        to the first question after the rounds are chosen.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "game.py"), *options],
+        cwd=data_dir,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        env={**os.environ, "PYTHONUNBUFFERED": "1"},
+    )
+    output = bytearray()
+    try:
+        first_prompt = wait_for(process, "choose the difficulty", output) - start
+        time.sleep(think)
+        chosen = time.perf_counter()
+        process.stdin.write(f"{difficulty}\n".encode())
+        process.stdin.flush()
+        rounds_prompt = wait_for(process, "How many rounds", output) - chosen
+        time.sleep(think)
+        answered = time.perf_counter()
+        process.stdin.write(b"10\n")
+        process.stdin.flush()
+        first_question = wait_for(process, "Enter your answer", output) - answered
+    finally:
+        process.kill()
+        process.wait()
+    return first_prompt * 1e3, rounds_prompt * 1e3, first_question * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--think", type=float, default=1.0, help="seconds before every answer")
+    parser.add_argument("--difficulty", default="hard")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        pools = build_pools(game_set(args.rows, args.seed), data_dir)
+        publish(pools, os.path.join(data_dir, SNAPSHOT_DIR))
+        del pools
+        print(f"think time: {args.think:.1f} s, median of {args.runs} runs, target {TARGET_MS} ms")
+        print(
+            f"{'start':<12}{'first prompt (ms)':>20}{'rounds prompt (ms)':>21}"
+            f"{'first question (ms)':>22}"
+        )
+        for mode, options in MODES.items():
+            times = np.array(
+                [
+                    start_game(data_dir, options, args.think, args.difficulty)
+                    for _ in range(args.runs)
+                ]
+            )
+            prompt, rounds, question = np.median(times, axis=0)
+            print(f"{mode:<12}{prompt:>20.0f}{rounds:>21.0f}{question:>22.0f}")
+
+
+if __name__ == "__main__":
+    main()
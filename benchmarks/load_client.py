@@ -0,0 +1,127 @@
+"""
+load_client.py
+
+This module is a load generator for server.py: it opens many concurrent connections,
+each one playing whole games with random answers, and reports the latency of the
+questions (time between sending NEXT and receiving the question) as p50/p99,
+together with the overall throughput.
+
+Usage, against a running server:
+    python benchmarks/load_client.py --port 8765 --clients 1000 --games 5 --rounds 10
+or against a server started on a synthetic game_set by the load generator itself:
+    python benchmarks/load_client.py --synthetic-rows 1000000 --clients 1000
+"""
+
+import os  # type: ignore
+import sys  # type: ignore
+import json  # type: ignore
+import time  # type: ignore
+import random  # type: ignore
+import asyncio  # type: ignore
+import argparse  # type: ignore
+import multiprocessing  # type: ignore
+import numpy as np  # type: ignore
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pools import DIFFICULTIES  # type: ignore  # noqa: E402
+
+
+async def connect(args):
+    """
+    Opens a connection to the server, retrying while it is starting.
+    """
+    for _ in range(100):
+        try:
+            if args.unix:
+                return await asyncio.open_unix_connection(args.unix)
+            return await asyncio.open_connection(args.host, args.port)
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise ConnectionError("the server is not reachable")
+
+
+async def request(reader, writer, command):
+    """
+    Sends a command and returns the decoded answer of the server.
+    """
+    writer.write((command + "\n").encode())
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+async def player(args, latencies):
+    """
+    Plays 'args.games' games on a single connection, recording the question latencies.
+    """
+    reader, writer = await connect(args)
+    for _ in range(args.games):
+        await request(reader, writer, f"START {random.choice(DIFFICULTIES)} {args.rounds}")
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            question = await request(reader, writer, "NEXT")
+            latencies.append(time.perf_counter() - start)
+            letter = random.choice("ABCD"[: len(question["choices"])])
+            await request(reader, writer, f"ANSWER {letter}")
+        await request(reader, writer, "FINISH")
+    writer.write(b"QUIT\n")
+    await writer.drain()
+    writer.close()
+
+
+async def run(args):
+    """
+    Runs every player concurrently and prints the report.
+    """
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(player(args, latencies) for _ in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies) * 1000
+    print(f"clients: {args.clients}, games: {args.clients * args.games}, questions: {len(latencies)}")
+    print(f"throughput: {len(latencies) / elapsed:.0f} questions/s")
+    print(f"question latency p50: {np.percentile(latencies, 50):.2f} ms")
+    print(f"question latency p99: {np.percentile(latencies, 99):.2f} ms")
+
+
+def serve_synthetic(args):
+    """
+    Process body serving a synthetic game_set, used with --synthetic-rows.
+    """
+    from dataset_io import GAME_COLUMNS, to_columnar  # type: ignore
+    from engine import QuizEngine  # type: ignore
+    from server import QuizServer  # type: ignore
+    from benchmarks.synthetic_imdb import game_set  # type: ignore
+
+    engine = QuizEngine(to_columnar(game_set(args.synthetic_rows)[GAME_COLUMNS]))
+    asyncio.run(QuizServer(engine).serve(args.host, args.port, args.unix))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="path of the Unix socket of the server")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--games", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument(
+        "--synthetic-rows", type=int, help="start a server on a synthetic game_set of this size"
+    )
+    args = parser.parse_args()
+
+    server = None
+    if args.synthetic_rows:
+        server = multiprocessing.get_context("fork").Process(
+            target=serve_synthetic, args=(args,), daemon=True
+        )
+        server.start()
+    try:
+        asyncio.run(run(args))
+    finally:
+        if server is not None:
+            server.terminate()
+
+
+if __name__ == "__main__":
+    main()
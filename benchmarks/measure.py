@@ -0,0 +1,69 @@
+"""
+measure.py
+
+This module contains the helpers shared by the benchmark scripts to measure
+wall time and peak resident memory of a function call.
+"""
+
+import os  # type: ignore
+import time  # type: ignore
+import resource  # type: ignore
+import multiprocessing  # type: ignore
+
+
+def current_rss():
+    """
+    Returns the resident memory of the current process in bytes (Linux only).
+    """
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def run_measured(conn, func, args, keep_result=False):
+    """
+    Child process body of measure() and measure_call().
+    """
+    start_rss = current_rss()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KB on Linux
+    summary = result if keep_result else len(result)
+    conn.send((summary, elapsed, (peak_rss - start_rss) / 1024**2))
+    conn.close()
+
+
+def measure(func, *args):
+    """
+    Runs a function in a forked process while tracking wall time and peak memory.
+
+    Args:
+        func: The function to run.
+        args: Arguments passed to the function.
+
+    Returns:
+        The length of the result, the elapsed seconds and the peak memory
+        (in MB) allocated on top of what the process held before the call.
+    """
+    return measure_call(func, *args, keep_result=False)
+
+
+def measure_call(func, *args, keep_result=True):
+    """
+    Like measure(), but returns the result of the function itself (it must be picklable).
+
+    Args:
+        func: The function to run.
+        args: Arguments passed to the function.
+        keep_result: Whether to send back the result, or only its length.
+
+    Returns:
+        The result, the elapsed seconds and the peak memory (in MB) allocated by the call.
+    """
+    context = multiprocessing.get_context("fork")
+    parent_conn, child_conn = context.Pipe()
+    process = context.Process(target=run_measured, args=(child_conn, func, args, keep_result))
+    process.start()
+    result = parent_conn.recv()
+    process.join()
+    return result
@@ -0,0 +1,302 @@
+"""
+suite.py
+
+This module runs the benchmark suite of the project on a synthetic IMDb dump written by
+synthetic_imdb.py (or on a real dump with --data-dir) and saves the results, so that the
+regressions can be found by comparing two runs.
+
+The suite measures:
+- the build of dataset_merge.py: wall time of every stage and peak resident memory.
+- loading the game_set from the csv file and from the Parquet file.
+- the questions as the games ask them, in microseconds per call, at every difficulty level:
+  engine.rendered_question for every kind of answer (the sampler with the titles already
+  asked by a game, the question and its choices), without and with the question cache, and
+  a whole round of quiz() (engine.next_question then engine.submit_answer).
+- the legacy question generators of QuizGame (first_question to fourth_question) and
+  gen_answers for every kind of answer, which the game no longer calls.
+
+Every result is a cost (lower is better). The results are written to
+'benchmarks/results/<date>.json' with the commit and the parameters of the run, then compared
+with the latest results of a run with the same parameters (or with the file given to
+--compare): the results more than --threshold slower are reported as regressions and the
+script exits with status 1.
+
+Usage:
+    python benchmarks/suite.py --names 100000 --titles 50000
+    python benchmarks/suite.py --data-dir imdb-dataset --compare benchmarks/results/base.json
+"""
+
+import os  # type: ignore
+import sys  # type: ignore
+import json  # type: ignore
+import glob  # type: ignore
+import time  # type: ignore
+import argparse  # type: ignore
+import platform  # type: ignore
+import tempfile  # type: ignore
+import itertools  # type: ignore
+import subprocess  # type: ignore
+from datetime import datetime  # type: ignore
+import pandas as pd  # type: ignore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dataset_merge import build  # type: ignore  # noqa: E402
+from dataset_io import GAME_COLUMNS, load_dataset  # type: ignore  # noqa: E402
+from pools import DIFFICULTIES  # type: ignore  # noqa: E402
+from distractors import ANSWER_KINDS  # type: ignore  # noqa: E402
+from quiz import QuizGame  # type: ignore  # noqa: E402
+from question_cache import DEFAULT_SIZE, QuestionCache  # type: ignore  # noqa: E402
+from benchmarks.measure import measure, measure_call  # type: ignore  # noqa: E402
+from benchmarks.synthetic_imdb import write_imdb  # type: ignore  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+GENERATORS = ["first_question", "second_question", "third_question", "fourth_question"]
+N_ANSWERS = 256  # correct answers gen_answers is called with, in turn
+GAME_ROUNDS = 10  # rounds of the simulated games
+
+
+def git_commit():
+    """
+    Returns the commit of the working tree, None outside of a git repository.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_times(data_dir, output_dir, workers):
+    """
+    Builds the datasets from a dump and returns the seconds spent in every stage.
+    """
+    return build(data_dir, output_dir, workers=workers).times
+
+
+def per_call(func, n_calls, repeat=3):
+    """
+    Times a function called without arguments.
+
+    Args:
+        func: The function to time.
+        n_calls: Number of calls of every timed batch.
+        repeat: Number of batches, the fastest one is kept.
+
+    Returns:
+        The microseconds per call of the fastest batch.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(n_calls):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return best / n_calls * 1e6
+
+
+def bench_build(data_dir, output_dir, workers):
+    """
+    Measures the build of the datasets: total time, time of every stage and peak memory.
+    """
+    times, elapsed, peak = measure_call(build_times, data_dir, output_dir, workers)
+    results = {"build.seconds": elapsed, "build.peak_mb": peak}
+    for stage, seconds in times.items():
+        results[f"build.{stage}.seconds"] = seconds
+    return results
+
+
+def bench_load(output_dir):
+    """
+    Measures the loading of the game_set from csv (all columns) and Parquet (game columns).
+    """
+    loaders = {
+        "csv": lambda: pd.read_csv(os.path.join(output_dir, "game_set.csv")),
+        "parquet": lambda: load_dataset("game_set", GAME_COLUMNS, output_dir),
+    }
+    results = {}
+    for label, loader in loaders.items():
+        _, elapsed, peak = measure(loader)
+        results[f"load.game_set.{label}.seconds"] = elapsed
+        results[f"load.game_set.{label}.peak_mb"] = peak
+    return results
+
+
+def game_questions(engine, dif, kind):
+    """
+    Returns a function asking a question of a kind as the games do, with the titles already
+    asked by a game of GAME_ROUNDS rounds (a new game every GAME_ROUNDS questions).
+    """
+    seen = set()
+
+    def ask():
+        if len(seen) >= GAME_ROUNDS:
+            seen.clear()
+        return engine.rendered_question(dif, kind, seen)
+
+    return ask
+
+
+def game_rounds(engine, dif):
+    """
+    Returns a function playing a round of a game as quiz() does: engine.next_question, then
+    engine.submit_answer (a new game every GAME_ROUNDS rounds).
+    """
+    sessions = [engine.start_game(dif, GAME_ROUNDS)]
+
+    def play():
+        if sessions[0].round_number >= sessions[0].n_round:
+            sessions[0] = engine.start_game(dif, GAME_ROUNDS)
+        question = engine.next_question(sessions[0])
+        return engine.submit_answer(sessions[0], question.choices[0])
+
+    return play
+
+
+def bench_questions(output_dir, n_calls):
+    """
+    Measures the questions of the games (rendered_question and the rounds of the engine) and
+    the legacy question generators and gen_answers of QuizGame at every difficulty level.
+    The levels without any question (possible on a small dump) are skipped.
+    """
+    game = QuizGame(load_dataset("game_set", GAME_COLUMNS, output_dir))
+    results = {}
+    for dif in DIFFICULTIES:
+        game.dif = dif
+        game.dataset = game.engine.pool(dif)
+        if game.dataset.empty:
+            continue
+        engine = game.engine
+        engine.distractor_index(dif)  # build the pool outside of the timings
+        engine.sampler(dif)
+        for kind in ANSWER_KINDS:
+            results[f"questions.{dif}.rendered_question.{kind}.us"] = per_call(
+                game_questions(engine, dif, kind), n_calls
+            )
+        engine.question_cache = QuestionCache(DEFAULT_SIZE)
+        for kind in ANSWER_KINDS:
+            ask = game_questions(engine, dif, kind)
+            per_call(ask, n_calls, repeat=1)  # fill the cache
+            results[f"questions.{dif}.rendered_question_cached.{kind}.us"] = per_call(
+                ask, n_calls
+            )
+        engine.question_cache = None
+        results[f"questions.{dif}.round.us"] = per_call(game_rounds(engine, dif), n_calls)
+        for name in GENERATORS:
+            results[f"questions.{dif}.{name}.us"] = per_call(getattr(game, name), n_calls)
+        for kind in ANSWER_KINDS:
+            answers = itertools.cycle(
+                [game.engine.question(dif, kind)[1] for _ in range(N_ANSWERS)]
+            )
+            results[f"questions.{dif}.gen_answers.{kind}.us"] = per_call(
+                lambda: game.gen_answers(next(answers), kind), n_calls
+            )
+    return results
+
+
+def previous_results(results_dir, params):
+    """
+    Returns the path of the latest results of a run with the same parameters, None if there is none.
+    """
+    for path in sorted(glob.glob(os.path.join(results_dir, "*.json")), reverse=True):
+        with open(path) as results_file:
+            if json.load(results_file)["params"] == params:
+                return path
+    return None
+
+
+def compare(old, new, threshold):
+    """
+    Compares two runs of the suite.
+
+    Args:
+        old: Results of the reference run, by benchmark name.
+        new: Results of the current run, by benchmark name.
+        threshold: Relative slowdown above which a result is a regression (0.1 for 10%).
+
+    Returns:
+        The lines of the comparison table and the names of the regressions.
+    """
+    lines = [f"{'benchmark':<58}{'before':>12}{'after':>12}{'change':>9}"]
+    regressions = []
+    for name, value in new.items():
+        if name not in old:
+            continue
+        change = value / old[name] - 1 if old[name] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  regression"
+        lines.append(f"{name:<58}{old[name]:>12.4g}{value:>12.4g}{change:>+9.1%}{flag}")
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--names", type=int, default=100_000, help="people of the dump")
+    parser.add_argument("--titles", type=int, default=50_000, help="titles of the dump")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", help="folder of an existing dump, instead of a synthetic one")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes of the build")
+    parser.add_argument("--calls", type=int, default=2_000, help="calls per question timing")
+    parser.add_argument("--results-dir", default=RESULTS_DIR)
+    parser.add_argument("--compare", help="results file to compare with, default the latest one")
+    parser.add_argument("--threshold", type=float, default=0.1, help="slowdown of a regression")
+    parser.add_argument("--no-save", action="store_true", help="do not save the results")
+    args = parser.parse_args()
+
+    params = {"data_dir": args.data_dir, "workers": args.workers, "calls": args.calls}
+    if args.data_dir is None:
+        params.update(names=args.names, titles=args.titles, seed=args.seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        data_dir = args.data_dir
+        if data_dir is None:
+            data_dir = os.path.join(work_dir, "imdb-dataset")
+            start = time.perf_counter()
+            write_imdb(data_dir, args.names, args.titles, args.seed)
+            print(f"synthetic dump written in {time.perf_counter() - start:.2f} s")
+        output_dir = os.path.join(work_dir, "output")
+        os.makedirs(output_dir)
+        results.update(bench_build(data_dir, output_dir, args.workers))
+        results.update(bench_load(output_dir))
+        results.update(bench_questions(output_dir, args.calls))
+
+    for name, value in results.items():
+        print(f"{name:<58}{value:>12.4g}")
+    reference = args.compare or previous_results(args.results_dir, params)
+    regressions = []
+    if reference is not None:
+        with open(reference) as reference_file:
+            reference_results = json.load(reference_file)["results"]
+        lines, regressions = compare(reference_results, results, args.threshold)
+        print(f"\ncompared with {reference}")
+        print("\n".join(lines))
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+    if not args.no_save:
+        os.makedirs(args.results_dir, exist_ok=True)
+        date = datetime.now()
+        path = os.path.join(args.results_dir, f"{date:%Y%m%d-%H%M%S}.json")
+        run = {
+            "date": date.isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "params": params,
+            "results": results,
+        }
+        with open(path, "w") as results_file:
+            json.dump(run, results_file, indent=2)
+        print(f"results saved to {path}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
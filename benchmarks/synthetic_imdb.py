@@ -0,0 +1,329 @@
+"""
+synthetic_imdb.py
+
+This module generates synthetic datasets shaped like the IMDb dump used by dataset_merge.py.
+The generated frames have the same columns as 'name.basics.tsv', 'title.basics.tsv' and
+'title.akas.tsv' (with '\\N' marking the missing values), so they can go through the same
+cleaning and merging functions as the real files without downloading anything.
+Professions, genres and regions are drawn with skewed frequencies, as in the real dump.
+
+Running this file writes a whole synthetic dump, chunk by chunk, so it scales from
+thousands to hundreds of millions of rows with bounded memory:
+    python benchmarks/synthetic_imdb.py --names 1000000 --titles 500000 --output imdb-dataset
+"""
+
+import os  # type: ignore
+import argparse  # type: ignore
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+
+TITLE_TYPES = ["movie", "tvSeries", "short", "tvEpisode", "tvMovie", "video"]
+TITLE_TYPE_WEIGHTS = [0.15, 0.05, 0.1, 0.6, 0.05, 0.05]
+GENRES = [
+    "Drama",
+    "Comedy",
+    "Action",
+    "Horror",
+    "Documentary",
+    "Sci-Fi",
+    "Talk-Show",
+    "Romance",
+    "Thriller",
+    "Adult",
+    "Crime",
+    "Family",
+]
+PROFESSIONS = [
+    "actor",
+    "actress",
+    "writer",
+    "producer",
+    "director",
+    "miscellaneous",
+    "camera_department",
+    "sound_department",
+]
+# relative frequencies of the professions and genres, most common first as in the real dump
+PROFESSION_WEIGHTS = [0.3, 0.2, 0.1, 0.1, 0.07, 0.13, 0.05, 0.05]
+GENRE_WEIGHTS = [0.25, 0.15, 0.07, 0.05, 0.12, 0.03, 0.04, 0.07, 0.06, 0.04, 0.07, 0.05]
+REGIONS = ["US", "GB", "DE", "FR", "IN", "JP", "CA", "IT", "ES", "BR", "MX", "RU", "AU", "SE"]
+LANGUAGES = ["en", "fr", "de", "es", "ja", "hi", "it", "ru"]
+CHUNK_ROWS = 1_000_000  # rows generated at once when writing a dump
+
+
+def join_samples(rng, values, n_rows, max_items, weights=None):
+    """
+    Builds comma separated lists of 1 to 'max_items' values picked from 'values'.
+
+    Args:
+        rng: A numpy random Generator.
+        values: The values to pick from.
+        n_rows: Number of lists to build.
+        max_items: Maximum number of items in a list.
+        weights: Relative frequencies of the values, None picks them uniformly.
+
+    Returns:
+        A numpy array of comma separated strings.
+    """
+    values = np.asarray(values, dtype=object)
+    if weights is None:
+        picks = values[rng.integers(0, len(values), size=(n_rows, max_items))]
+    else:
+        p = np.asarray(weights) / np.sum(weights)
+        picks = values[rng.choice(len(values), size=(n_rows, max_items), p=p)]
+    lengths = rng.integers(1, max_items + 1, size=n_rows)
+    return np.array([",".join(row[:n]) for row, n in zip(picks, lengths)], dtype=object)
+
+
+def imdb_ids(prefix, numbers):
+    """
+    Formats integers as IMDb ids, e.g. 'tt00000042'.
+    """
+    return np.char.add(prefix, np.char.zfill(np.asarray(numbers).astype(str), 8))
+
+
+def join_ids(rng, prefix, n_ids, n_rows, max_items):
+    """
+    Builds comma separated lists of 1 to 'max_items' ids picked among the first 'n_ids',
+    like join_samples without formatting every possible id.
+    """
+    picks = imdb_ids(prefix, rng.integers(0, n_ids, size=(n_rows, max_items))).astype(object)
+    lengths = rng.integers(1, max_items + 1, size=n_rows)
+    return np.array([",".join(row[:n]) for row, n in zip(picks, lengths)], dtype=object)
+
+
+def random_generator(seed, start):
+    """
+    Returns the random generator of a chunk of rows starting at 'start'.
+    """
+    return np.random.default_rng(seed if start == 0 else [seed, start])
+
+
+def with_missing(rng, column, rate):
+    """
+    Replaces a fraction of the values of a column with '\\N'.
+
+    Args:
+        rng: A numpy random Generator.
+        column: A numpy array of strings.
+        rate: Fraction of missing values.
+
+    Returns:
+        The column with missing values.
+    """
+    column = column.astype(object)
+    column[rng.random(len(column)) < rate] = "\\N"
+    return column
+
+
+def title_basics(n_titles, seed=0, start=0):
+    """
+    Generates a frame shaped like 'title.basics.tsv'.
+
+    Args:
+        n_titles: Number of titles.
+        seed: Seed of the random generator.
+        start: Number of the first title (the ids go from 'start' to 'start + n_titles').
+
+    Returns:
+        A pandas DataFrame with the columns of 'title.basics.tsv'.
+    """
+    rng = random_generator(seed, start)
+    ids = imdb_ids("tt", np.arange(start, start + n_titles))
+    titles = np.char.add(
+        "Title ", rng.integers(0, start + n_titles, size=n_titles).astype(str)
+    )
+    return pd.DataFrame(
+        {
+            "tconst": ids.astype(object),
+            "titleType": rng.choice(TITLE_TYPES, size=n_titles, p=TITLE_TYPE_WEIGHTS),
+            "primaryTitle": titles.astype(object),
+            "originalTitle": titles.astype(object),
+            "isAdult": (rng.random(n_titles) < 0.02).astype(int).astype(str),
+            "startYear": with_missing(
+                rng, rng.integers(1900, 2025, size=n_titles).astype(str), 0.1
+            ),
+            "endYear": with_missing(
+                rng, rng.integers(1950, 2025, size=n_titles).astype(str), 0.99
+            ),
+            "runtimeMinutes": with_missing(
+                rng, rng.integers(5, 240, size=n_titles).astype(str), 0.3
+            ),
+            "genres": with_missing(
+                rng, join_samples(rng, GENRES, n_titles, 3, GENRE_WEIGHTS), 0.05
+            ),
+        }
+    )
+
+
+def name_basics(n_names, n_titles, seed=0, start=0):
+    """
+    Generates a frame shaped like 'name.basics.tsv'.
+
+    Args:
+        n_names: Number of people.
+        n_titles: Number of titles the 'knownForTitles' ids are drawn from.
+        seed: Seed of the random generator.
+        start: Number of the first person (the ids go from 'start' to 'start + n_names').
+
+    Returns:
+        A pandas DataFrame with the columns of 'name.basics.tsv'.
+    """
+    rng = random_generator(seed + 1, start)
+    ids = imdb_ids("nm", np.arange(start, start + n_names))
+    names = np.char.add(
+        "Person ", rng.integers(0, start + n_names, size=n_names).astype(str)
+    )
+    return pd.DataFrame(
+        {
+            "nconst": ids.astype(object),
+            "primaryName": names.astype(object),
+            "birthYear": with_missing(
+                rng, rng.integers(1880, 2010, size=n_names).astype(str), 0.5
+            ),
+            "deathYear": with_missing(
+                rng, rng.integers(1950, 2025, size=n_names).astype(str), 0.9
+            ),
+            "primaryProfession": with_missing(
+                rng, join_samples(rng, PROFESSIONS, n_names, 3, PROFESSION_WEIGHTS), 0.1
+            ),
+            "knownForTitles": with_missing(rng, join_ids(rng, "tt", n_titles, n_names, 4), 0.05),
+        }
+    )
+
+
+def title_akas(n_titles, seed=0, start=0):
+    """
+    Generates a frame shaped like 'title.akas.tsv': 0 to about 8 release rows per title.
+
+    Args:
+        n_titles: Number of titles.
+        seed: Seed of the random generator.
+        start: Number of the first title.
+
+    Returns:
+        A pandas DataFrame with the columns of 'title.akas.tsv'.
+    """
+    rng = random_generator(seed + 3, start)
+    per_title = rng.poisson(2.5, size=n_titles)
+    n_rows = int(per_title.sum())
+    title_numbers = np.repeat(np.arange(start, start + n_titles), per_title)
+    first_rows = np.repeat(np.cumsum(per_title) - per_title, per_title)
+    ordering = np.arange(n_rows) - first_rows + 1
+    region_weights = 1 / np.arange(1, len(REGIONS) + 1)  # a few regions release most titles
+    regions = np.asarray(REGIONS, dtype=object)[
+        rng.choice(len(REGIONS), size=n_rows, p=region_weights / region_weights.sum())
+    ]
+    languages = np.asarray(LANGUAGES, dtype=object)[rng.integers(0, len(LANGUAGES), size=n_rows)]
+    return pd.DataFrame(
+        {
+            "titleId": imdb_ids("tt", title_numbers).astype(object),
+            "ordering": ordering.astype(str),
+            "title": np.char.add("Title ", title_numbers.astype(str)).astype(object),
+            "region": with_missing(rng, regions, 0.25),
+            "language": with_missing(rng, languages, 0.7),
+            "types": with_missing(rng, np.full(n_rows, "imdbDisplay", dtype=object), 0.8),
+            "attributes": np.full(n_rows, "\\N", dtype=object),
+            "isOriginalTitle": (ordering == 1).astype(int).astype(str),
+        }
+    )
+
+
+def write_imdb(data_dir, n_names, n_titles, seed=0, chunk_rows=CHUNK_ROWS):
+    """
+    Writes a synthetic dump ('name.basics.tsv', 'title.basics.tsv' and 'title.akas.tsv'),
+    generating and appending 'chunk_rows' rows at a time.
+
+    Args:
+        data_dir: Folder where the TSV files are written.
+        n_names: Number of people.
+        n_titles: Number of titles.
+        seed: Seed of the random generators.
+        chunk_rows: Number of people or titles generated at once.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    files = [
+        ("name.basics.tsv", n_names, lambda n, start: name_basics(n, n_titles, seed, start)),
+        ("title.basics.tsv", n_titles, lambda n, start: title_basics(n, seed, start)),
+        ("title.akas.tsv", n_titles, lambda n, start: title_akas(n, seed, start)),
+    ]
+    for name, n_rows, generate in files:
+        path = os.path.join(data_dir, name)
+        with open(path, "w", newline="") as tsv:
+            for start in range(0, max(n_rows, 1), chunk_rows):
+                chunk = generate(min(chunk_rows, n_rows - start), start)
+                chunk.to_csv(tsv, sep="\t", index=False, header=start == 0)
+
+
+def parsed(frame, usecols):
+    """
+    Mimics reading a generated frame with pd.read_table(..., usecols=usecols, na_values="\\N").
+
+    Args:
+        frame: A frame returned by title_basics or name_basics.
+        usecols: Columns to keep.
+
+    Returns:
+        The frame restricted to 'usecols', with '\\N' replaced by missing values.
+    """
+    frame = frame[usecols]
+    return frame.mask(frame == "\\N")
+
+
+def game_set(n_rows, seed=0):
+    """
+    Generates a frame shaped like the game_set produced by dataset_merge.py.
+
+    Args:
+        n_rows: Number of rows.
+        seed: Seed of the random generator.
+
+    Returns:
+        A pandas DataFrame with the columns of the game_set.
+    """
+    rng = np.random.default_rng(seed + 2)
+    n_titles = max(n_rows // 4, 1)
+    n_names = max(n_rows // 2, 1)
+    professions = np.array([p.replace("_", " ") for p in PROFESSIONS], dtype=object)
+    other_professions = np.array(PROFESSIONS + [np.nan], dtype=object)
+    genres = np.array(GENRES + [np.nan], dtype=object)
+    movie = rng.integers(0, n_titles, size=n_rows)
+    return pd.DataFrame(
+        {
+            "name_surname": np.char.add(
+                "Person ", rng.integers(0, n_names, size=n_rows).astype(str)
+            ).astype(object),
+            "birth": rng.integers(1880, 2010, size=n_rows),
+            "first_profession": professions[rng.integers(0, len(professions), size=n_rows)],
+            "second_profession": other_professions[
+                rng.integers(0, len(other_professions), size=n_rows)
+            ],
+            "third_profession": other_professions[
+                rng.integers(0, len(other_professions), size=n_rows)
+            ],
+            "movie_id": np.char.add("tt", np.char.zfill(movie.astype(str), 8)).astype(object),
+            "type": np.where(movie % 4 == 0, "tv series", "movie").astype(object),
+            "title": np.char.add("Title ", movie.astype(str)).astype(object),
+            "adult": (movie % 50 == 0).astype(int),
+            "start_year": 1900 + movie % 125,
+            "minutes_runtimes": 5 + movie % 235,
+            "genre_1": genres[movie % (len(genres) - 1)],
+            "genre_2": genres[(movie * 7) % len(genres)],
+            "genre_3": genres[(movie * 11) % len(genres)],
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic IMDb dump")
+    parser.add_argument("--names", type=int, default=1_000_000, help="rows of name.basics.tsv")
+    parser.add_argument("--titles", type=int, default=500_000, help="rows of title.basics.tsv")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--output", default="imdb-dataset", help="folder of the TSV files")
+    args = parser.parse_args()
+    write_imdb(args.output, args.names, args.titles, args.seed, args.chunk_rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+category_index.py
+
+This module contains the bitmap index the pools of questions are selected with.
+
+For every value of the indexed columns ('type', the professions, the genres and the period of
+'start_year') the index keeps the rows holding that value as a bitset: one bit per row, packed
+in 64-bit words. A filter on several columns is then answered with bitwise AND/OR/NOT of the
+bitsets and counted with a popcount, without scanning the columns of the dataset.
+The rare values are kept as arrays of row positions instead (smaller than a bitset when fewer
+than one row in 32 has the value) and turned into bitsets when a filter uses them.
+
+A quiz is described by a QuizFilter:
+- where: the rows to keep, {column: value or list of values} as in counting.py. Besides the
+  indexed columns, 'genre' matches any of the three genres, 'profession' any of the three
+  professions and 'decade' the decade of the start year (e.g. 1990).
+- exclude: the rows to remove, {column: value or list of values}.
+- years: the (first, last) start years, inclusive, None for an open bound.
+For example, the 90s horror movies with directors only:
+    QuizFilter(where={"type": "movie", "genre": "Horror", "first_profession": "director",
+                      "decade": 1990})
+"""
+
+from collections import namedtuple  # type: ignore
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+from counting import category_codes  # type: ignore
+
+INDEXED_COLUMNS = [
+    "type",
+    "first_profession",
+    "second_profession",
+    "third_profession",
+    "genre_1",
+    "genre_2",
+    "genre_3",
+]
+# filter keys matching any of several columns
+COLUMN_GROUPS = {
+    "genre": ["genre_1", "genre_2", "genre_3"],
+    "profession": ["first_profession", "second_profession", "third_profession"],
+}
+# the years are indexed by periods of 5 years, so that the decades and the limits of the
+# difficulty levels (1975, 2005) are unions of periods
+YEAR_PERIOD = 5
+SPARSE_RATIO = 32  # values on fewer than 1 row in 32 are stored as row positions
+
+QuizFilter = namedtuple("QuizFilter", ["where", "exclude", "years"], defaults=(None, None, None))
+
+
+def as_list(value):
+    """
+    Returns the values of a condition as a list.
+    """
+    return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+
+def positions_bitset(positions, n_words):
+    """
+    Builds the bitset of a sorted array of row positions.
+
+    Args:
+        positions: Sorted positions of the rows (int64).
+        n_words: Number of 64-bit words of the bitset.
+
+    Returns:
+        A uint64 NumPy array.
+    """
+    words = np.zeros(n_words, dtype=np.uint64)
+    if len(positions):
+        word_ids = positions >> 6
+        bits = np.left_shift(np.uint64(1), (positions & 63).astype(np.uint64))
+        starts = np.flatnonzero(np.r_[True, word_ids[1:] != word_ids[:-1]])
+        words[word_ids[starts]] = np.bitwise_or.reduceat(bits, starts)
+    return words
+
+
+def popcount(words):
+    """
+    Counts the bits set in a bitset.
+    """
+    if hasattr(np, "bitwise_count"):  # NumPy 2.0 and later
+        return int(np.bitwise_count(words).sum())
+    return int(np.unpackbits(words.view(np.uint8)).sum())
+
+
+def filter_mask(dataset, quiz_filter):
+    """
+    Computes the rows of a dataset matching a QuizFilter by scanning its columns,
+    for a single use where building the index would cost more than the scan.
+
+    Args:
+        dataset: A pandas DataFrame with the game_set columns.
+        quiz_filter: The QuizFilter.
+
+    Returns:
+        A boolean NumPy array.
+    """
+
+    def matches(column, values):
+        if column == "decade":
+            decades = dataset["start_year"] // 10 * 10
+            return decades.isin(as_list(values)).to_numpy(dtype=bool, na_value=False)
+        mask = np.zeros(len(dataset), dtype=bool)
+        for name in COLUMN_GROUPS.get(column, [column]):
+            if name not in dataset and column in COLUMN_GROUPS:
+                continue
+            mask |= dataset[name].isin(as_list(values)).to_numpy(dtype=bool, na_value=False)
+        return mask
+
+    mask = np.ones(len(dataset), dtype=bool)
+    for column, values in (quiz_filter.where or {}).items():
+        mask &= matches(column, values)
+    for column, values in (quiz_filter.exclude or {}).items():
+        mask &= ~matches(column, values)
+    if quiz_filter.years is not None:
+        first, last = quiz_filter.years
+        years = dataset["start_year"]
+        if first is not None:
+            mask &= (years >= first).to_numpy(dtype=bool, na_value=False)
+        if last is not None:
+            mask &= (years <= last).to_numpy(dtype=bool, na_value=False)
+    return mask
+
+
+def parse_filter(text):
+    """
+    Parses a QuizFilter written as conditions separated by ';', e.g.
+    'type=movie; genre=Horror; first_profession=director; decade=1990'.
+
+    Values are separated by ',', a condition starting with '-' excludes its values
+    and 'years=1990-1999' (or '-1974', '2005-') restricts the start years.
+
+    Args:
+        text: The conditions.
+
+    Returns:
+        The QuizFilter.
+    """
+    where = {}
+    exclude = {}
+    years = None
+    for condition in text.split(";"):
+        if not condition.strip():
+            continue
+        if "=" not in condition:
+            raise ValueError(f"invalid condition '{condition.strip()}', expected column=values")
+        column, values = (part.strip() for part in condition.split("=", 1))
+        if column == "years":
+            first, _, last = values.partition("-")
+            years = (int(first) if first else None, int(last) if last else None)
+            continue
+        values = [value.strip() for value in values.split(",")]
+        if column.lstrip("-") == "decade":
+            values = [int(value) for value in values]
+            if any(value % 10 for value in values):
+                raise ValueError(f"invalid decade in '{condition.strip()}', e.g. 1990 for the 90s")
+        if column.startswith("-"):
+            exclude[column[1:]] = values
+        else:
+            where[column] = values
+    return QuizFilter(where, exclude, years)
+
+
+class CategoryIndex:
+    """
+    Bitsets of the rows holding every value of the indexed columns of a dataset.
+
+    Attributes:
+        size: Number of rows.
+        n_words: Number of 64-bit words of a bitset.
+        bitsets: The bitset (or the sorted row positions, for a rare value) of every value,
+                 by column and value. The years are indexed by period under 'period'.
+        years: The start year of every row (int16), to refine the periods cut by a filter.
+
+    Methods:
+        __init__(dataset): Builds the index of a dataset.
+        bitset(column, value): Returns the bitset of the rows holding a value.
+        select(quiz_filter): Returns the bitset of the rows matching a QuizFilter.
+        count(quiz_filter): Counts the rows matching a QuizFilter.
+        rows(quiz_filter): Returns the positions of the rows matching a QuizFilter.
+    """
+
+    def __init__(self, dataset):
+        """
+        Builds the index of the indexed columns of a dataset.
+
+        Args:
+            dataset: A pandas DataFrame with the game_set columns.
+        """
+        self.size = len(dataset)
+        self.n_words = (self.size + 63) // 64
+        self.bitsets = {}
+        for column in INDEXED_COLUMNS:
+            if column in dataset:
+                self.add_column(column, *category_codes(dataset[column]))
+        years = pd.to_numeric(dataset["start_year"]).to_numpy(dtype=float, na_value=np.nan)
+        valid = ~np.isnan(years)
+        self.years = np.where(valid, years, -1).astype(np.int16)
+        periods = np.where(valid, self.years // YEAR_PERIOD, -1)
+        labels, codes = np.unique(periods[valid], return_inverse=True)
+        all_codes = np.full(self.size, -1, dtype=np.int64)
+        all_codes[valid] = codes
+        self.add_column("period", all_codes, labels * YEAR_PERIOD)
+
+    def add_column(self, column, codes, labels):
+        """
+        Adds the bitsets of the values of a column, given as codes (-1 for missing values).
+        """
+        order = np.argsort(codes, kind="stable")  # rows of every value, in increasing order
+        bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+        self.bitsets[column] = {}
+        for code, label in enumerate(labels):
+            positions = order[bounds[code] : bounds[code + 1]].astype(np.int64)
+            if len(positions) * SPARSE_RATIO < self.size:
+                self.bitsets[column][label] = positions
+            else:
+                self.bitsets[column][label] = positions_bitset(positions, self.n_words)
+
+    def all_rows(self):
+        """
+        Returns the bitset of every row.
+        """
+        words = np.full(self.n_words, np.iinfo(np.uint64).max, dtype=np.uint64)
+        if self.size % 64:
+            words[-1] = np.uint64((1 << (self.size % 64)) - 1)
+        return words
+
+    def bitset(self, column, value):
+        """
+        Returns the bitset of the rows holding a value (no rows for an unknown value).
+
+        Args:
+            column: An indexed column, or 'period' for the first year of a period.
+            value: The value.
+
+        Returns:
+            A uint64 NumPy array, to be treated as read-only.
+        """
+        stored = self.bitsets[column].get(value)
+        if stored is None:
+            return np.zeros(self.n_words, dtype=np.uint64)
+        if stored.dtype != np.uint64:
+            return positions_bitset(stored, self.n_words)  # a rare value
+        return stored
+
+    def any_of(self, column, values):
+        """
+        Returns the bitset of the rows holding any of the values of a filter key.
+        """
+        words = np.zeros(self.n_words, dtype=np.uint64)
+        if column == "decade":
+            for decade in as_list(values):
+                if decade % 10:
+                    continue  # not a decade: no start year matches it, as in filter_mask
+                for period in range(decade, decade + 10, YEAR_PERIOD):
+                    words |= self.bitset("period", period)
+            return words
+        if column not in COLUMN_GROUPS and column not in self.bitsets:
+            raise ValueError(f"'{column}' is not an indexed column")
+        for name in COLUMN_GROUPS.get(column, [column]):
+            if name not in self.bitsets:
+                continue  # a column of the group that the dataset does not have
+            for value in as_list(values):
+                words |= self.bitset(name, value)
+        return words
+
+    def year_range(self, first, last):
+        """
+        Returns the bitset of the rows whose start year is between first and last (inclusive,
+        None for an open bound): the union of the periods inside the range, plus the rows of
+        the periods cut by the range whose year is in it.
+        """
+        words = np.zeros(self.n_words, dtype=np.uint64)
+        first = -np.inf if first is None else first
+        last = np.inf if last is None else last
+        for period in self.bitsets["period"]:
+            end = period + YEAR_PERIOD - 1
+            if end < first or period > last:
+                continue
+            stored = self.bitsets["period"][period]
+            if first <= period and end <= last:
+                words |= self.bitset("period", period)
+                continue
+            if stored.dtype == np.uint64:
+                positions = self.positions(stored)
+            else:
+                positions = stored
+            years = self.years[positions]
+            words |= positions_bitset(
+                positions[(years >= first) & (years <= last)], self.n_words
+            )
+        return words
+
+    def select(self, quiz_filter):
+        """
+        Returns the bitset of the rows matching a QuizFilter.
+
+        Args:
+            quiz_filter: The QuizFilter.
+
+        Returns:
+            A uint64 NumPy array.
+        """
+        words = self.all_rows()
+        for column, values in (quiz_filter.where or {}).items():
+            words &= self.any_of(column, values)
+        for column, values in (quiz_filter.exclude or {}).items():
+            words &= ~self.any_of(column, values)
+        if quiz_filter.years is not None:
+            words &= self.year_range(*quiz_filter.years)
+        return words
+
+    def count(self, quiz_filter):
+        """
+        Counts the rows matching a QuizFilter.
+        """
+        return popcount(self.select(quiz_filter))
+
+    def positions(self, words):
+        """
+        Returns the positions of the rows of a bitset, in increasing order.
+        """
+        bits = np.unpackbits(words.view(np.uint8), bitorder="little")[: self.size]
+        return np.flatnonzero(bits)
+
+    def rows(self, quiz_filter):
+        """
+        Returns the positions of the rows matching a QuizFilter, in increasing order.
+        """
+        return self.positions(self.select(quiz_filter))
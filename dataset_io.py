@@ -0,0 +1,91 @@
+"""
+dataset_io.py
+
+This module reads and writes the datasets produced by dataset_merge.py.
+
+Every dataset is saved twice:
+- as a csv file, as it has always been.
+- as a Parquet file with the typed columns of schema.py, where the categoricals
+  are saved with dictionary encoding.
+Loaders read the Parquet file when it exists, and only the columns they ask for,
+and return the columns with the types of schema.py.
+"""
+
+import os  # type: ignore
+import pandas as pd  # type: ignore
+from schema import apply_schema, csv_dtypes  # type: ignore
+
+# columns used by the quiz game
+GAME_COLUMNS = ["name_surname", "first_profession", "type", "title", "start_year", "genre_1"]
+
+
+def to_columnar(frame):
+    """
+    Converts a dataset to the typed representation saved in Parquet (see schema.py).
+
+    Args:
+        frame: A pandas DataFrame (merge_set or game_set).
+
+    Returns:
+        A copy of the DataFrame with small integer and categorical columns.
+    """
+    return apply_schema(frame)
+
+
+def frame_to_csv(frame, header=True):
+    """
+    Formats a DataFrame (or a slice of it) as csv text, as save_dataset writes it.
+    """
+    return frame.to_csv(index=False, header=header)
+
+
+def save_dataset(frame, name, data_dir=".", executor=None, n_shards=1):
+    """
+    Saves a dataset as '<name>.csv' and '<name>.parquet'.
+
+    With an executor, the csv text is formatted in 'n_shards' slices of rows by the
+    executor workers while the Parquet file is written, then the slices are written in order.
+
+    Args:
+        frame: The pandas DataFrame to save.
+        name: Name of the dataset ('merge_set' or 'game_set').
+        data_dir: Folder where the files are written.
+        executor: A concurrent.futures executor, None formats the csv file in this process.
+        n_shards: Number of slices formatted by the executor.
+    """
+    csv_path = os.path.join(data_dir, f"{name}.csv")
+    if executor is None:
+        frame.to_csv(csv_path, index=False)
+    else:
+        bounds = [len(frame) * i // n_shards for i in range(n_shards + 1)]
+        shards = [
+            executor.submit(frame_to_csv, frame.iloc[start:end], i == 0)
+            for i, (start, end) in enumerate(zip(bounds, bounds[1:]))
+        ]
+    to_columnar(frame).to_parquet(os.path.join(data_dir, f"{name}.parquet"), index=False)
+    if executor is not None:
+        with open(csv_path, "w", newline="") as csv_file:
+            for shard in shards:
+                csv_file.write(shard.result())
+
+
+def load_dataset(name, columns=None, data_dir="."):
+    """
+    Loads a dataset, reading only the requested columns.
+
+    The Parquet file is used when it exists, the csv file otherwise.
+
+    Args:
+        name: Name of the dataset ('merge_set' or 'game_set').
+        columns: Columns to read, None reads all of them.
+        data_dir: Folder where the files are stored.
+
+    Returns:
+        The loaded pandas DataFrame.
+    """
+    parquet_path = os.path.join(data_dir, f"{name}.parquet")
+    if os.path.exists(parquet_path):
+        # files saved before the integer types of the schema still have int64 columns
+        return apply_schema(pd.read_parquet(parquet_path, columns=columns))
+    csv_path = os.path.join(data_dir, f"{name}.csv")
+    return apply_schema(pd.read_csv(csv_path, usecols=columns, dtype=csv_dtypes(columns)))
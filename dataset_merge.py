@@ -7,130 +7,717 @@ and formats, ensuring consistency and removing duplicates.
 
 Output Datasets:
 1. 'merge_set':
-   - Includes the variable 'region', which indicates all the states where each movie was released.
-   - This dataset contain duplicates due to the inclusion of regional information.
-   - Intended for creating a map with GeoPandas using the regional data.
+   - One row for every person and every title the person is known for.
 
 2. 'game_set':
-   - Excludes the 'region' variable, thereby eliminating duplicates associated with it.
+   - The merge_set without duplicated rows.
    - Designed for basic descriptive analysis and for running the quiz game.
 
+3. 'region_set':
+   - One row for every title of the merge_set and every region (state) where it was released,
+     with the columns 'movie_id' and 'region' (dictionary encoded in the Parquet file).
+   - Replaces the 'region' column the merge_set was meant to have, which repeated every
+     person and title row once per region.
+
+4. 'region_counts':
+   - Number of titles released in every region, by type ('movie' or 'tv series').
+   - A few KB of aggregates used to draw the maps with GeoPandas.
+
+Build modes:
+- By default every TSV file is parsed in a single pass, as before.
+- With '--streaming' every TSV file is parsed in bounded chunks: only the needed columns
+  are read, '\\N' is parsed as a missing value while reading and the 'titleType' filter is
+  applied chunk by chunk, so the full dump is never held in memory at once.
+  '--memory-budget' (in MB) sets how much memory a single chunk may use, '--chunksize'
+  sets the number of rows per chunk directly. Both modes produce identical csv files.
+- With '--workers N' the TSV files are split into N shards of whole lines (contiguous key
+  ranges): the shards of both files are read and cleaned at the same time by N worker
+  processes, and the csv files are formatted in N slices by the same workers.
+  The shards are concatenated in file order, so the files are identical to the other modes.
+- With '--incremental' only the rows added, changed or removed since the previous build
+  are parsed and joined again, using the state saved in '--state-dir' (see incremental.py).
+
+A report of the wall-clock time of every stage (load, merge_set, game_set, regions, save, stats,
+pools, snapshot, lookup) is printed at the end of the build.
+
+Both datasets are saved as csv files and as Parquet files with typed and dictionary
+encoded columns (see dataset_io.py). The question pools of every difficulty level are
+then saved as 'pool_<difficulty>.parquet' files (see pools.py), which are the files loaded by the game,
+and published as a snapshot of memory-mapped arrays in 'snapshot/' (see shared_dataset.py), which
+'python game.py --snapshot' starts from.
+The statistics shown by descriptive_analysis.ipynb are cached in 'stats_cache.json'
+(see stats_cache.py), and the names and titles of the game_set are indexed in 'lookup/'
+(see lookup_index.py).
+
 Data Source:
 For more information about the variables and data structure, visit the Kaggle page:
 https://www.kaggle.com/datasets/ashirwadsangwan/imdb-dataset?select=title.basics.tsv
 """
 
 
+import io  # type: ignore
 import os  # type: ignore
+import time  # type: ignore
+import argparse  # type: ignore
+from contextlib import contextmanager  # type: ignore
+from concurrent.futures import ProcessPoolExecutor  # type: ignore
 import pandas as pd  # type: ignore
-import opendatasets as od  # type: ignore
 import numpy as np  # type: ignore
+from dataset_io import save_dataset  # type: ignore
+from schema import apply_schema  # type: ignore
+from pools import build_pools  # type: ignore
+from stats_cache import build_stats_cache  # type: ignore
+from lookup_index import build_lookup  # type: ignore
+from shared_dataset import publish  # type: ignore
+from fast_start import SNAPSHOT_DIR  # type: ignore
 
 dataset = "https://www.kaggle.com/datasets/ashirwadsangwan/imdb-dataset/data"
-
-od.download(dataset)
 data_dir = "./imdb-dataset"
-os.listdir(data_dir)
-
-roles_df = pd.read_table(
-    "./imdb-dataset/name.basics.tsv", sep="\t"
-)  # dataset regarding people
-roles_df.drop(
-    ["deathYear"], axis=1, inplace=True
-)  # drop 'deathYear' becuase not all the instances have a death date
-roles_df.replace("\\N", np.nan, inplace=True)
-roles_df.dropna(inplace=True)  # drop all the missing values
-roles_df[["first_profession", "second_profession", "third_profession"]] = roles_df[
-    "primaryProfession"
-].str.split(
-    ",", expand=True
-)  # divide 'primaryProfession' in 3 sub-columns
-roles_df.drop(["primaryProfession"], axis=1, inplace=True)  # drop 'primaryProfession'
-roles_df[["movie_1", "movie_2", "movie_3", "movie_4"]] = roles_df[
-    "knownForTitles"
-].str.split(
-    ",", expand=True
-)  # divide 'knownForTitles' in 4 sub-columns
-roles_df.drop(["knownForTitles"], axis=1, inplace=True)  # drop 'knownForTitles'
-roles_df = roles_df.rename(
-    columns={
-        "nconst": "name_id",
-        "primaryName": "name_surname",
-        "birthYear": "birth",
-    }
-)  # rename some initial columns
-
-
-movie_df = pd.read_table(
-    "./imdb-dataset/title.basics.tsv", sep="\t"
-)  # dataset regarding movies
-movie_df.drop(
-    ["endYear", "originalTitle"], axis=1, inplace=True
-)  # drop 'endYear' because 99% of the observations are missing values
-# drop 'originalTitle' because it is not usefull
-# the variable 'primaryTitle' is keept instead since is the more popular title
-movie_df = movie_df.loc[
-    (movie_df["titleType"] == "tvSeries") | (movie_df["titleType"] == "movie")
-]  # keep only tv series and movies in the dataset
-movie_df.replace("\\N", np.nan, inplace=True)
-movie_df.dropna(inplace=True)  # drop all the missing values
-movie_df[["genre_1", "genre_2", "genre_3"]] = movie_df["genres"].str.split(
-    ",", expand=True
-)  # split the 'genres' variable in 3 sub-columns
-movie_df.drop(["genres"], axis=1, inplace=True)
-movie_df = movie_df.rename(
-    columns={
-        "tconst": "movie_id",
-        "titleType": "type",
-        "primaryTitle": "title",
-        "isAdult": "adult",
-        "startYear": "start_year",
-        "runtimeMinutes": "minutes_runtimes",
-    }
-)  # rename some initial variables
-movie_df["type"] = movie_df["type"].replace({"tvSeries": "tv series"})
-
-region_df = pd.read_table(
-    "./imdb-dataset/title.akas.tsv", sep="\t", usecols=["titleId", "region"]
-)  # dataset about the states where tv series and movies are released
-region_df.replace("\\N", np.nan, inplace=True)
-region_df.dropna(inplace=True)  # drop all the missing values
-
-merge_set1 = pd.merge(roles_df, movie_df, left_on="movie_1", right_on="movie_id").drop(
-    ["movie_1", "movie_2", "movie_3", "movie_4", "name_id"], axis=1
-)  # inner join between roles_df and movie_df on movie_1
-merge_set2 = pd.merge(roles_df, movie_df, left_on="movie_2", right_on="movie_id").drop(
-    ["movie_1", "movie_2", "movie_3", "movie_4", "name_id"], axis=1
-)  # inner join between roles_df and movie_df on movie_2
-merge_set3 = pd.merge(roles_df, movie_df, left_on="movie_3", right_on="movie_id").drop(
-    ["movie_1", "movie_2", "movie_3", "movie_4", "name_id"], axis=1
-)  # inner join between roles_df and movie_df on movie_3
-merge_set4 = pd.merge(roles_df, movie_df, left_on="movie_4", right_on="movie_id").drop(
-    ["movie_1", "movie_2", "movie_3", "movie_4", "name_id"], axis=1
-)  # inner join between roles_df and movie_df on movie_4
-merge_set = pd.concat(
-    [merge_set1, merge_set2, merge_set3, merge_set4]
-)  # concatention of the 4 merged datasets
-# final dataset called 'merge_set' is obtained
-merge_set.drop_duplicates(inplace=True)  # drop duplicates
-pd.merge(merge_set, region_df, left_on="movie_id", right_on="titleId").drop(
-    ["movie_id", "titleId"], axis=1, inplace=True
-)  # inner join between merge_set and region_df
-
-merge_set["first_profession"] = merge_set["first_profession"].str.replace("_", " ")
-merge_set["start_year"] = (
-    pd.to_numeric(merge_set["start_year"], errors="coerce").fillna(0).astype(int)
-)  # convert 'start_year' variable into numeric type
-
-merge_set.drop_duplicates(inplace=True)
-merge_set.to_csv("merge_set.csv", index=False)  # save the merge_set as a csv file
-# merge_set dataset will be used for geopandas map
-
-game_set = pd.read_csv("./merge_set.csv")
-game_set.drop(
-    ["region"], axis=1, inplace=True
-)  # drop the region variable from the game set since will not be used for the quiz game
-game_set.drop_duplicates(
-    inplace=True
-)  # remove all the duplicates that the variable 'region' has
-game_set.to_csv("game_set.csv", index=False)  # save the game_set as a csv file
+
+# columns read from each TSV file, everything else in the dump is never parsed
+# 'deathYear' is not read because not all the instances have a death date
+ROLES_COLUMNS = ["nconst", "primaryName", "birthYear", "primaryProfession", "knownForTitles"]
+# 'endYear' is not read because 99% of the observations are missing values
+# 'originalTitle' is not read because it is not usefull, 'primaryTitle' is the more popular title
+MOVIES_COLUMNS = [
+    "tconst",
+    "titleType",
+    "primaryTitle",
+    "isAdult",
+    "startYear",
+    "runtimeMinutes",
+    "genres",
+]
+MOVIE_TYPES = ["movie", "tvSeries"]  # title types kept in the dataset
+REGIONS_COLUMNS = ["titleId", "region"]
+# attributes of a person in the merge_set, and the titles a person is known for
+PERSON_COLUMNS = [
+    "name_surname",
+    "birth",
+    "first_profession",
+    "second_profession",
+    "third_profession",
+]
+KNOWN_FOR_COLUMNS = ["movie_1", "movie_2", "movie_3", "movie_4"]
+
+# every column is read as text: the values are written to the csv files exactly as they appear
+# in the dump, so the streaming and the single pass modes produce identical files
+ROLES_DTYPES = {column: str for column in ROLES_COLUMNS}
+MOVIES_DTYPES = {column: str for column in MOVIES_COLUMNS}
+REGIONS_DTYPES = {column: str for column in REGIONS_COLUMNS}
+
+SAMPLE_ROWS = 10_000  # rows parsed to estimate the memory used by a single row
+CHUNK_OVERHEAD = 4  # a chunk needs roughly 4x its parsed size while being split and filtered
+MIN_CHUNKSIZE = 1_000
+
+
+class StageTimer:
+    """
+    Records the wall-clock time of the stages of a build.
+
+    Attributes:
+        times: Seconds spent in every stage by stage name, in execution order.
+
+    Methods:
+        stage(name): Context manager timing a stage.
+        report(): Returns the table of the stage times.
+    """
+
+    def __init__(self):
+        self.times = {}
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times the block of code of a stage.
+
+        Args:
+            name: Name of the stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[name] = self.times.get(name, 0) + time.perf_counter() - start
+
+    def report(self):
+        """
+        Returns the table of the stage times, with their share of the total time.
+        """
+        total = sum(self.times.values())
+        lines = [f"{'stage':<12}{'seconds':>10}{'share':>8}"]
+        for name, seconds in self.times.items():
+            lines.append(f"{name:<12}{seconds:>10.2f}{seconds / max(total, 1e-9):>8.0%}")
+        lines.append(f"{'total':<12}{total:>10.2f}")
+        return "\n".join(lines)
+
+
+def download_dataset():
+    """
+    Downloads the IMDb dump from Kaggle into 'data_dir'.
+    """
+    import opendatasets as od  # type: ignore
+
+    od.download(dataset)
+    os.listdir(data_dir)
+
+
+def estimate_chunksize(path, usecols, dtype, memory_budget):
+    """
+    Estimates how many rows of a TSV file fit in the given memory budget.
+
+    Args:
+        path: Path of the TSV file.
+        usecols: Columns that will be read from the file.
+        dtype: Dtypes used to read the columns.
+        memory_budget: Memory (in bytes) a single chunk is allowed to use.
+
+    Returns:
+        The number of rows per chunk.
+    """
+    sample = pd.read_table(
+        path, sep="\t", usecols=usecols, dtype=dtype, na_values="\\N", nrows=SAMPLE_ROWS
+    )
+    row_bytes = sample.memory_usage(deep=True).sum() / max(len(sample), 1)
+    return max(MIN_CHUNKSIZE, int(memory_budget / (row_bytes * CHUNK_OVERHEAD)))
+
+
+def read_tsv(path, usecols, dtype, chunksize=None, memory_budget=None, names=None):
+    """
+    Reads a TSV file of the IMDb dump, either in a single pass or in bounded chunks.
+
+    Args:
+        path: Path of the TSV file.
+        usecols: Columns to read.
+        dtype: Dtypes used to read the columns.
+        chunksize: Number of rows per chunk, None reads the whole file at once.
+        memory_budget: Memory (in bytes) a single chunk is allowed to use,
+                       used to compute the chunksize when it is not given.
+        names: Names of the columns when the file has no header (a shard of a TSV file).
+
+    Returns:
+        An iterator over the chunks of the file (a single chunk in single pass mode).
+    """
+    if chunksize is None and memory_budget is not None:
+        chunksize = estimate_chunksize(path, usecols, dtype, memory_budget)
+    reader = pd.read_table(
+        path,
+        sep="\t",
+        usecols=usecols,
+        dtype=dtype,
+        na_values="\\N",  # '\N' marks the missing values in the dump
+        chunksize=chunksize,
+        names=names,
+        header=None if names else "infer",
+    )
+    if chunksize is None:
+        return iter([reader])
+    return reader
+
+
+def split_column(column, n_columns):
+    """
+    Splits a comma separated column into a fixed number of sub-columns.
+
+    A chunk may not contain a row with the maximum number of items,
+    so the result is always padded to 'n_columns' columns.
+
+    Args:
+        column: A pandas Series of comma separated strings.
+        n_columns: Number of sub-columns to produce.
+
+    Returns:
+        A DataFrame with 'n_columns' columns.
+    """
+    return column.str.split(",", expand=True).reindex(columns=range(n_columns))
+
+
+def clean_roles(chunk):
+    """
+    Cleans a chunk of 'name.basics.tsv'.
+
+    Args:
+        chunk: A DataFrame with the columns in ROLES_COLUMNS.
+
+    Returns:
+        The cleaned chunk.
+    """
+    chunk = chunk.dropna()  # drop all the missing values
+    chunk[["first_profession", "second_profession", "third_profession"]] = split_column(
+        chunk["primaryProfession"], 3
+    )  # divide 'primaryProfession' in 3 sub-columns
+    chunk[["movie_1", "movie_2", "movie_3", "movie_4"]] = split_column(
+        chunk["knownForTitles"], 4
+    )  # divide 'knownForTitles' in 4 sub-columns
+    chunk = chunk.drop(["primaryProfession", "knownForTitles"], axis=1)
+    return chunk.rename(
+        columns={
+            "nconst": "name_id",
+            "primaryName": "name_surname",
+            "birthYear": "birth",
+        }
+    )  # rename some initial columns
+
+
+def clean_movies(chunk):
+    """
+    Cleans a chunk of 'title.basics.tsv'.
+
+    Args:
+        chunk: A DataFrame with the columns in MOVIES_COLUMNS.
+
+    Returns:
+        The cleaned chunk.
+    """
+    chunk = chunk.loc[
+        chunk["titleType"].isin(MOVIE_TYPES)
+    ]  # keep only tv series and movies in the dataset
+    chunk = chunk.dropna()  # drop all the missing values
+    chunk[["genre_1", "genre_2", "genre_3"]] = split_column(
+        chunk["genres"], 3
+    )  # split the 'genres' variable in 3 sub-columns
+    chunk = chunk.drop(["genres"], axis=1)
+    chunk = chunk.rename(
+        columns={
+            "tconst": "movie_id",
+            "titleType": "type",
+            "primaryTitle": "title",
+            "isAdult": "adult",
+            "startYear": "start_year",
+            "runtimeMinutes": "minutes_runtimes",
+        }
+    )  # rename some initial variables
+    chunk["type"] = chunk["type"].replace({"tvSeries": "tv series"})
+    return chunk
+
+
+def clean_regions(chunk, movie_ids=None):
+    """
+    Cleans a chunk of 'title.akas.tsv'.
+
+    Args:
+        chunk: A DataFrame with the columns in REGIONS_COLUMNS.
+        movie_ids: Ids of the titles to keep, None keeps every title.
+
+    Returns:
+        The cleaned chunk.
+    """
+    chunk = chunk.dropna()  # drop all the missing values
+    if movie_ids is not None:
+        chunk = chunk.loc[chunk["titleId"].isin(movie_ids)]  # only movies and tv series
+    return chunk.rename(columns={"titleId": "movie_id"})
+
+
+def load_roles(path, chunksize=None, memory_budget=None):
+    """
+    Loads and cleans the dataset regarding people ('name.basics.tsv').
+
+    Args:
+        path: Path of the TSV file.
+        chunksize: Number of rows per chunk, None reads the whole file at once.
+        memory_budget: Memory (in bytes) a single chunk is allowed to use.
+
+    Returns:
+        The roles DataFrame.
+    """
+    chunks = read_tsv(path, ROLES_COLUMNS, ROLES_DTYPES, chunksize, memory_budget)
+    return pd.concat([clean_roles(chunk) for chunk in chunks], ignore_index=True)
+
+
+def load_movies(path, chunksize=None, memory_budget=None):
+    """
+    Loads and cleans the dataset regarding movies and tv series ('title.basics.tsv').
+
+    Args:
+        path: Path of the TSV file.
+        chunksize: Number of rows per chunk, None reads the whole file at once.
+        memory_budget: Memory (in bytes) a single chunk is allowed to use.
+
+    Returns:
+        The movies DataFrame.
+    """
+    chunks = read_tsv(path, MOVIES_COLUMNS, MOVIES_DTYPES, chunksize, memory_budget)
+    return pd.concat([clean_movies(chunk) for chunk in chunks], ignore_index=True)
+
+
+def load_regions(path, movie_ids=None, chunksize=None, memory_budget=None):
+    """
+    Loads and cleans the dataset about the states where the titles are released ('title.akas.tsv').
+
+    Args:
+        path: Path of the TSV file.
+        movie_ids: Ids of the titles to keep, None keeps every title.
+        chunksize: Number of rows per chunk, None reads the whole file at once.
+        memory_budget: Memory (in bytes) a single chunk is allowed to use.
+
+    Returns:
+        The regions DataFrame.
+    """
+    chunks = read_tsv(path, REGIONS_COLUMNS, REGIONS_DTYPES, chunksize, memory_budget)
+    return pd.concat([clean_regions(chunk, movie_ids) for chunk in chunks], ignore_index=True)
+
+
+def file_shards(path, n_shards):
+    """
+    Splits a TSV file into byte ranges of whole lines, the header excluded.
+
+    The dump is sorted by key, so every shard holds a contiguous range of keys.
+
+    Args:
+        path: Path of the TSV file.
+        n_shards: Number of shards.
+
+    Returns:
+        The column names of the file and a list of (start, end) byte offsets.
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as tsv:
+        names = tsv.readline().decode().rstrip("\r\n").split("\t")
+        bounds = [tsv.tell()]
+        for i in range(1, n_shards):
+            tsv.seek(max(size * i // n_shards, bounds[-1]))
+            tsv.readline()  # move to the start of the next line
+            bounds.append(min(tsv.tell(), size))
+        bounds.append(size)
+    return names, [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def load_shard(path, start, end, names, usecols, dtype, clean):
+    """
+    Reads and cleans a shard of a TSV file, in a worker process.
+
+    Args:
+        path: Path of the TSV file.
+        start: Offset of the first byte of the shard.
+        end: Offset of the byte after the shard.
+        names: Column names of the file.
+        usecols: Columns to read.
+        dtype: Dtypes used to read the columns.
+        clean: The cleaning function of the file (clean_roles or clean_movies).
+
+    Returns:
+        The cleaned shard.
+    """
+    with open(path, "rb") as tsv:
+        tsv.seek(start)
+        shard = io.BytesIO(tsv.read(end - start))
+    return clean(next(read_tsv(shard, usecols, dtype, names=names)))
+
+
+def submit_shards(executor, path, usecols, dtype, clean, n_shards):
+    """
+    Submits the loading of every shard of a TSV file to a process pool.
+
+    Args:
+        executor: A ProcessPoolExecutor.
+        path: Path of the TSV file.
+        usecols: Columns to read.
+        dtype: Dtypes used to read the columns.
+        clean: The cleaning function of the file.
+        n_shards: Number of shards.
+
+    Returns:
+        The list of futures of the cleaned shards, in file order.
+    """
+    names, shards = file_shards(path, n_shards)
+    return [
+        executor.submit(load_shard, path, start, end, names, usecols, dtype, clean)
+        for start, end in shards
+    ]
+
+
+def gather_shards(futures):
+    """
+    Concatenates the cleaned shards of a TSV file, in file order.
+    """
+    return pd.concat([future.result() for future in futures], ignore_index=True)
+
+
+def build_merge_set(roles_df, movie_df):
+    """
+    Joins people and movies on the titles each person is known for.
+
+    The 'movie_1', ..., 'movie_4' columns are melted into a single long table of
+    (person, movie) pairs, which is joined once against the movies indexed by 'movie_id'.
+    People sharing every attribute get the same person id, so duplicated rows are removed
+    on the (person, movie) pairs instead of on every column of the result.
+    Rows come out in the same order as the four separate joins on 'movie_1', ..., 'movie_4'.
+
+    Args:
+        roles_df: The roles DataFrame.
+        movie_df: The movies DataFrame.
+
+    Returns:
+        The merge_set DataFrame.
+    """
+    movie_index = pd.Index(movie_df["movie_id"])
+    # long table: one (row, movie) pair for every title a person is known for,
+    # ordered by movie_1, ..., movie_4 as the concatenation of the four joins was
+    rows = np.tile(np.arange(len(roles_df)), len(KNOWN_FOR_COLUMNS))
+    movie_rows = np.concatenate(
+        [movie_index.get_indexer(roles_df[movie]) for movie in KNOWN_FOR_COLUMNS]
+    )  # position of each title in movie_df, -1 if the title is not in movie_df
+    matched = movie_rows >= 0  # inner join
+    rows = rows[matched]
+    movie_rows = movie_rows[matched]
+
+    # only the people with at least one matching title are kept
+    used = np.unique(rows)
+    rows = np.searchsorted(used, rows)
+    people = roles_df[PERSON_COLUMNS].iloc[used].reset_index(drop=True)
+    people["first_profession"] = people["first_profession"].str.replace("_", " ")
+    person_id = (
+        people.groupby(PERSON_COLUMNS, dropna=False, sort=False).ngroup().to_numpy()
+    )  # same id for people with identical attributes
+
+    pair_key = person_id[rows].astype(np.int64) * len(movie_df) + movie_rows
+    first = ~pd.Series(pair_key).duplicated().to_numpy()  # drop duplicates
+    rows = rows[first]
+    movie_rows = movie_rows[first]
+
+    merge_set = pd.concat(
+        [
+            people.iloc[rows].reset_index(drop=True),
+            movie_df.iloc[movie_rows].reset_index(drop=True),
+        ],
+        axis=1,
+    )
+    merge_set["start_year"] = (
+        pd.to_numeric(merge_set["start_year"], errors="coerce").fillna(0).astype(int)
+    )  # convert 'start_year' variable into numeric type
+    return merge_set
+
+
+def build_game_set(merge_set):
+    """
+    Builds the game_set from the merge_set.
+
+    Args:
+        merge_set: The merge_set DataFrame.
+
+    Returns:
+        The game_set DataFrame.
+    """
+    game_set = merge_set.drop(
+        ["region"], axis=1, errors="ignore"
+    )  # drop the region variable from the game set since will not be used for the quiz game
+    game_set.drop_duplicates(
+        inplace=True
+    )  # remove all the duplicates that the variable 'region' has
+    return game_set
+
+
+def build_region_set(region_df, merge_set):
+    """
+    Builds the region_set: the regions where every title of the merge_set was released.
+
+    Args:
+        region_df: The regions DataFrame.
+        merge_set: The merge_set DataFrame.
+
+    Returns:
+        The region_set DataFrame, with the columns 'movie_id' and 'region'.
+    """
+    region_set = region_df.loc[
+        region_df["movie_id"].isin(merge_set["movie_id"].unique())
+    ]  # inner join between merge_set and region_df
+    # a title has one row for every title and language it was released with in a region
+    return region_set.drop_duplicates().reset_index(drop=True)
+
+
+def build_region_counts(region_set, merge_set):
+    """
+    Counts the titles released in every region, by type.
+
+    Args:
+        region_set: The region_set DataFrame.
+        merge_set: The merge_set DataFrame.
+
+    Returns:
+        A DataFrame with the columns 'type', 'region' and 'frequency'.
+    """
+    types = merge_set.drop_duplicates("movie_id").set_index("movie_id")["type"]
+    counts = (
+        region_set.assign(type=region_set["movie_id"].map(types).to_numpy())
+        .groupby(["type", "region"])
+        .size()
+        .rename("frequency")
+        .reset_index()
+    )
+    return counts.sort_values(
+        ["type", "frequency", "region"], ascending=[True, False, True], ignore_index=True
+    )
+
+
+def saved(output_dir="."):
+    """
+    Returns whether the datasets of a build are saved in a folder.
+    """
+    names = ["merge_set", "game_set", "region_set", "region_counts"]
+    return all(os.path.exists(os.path.join(output_dir, f"{name}.parquet")) for name in names)
+
+
+def build(
+    data_dir=data_dir,
+    output_dir=".",
+    chunksize=None,
+    memory_budget=None,
+    workers=1,
+    incremental=False,
+    state_dir="build_state",
+    timer=None,
+):
+    """
+    Builds the merge_set, the game_set and the question pools from the TSV files.
+
+    Args:
+        data_dir: Folder with the IMDb TSV files.
+        output_dir: Folder where the datasets and the pools are written.
+        chunksize: Number of rows per chunk in streaming mode.
+        memory_budget: Memory (in bytes) a chunk may use in streaming mode.
+        workers: Number of worker processes, 1 runs every stage in this process.
+        incremental: Whether to only process the rows changed since the previous build.
+        state_dir: Folder of the state of the previous build (incremental mode).
+        timer: A StageTimer recording the time of every stage.
+
+    Returns:
+        The StageTimer.
+    """
+    timer = timer or StageTimer()
+    roles_path = os.path.join(data_dir, "name.basics.tsv")
+    movies_path = os.path.join(data_dir, "title.basics.tsv")
+    regions_path = os.path.join(data_dir, "title.akas.tsv")
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        with timer.stage("load"):
+            if incremental:
+                from incremental import incremental_build  # type: ignore
+
+                # the state is saved once the datasets are written, see below
+                result = incremental_build(data_dir, state_dir, save=False)
+                merge_set, region_df = result.merge_set, result.region_df
+            elif executor is not None:
+                # both files are loaded at the same time, every shard in its own worker
+                roles_shards = submit_shards(
+                    executor, roles_path, ROLES_COLUMNS, ROLES_DTYPES, clean_roles, workers
+                )
+                movie_shards = submit_shards(
+                    executor, movies_path, MOVIES_COLUMNS, MOVIES_DTYPES, clean_movies, workers
+                )
+                region_shards = submit_shards(
+                    executor,
+                    regions_path,
+                    REGIONS_COLUMNS,
+                    REGIONS_DTYPES,
+                    clean_regions,
+                    workers,
+                )
+                roles_df = gather_shards(roles_shards)  # dataset regarding people
+                movie_df = gather_shards(movie_shards)  # dataset regarding movies
+                region_df = gather_shards(region_shards)  # dataset regarding regions
+            else:
+                roles_df = load_roles(
+                    roles_path, chunksize, memory_budget
+                )  # dataset regarding people
+                movie_df = load_movies(
+                    movies_path, chunksize, memory_budget
+                )  # dataset regarding movies
+                region_df = load_regions(
+                    regions_path, movie_df["movie_id"], chunksize, memory_budget
+                )  # dataset about the states where tv series and movies are released
+
+        if incremental and not result.changed and saved(output_dir):
+            print("the dump did not change since the previous build, nothing to write")
+            return timer
+        if not incremental:
+            with timer.stage("merge_set"):
+                merge_set = build_merge_set(roles_df, movie_df)
+                del roles_df, movie_df
+        with timer.stage("game_set"):
+            # typed as the loaders return it: smaller for the stats and pools stages
+            if incremental:
+                game_set = result.game_set  # only the new rows were typed
+            else:
+                game_set = apply_schema(build_game_set(merge_set))
+        with timer.stage("regions"):
+            region_set = build_region_set(region_df, merge_set)
+            del region_df
+            region_counts = build_region_counts(region_set, merge_set)
+        with timer.stage("save"):
+            # save the datasets as csv and parquet files, region_counts will be used for geopandas maps
+            save_dataset(merge_set, "merge_set", output_dir, executor, workers)
+            save_dataset(game_set, "game_set", output_dir, executor, workers)
+            save_dataset(region_set, "region_set", output_dir, executor, workers)
+            save_dataset(region_counts, "region_counts", output_dir)
+        with timer.stage("stats"):
+            # aggregates of the notebook, keyed by a hash of the files just saved
+            build_stats_cache(output_dir, game_set, region_counts)
+        with timer.stage("pools"):
+            pools = build_pools(game_set, output_dir)  # save the question pools of every level
+        with timer.stage("snapshot"):
+            # memory-mapped copy of the pools, for the servers and the fast start of the game
+            publish(pools, os.path.join(output_dir, SNAPSHOT_DIR))
+            del pools
+        with timer.stage("lookup"):
+            build_lookup(game_set, output_dir)  # index of the names and titles, in 'lookup/'
+        if incremental:
+            with timer.stage("state"):
+                from incremental import save_state  # type: ignore
+
+                save_state(result.state, state_dir)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the merge_set and game_set datasets")
+    parser.add_argument("--data-dir", default=data_dir, help="folder with the IMDb TSV files")
+    parser.add_argument(
+        "--no-download", action="store_true", help="use the TSV files already in --data-dir"
+    )
+    parser.add_argument(
+        "--streaming", action="store_true", help="read the TSV files in bounded chunks"
+    )
+    parser.add_argument("--chunksize", type=int, help="rows per chunk in streaming mode")
+    parser.add_argument(
+        "--memory-budget", type=int, help="memory (MB) a chunk may use in streaming mode"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only process the rows changed since the previous build (see incremental.py)",
+    )
+    parser.add_argument(
+        "--state-dir", default="build_state", help="folder of the state of the previous build"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="worker processes for the parallel mode"
+    )
+    args = parser.parse_args()
+
+    if not args.no_download:
+        download_dataset()
+
+    chunksize = None
+    memory_budget = None
+    if args.streaming or args.chunksize or args.memory_budget:
+        chunksize = args.chunksize
+        # 256 MB per chunk when streaming without an explicit size
+        memory_budget = (args.memory_budget or 256) * 1024**2
+
+    timer = build(
+        args.data_dir,
+        ".",
+        chunksize,
+        memory_budget,
+        args.workers,
+        args.incremental,
+        args.state_dir,
+    )
+    print(timer.report())
+
+
+if __name__ == "__main__":
+    main()
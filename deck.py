@@ -0,0 +1,220 @@
+"""
+deck.py
+
+This module generates whole quizzes (decks of questions) without any user interaction.
+
+A deck is a list of DeckItem (question, correct answer, answer choices and kind of answer).
+All the items of a deck, or of many decks, are generated in one vectorized pass:
+the rows and the kinds of question are sampled with NumPy, the question strings are
+formatted in bulk per kind and the incorrect answers are drawn as whole arrays,
+so decks can be pre-generated ahead of time and served without touching pandas.
+
+Running this file writes pre-generated decks as JSON lines:
+    python deck.py --difficulty easy --decks 1000 --questions 10 --seed 42
+"""
+
+import json  # type: ignore
+import time  # type: ignore
+import argparse  # type: ignore
+from collections import namedtuple  # type: ignore
+import numpy as np  # type: ignore
+from pools import DIFFICULTIES, load_pool  # type: ignore
+from row_store import RowStore  # type: ignore
+from distractors import ANSWER_KINDS, DistractorIndex  # type: ignore
+
+DeckItem = namedtuple("DeckItem", ["question", "correct_answer", "choices", "kind"])
+
+# questions asked by the game (QuizGame.first_question, ..., QuizGame.fourth_question),
+# by kind of answer: template and columns used to fill it
+QUESTION_TEMPLATES = {
+    "start_year": (
+        "In which year was the {} '{}' of {} as a {} component produced ?",
+        ["type", "title", "name_surname", "first_profession"],
+    ),
+    "genre_1": (
+        "What genre is the {} '{}' made in {} of {} as a {} component ?",
+        ["type", "title", "start_year", "name_surname", "first_profession"],
+    ),
+    "title": (
+        "What was the title of the {} made in {} with {} as a {} component ?",
+        ["type", "start_year", "name_surname", "first_profession"],
+    ),
+    "name_surname": (
+        "Who was the {} of the {} named '{}' made in {} ?",
+        ["first_profession", "type", "title", "start_year"],
+    ),
+}
+SMALL_OFFSETS = np.arange(1, 10)
+LARGE_OFFSETS = np.arange(10, 55, 5)
+
+
+def column_values(store, column, rows):
+    """
+    Reads the values of a column of a row store at many rows at once.
+
+    Args:
+        store: A RowStore.
+        column: Name of the column.
+        rows: NumPy array of row positions.
+
+    Returns:
+        A NumPy array of values.
+    """
+    codes = store.codes.get(column)
+    if codes is None:
+        return store.values[column][rows]
+    return store.values[column][codes[rows]]
+
+
+def incorrect_years(rng, correct):
+    """
+    Draws three incorrect years for every correct year, as QuizGame does.
+
+    Args:
+        rng: A numpy random Generator.
+        correct: NumPy array of correct years.
+
+    Returns:
+        A NumPy array with three incorrect years per row.
+    """
+    n = len(correct)
+    incorrect = np.column_stack(
+        [
+            correct - rng.choice(SMALL_OFFSETS, size=n),
+            correct + rng.choice(SMALL_OFFSETS, size=n),
+            correct - rng.choice(LARGE_OFFSETS, size=n),
+        ]
+    )
+    # ensuring that the option years do not exceed the current year
+    return np.minimum(incorrect, time.localtime().tm_year - 1)
+
+
+def incorrect_values(rng, values, correct):
+    """
+    Draws three distinct incorrect answers for every correct answer.
+
+    Rows where a drawn value is the correct answer or is drawn twice are redrawn,
+    only those rows, until every row is valid.
+
+    Args:
+        rng: A numpy random Generator.
+        values: NumPy array of the unique values the answers are drawn from.
+        correct: NumPy array of correct answers.
+
+    Returns:
+        A NumPy array with three incorrect answers per row.
+    """
+    n = len(correct)
+    if len(values) <= 4:
+        # not enough values to choose from: use every other value, padding with the missing ones
+        incorrect = np.empty((n, 3), dtype=object)
+        for i, answer in enumerate(correct):
+            others = [value for value in values if value != answer][:3]
+            incorrect[i] = others + [None] * (3 - len(others))
+        return incorrect
+    picks = rng.integers(0, len(values), size=(n, 3))
+    pending = np.arange(n)
+    while len(pending):
+        drawn = values[picks[pending]]
+        bad = (
+            (drawn == correct[pending, None]).any(axis=1)
+            | (picks[pending, 0] == picks[pending, 1])
+            | (picks[pending, 0] == picks[pending, 2])
+            | (picks[pending, 1] == picks[pending, 2])
+        )
+        pending = pending[bad]
+        picks[pending] = rng.integers(0, len(values), size=(len(pending), 3))
+    return values[picks]
+
+
+def generate_decks(store, distractors, n_decks, n_questions, seed=None):
+    """
+    Generates many decks of questions in one vectorized pass.
+
+    As in QuizGame.quiz(), the four kinds of question are shuffled once per deck and
+    then asked in turn.
+
+    Args:
+        store: The RowStore of the pool the questions are drawn from.
+        distractors: The DistractorIndex of the same pool.
+        n_decks: Number of decks.
+        n_questions: Number of questions per deck.
+        seed: Seed of the random generator, the same seed gives the same decks.
+
+    Returns:
+        A list of decks, each one a list of DeckItem.
+    """
+    rng = np.random.default_rng(seed)
+    n = n_decks * n_questions
+    rows = rng.integers(0, store.size, size=n)
+    orders = rng.permuted(np.tile(np.arange(len(ANSWER_KINDS)), (n_decks, 1)), axis=1)
+    kinds = orders[:, np.arange(n_questions) % len(ANSWER_KINDS)].ravel()
+
+    questions = np.empty(n, dtype=object)
+    correct = np.empty(n, dtype=object)
+    choices = np.empty((n, 4), dtype=object)
+    for k, kind in enumerate(ANSWER_KINDS):
+        positions = np.flatnonzero(kinds == k)
+        if not len(positions):
+            continue
+        kind_rows = rows[positions]
+        template, columns = QUESTION_TEMPLATES[kind]
+        questions[positions] = [
+            template.format(*fields)
+            for fields in zip(*(column_values(store, c, kind_rows).tolist() for c in columns))
+        ]
+        answers = column_values(store, kind, kind_rows)
+        if kind == "start_year":
+            incorrect = incorrect_years(rng, answers)
+        else:
+            incorrect = incorrect_values(rng, distractors.values[kind], answers)
+        options = np.column_stack([answers, incorrect]).astype(object)
+        correct[positions] = answers.tolist()
+        choices[positions] = rng.permuted(options, axis=1)  # shuffle the choices of every row
+
+    kind_names = np.array(ANSWER_KINDS, dtype=object)[kinds]
+    items = [
+        DeckItem(question, answer, [c for c in options if c is not None], kind)
+        for question, answer, options, kind in zip(
+            questions.tolist(), correct.tolist(), choices.tolist(), kind_names.tolist()
+        )
+    ]
+    return [items[i : i + n_questions] for i in range(0, n, n_questions)]
+
+
+def generate_deck(store, distractors, n_questions, seed=None):
+    """
+    Generates a single deck of questions.
+
+    Args:
+        store: The RowStore of the pool the questions are drawn from.
+        distractors: The DistractorIndex of the same pool.
+        n_questions: Number of questions.
+        seed: Seed of the random generator, the same seed gives the same deck.
+
+    Returns:
+        A list of DeckItem.
+    """
+    return generate_decks(store, distractors, 1, n_questions, seed)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate quiz decks as JSON lines")
+    parser.add_argument("--difficulty", choices=DIFFICULTIES, required=True)
+    parser.add_argument("--decks", type=int, default=1000)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--output", help="output file, decks_<difficulty>.jsonl by default")
+    args = parser.parse_args()
+
+    store = RowStore(load_pool(args.difficulty))
+    decks = generate_decks(
+        store, DistractorIndex(store), args.decks, args.questions, args.seed
+    )
+    with open(args.output or f"decks_{args.difficulty}.jsonl", "w") as output:
+        for deck in decks:
+            output.write(json.dumps([item._asdict() for item in deck]) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+distractors.py
+
+This module contains the index the incorrect answer choices (distractors) are drawn from.
+
+The index is built once per pool from its row store: it keeps the array of unique values
+of every column a question can ask about, so drawing the three distractors of a question
+costs a few random integers, with no scan of the dataset.
+The kind of answer (year, genre, title or name) is given by the question that was asked,
+so a title that happens to be equal to a genre name still gets titles as distractors.
+"""
+
+import time  # type: ignore
+import random  # type: ignore
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+
+# kinds of answer, named after the column holding the correct answer
+ANSWER_KINDS = ["start_year", "genre_1", "title", "name_surname"]
+
+
+class DistractorIndex:
+    """
+    Unique values of the answer columns of a pool, used to draw incorrect answers.
+
+    Attributes:
+        values: Array of the unique values of every answer column, by column name.
+
+    Methods:
+        __init__(store, values): Builds the index from a RowStore.
+        incorrect_answers(correct_answer, kind): Draws three incorrect answers.
+        choices(correct_answer, kind): Returns the shuffled answer choices of a question.
+    """
+
+    __slots__ = ("values",)
+
+    def __init__(self, store, values=None):
+        """
+        Builds the index from the columns of a row store.
+
+        Args:
+            store: The RowStore of a pool.
+            values: Unique values of the answer columns by column name, when they are already
+                    known (e.g. the dictionaries of a shared snapshot); computed from the store otherwise.
+        """
+        self.values = dict(values or {})
+        for column in ANSWER_KINDS[1:]:  # years are not drawn from the dataset
+            if column in self.values:
+                continue
+            codes = store.codes.get(column)
+            if codes is None:
+                self.values[column] = pd.unique(store.values[column])
+            else:
+                # only the categories that appear in the pool
+                self.values[column] = store.values[column][np.unique(codes[codes >= 0])]
+
+    def incorrect_answers(self, correct_answer, kind):
+        """
+        Draws three incorrect answers of the given kind.
+
+        Args:
+            correct_answer: The correct answer for the question.
+            kind: The kind of answer, one of ANSWER_KINDS.
+
+        Returns:
+            A list of three incorrect answers (fewer if the pool does not have enough values).
+        """
+        if kind == "start_year":
+            # generate incorrect answers by slightly modifying the correct year
+            incorrect_ans = [
+                # adding random noise for incorrect answers(subtract or add small values)
+                correct_answer - random.choice([1, 2, 3, 4, 5, 6, 7, 8, 9]),
+                correct_answer + random.choice([1, 2, 3, 4, 5, 6, 7, 8, 9]),
+                correct_answer - random.choice([10, 15, 20, 25, 30, 35, 40, 45, 50]),
+            ]
+            # ensuring that the option years do not exceed the current year
+            last_year = time.localtime().tm_year - 1
+            return [min(i, last_year) for i in incorrect_ans]
+
+        values = self.values[kind]
+        if len(values) <= 4:
+            # not enough values to choose from: use every other value
+            others = [value for value in values if value != correct_answer]
+            return random.sample(others, min(3, len(others)))
+        incorrect_ans = []
+        while len(incorrect_ans) < 3:
+            # draw random unique values, skipping the correct answer and repeated values
+            candidate = values[random.randrange(len(values))]
+            if candidate != correct_answer and candidate not in incorrect_ans:
+                incorrect_ans.append(candidate)
+        return incorrect_ans
+
+    def choices(self, correct_answer, kind):
+        """
+        Returns the answer choices of a question: the correct answer and three incorrect ones.
+
+        Args:
+            correct_answer: The correct answer for the question.
+            kind: The kind of answer, one of ANSWER_KINDS.
+
+        Returns:
+            A shuffled list of answer choices.
+        """
+        options = [correct_answer] + self.incorrect_answers(correct_answer, kind)
+        random.shuffle(options)  # shuffle the choices to randomize their order
+        return options
@@ -0,0 +1,467 @@
+"""
+engine.py
+
+This module contains the headless engine of the quiz game.
+
+The engine holds the game rules and state machine without any input() or print():
+a game is started with start_game(), then next_question() and submit_answer() are called
+once per round and finish() returns the final summary. Every operation returns a
+structured result (named tuples), so the same engine can be driven by the terminal
+interface in quiz.py, by a server or by a load test.
+"""
+
+import time  # type: ignore
+import random  # type: ignore
+from collections import namedtuple  # type: ignore
+from dataset_io import GAME_COLUMNS, load_dataset  # type: ignore
+from pools import DIFFICULTIES, LEVELS, load_pool  # type: ignore
+from category_index import INDEXED_COLUMNS, CategoryIndex  # type: ignore
+from row_store import RowStore  # type: ignore
+from distractors import ANSWER_KINDS, DistractorIndex  # type: ignore
+from deck import QUESTION_TEMPLATES  # type: ignore
+from question_cache import CachedQuestion, shuffled  # type: ignore
+from sampler import WEIGHTINGS, RowSampler  # type: ignore
+from schema import apply_schema  # type: ignore
+
+# columns of the whole dataset: the questions and every column a custom level can filter on
+DATASET_COLUMNS = GAME_COLUMNS + [c for c in INDEXED_COLUMNS if c not in GAME_COLUMNS]
+# points lost for an incorrect answer at each difficulty level
+PENALTIES = {"easy": 0, "medium": 0.5, "hard": 1}
+RULES = {
+    "easy": "+1 if you are correct, 0 otherwise",
+    "medium": "+1 if you are correct, -0.5 otherwise",
+    "hard": "+1 if you are correct, -1 otherwise",
+}
+
+Question = namedtuple("Question", ["number", "question", "choices", "kind"])
+AnswerResult = namedtuple(
+    "AnswerResult", ["correct", "chosen_answer", "correct_answer", "score", "finished"]
+)
+GameSummary = namedtuple(
+    "GameSummary", ["score", "n_round", "difficulty", "time_involved", "medal"]
+)
+
+
+class GameSession:
+    """
+    The state of a single game: difficulty, rounds, score and the pending question.
+
+    Attributes:
+        difficulty: The difficulty level of the game.
+        n_round: Number of rounds of the game.
+        round_number: Number of questions asked so far.
+        score: The current score.
+        kinds: Order in which the kinds of question are asked.
+        correct_answer: Correct answer of the pending question, None if there is none.
+        choices: Answer choices of the pending question.
+        start_time: Time at which the game started.
+        seen: Keys of the titles already asked, so that the game does not repeat them.
+        player: Name of the player, recorded with the results of the game.
+        game_id: Id of the game in the results store, None when the results are not recorded.
+    """
+
+    __slots__ = (
+        "difficulty",
+        "n_round",
+        "round_number",
+        "score",
+        "kinds",
+        "correct_answer",
+        "choices",
+        "start_time",
+        "seen",
+        "player",
+        "game_id",
+    )
+
+    def __init__(self, difficulty, n_round, kinds, player=None, game_id=None):
+        self.difficulty = difficulty
+        self.n_round = n_round
+        self.round_number = 0
+        self.score = 0
+        self.kinds = kinds
+        self.correct_answer = None
+        self.choices = None
+        self.start_time = time.time()
+        self.seen = set()
+        self.player = player
+        self.game_id = game_id
+
+
+def update_score(score, correct, dif):
+    """
+    Computes the score after an answer.
+
+    - For correct answers: +1 point.
+    - For incorrect answers: a penalty based on the difficulty level, the score never goes below 0.
+
+    Args:
+        score: The current score.
+        correct: Whether the answer is correct.
+        dif: The difficulty level of the game.
+
+    Returns:
+        The updated score.
+    """
+    if correct:
+        return score + 1
+    return max(score - PENALTIES[dif], 0)
+
+
+def medal(score, n_round, time_involved):
+    """
+    Rates a finished game.
+
+    Args:
+        score: The final score.
+        n_round: Number of rounds played.
+        time_involved: Seconds spent to complete the game.
+
+    Returns:
+        'gold' for a good and fast game, 'silver' for a good but slow one, 'bronze' otherwise.
+    """
+    if score / n_round > 0.6 and time_involved / n_round < 10:
+        return "gold"
+    if score / n_round > 0.6 and time_involved / n_round > 10:
+        return "silver"
+    return "bronze"
+
+
+class QuizEngine:
+    """
+    The quiz game without any input/output.
+
+    Attributes:
+        game_set: The full dataset the pools are computed from, None when the prebuilt
+                  pools are loaded instead.
+        data_dir: Folder where the pools and the game_set are stored.
+        pools: The pools of the difficulty levels already played.
+        stores: The row stores of the pools already played.
+        indexes: The distractor indexes of the pools already played.
+        question_cache: The QuestionCache of the rendered questions, None renders every question.
+        levels: The QuizFilter of every level that can be played, by name.
+        scoring: The difficulty level whose rules score every level, by name.
+        index: The CategoryIndex of the game_set, built when a pool is first selected from it.
+        weighting: How the rows of the questions are weighted, one of sampler.WEIGHTINGS.
+        samplers: The row samplers of the pools already played.
+        results: The ResultsStore the answers and the games are recorded in, None records nothing.
+
+    Methods:
+        __init__(dataset, data_dir, question_cache, weighting, results): Initializes the engine.
+        add_level(name, quiz_filter, scoring): Adds a custom level, selected by a QuizFilter.
+        category_index(): Returns the CategoryIndex of the game_set.
+        pool(dif): Returns the pool of questions of a difficulty level.
+        row_store(dif): Returns the row store of the pool of a difficulty level.
+        distractor_index(dif): Returns the distractor index of the pool of a difficulty level.
+        sampler(dif): Returns the row sampler of the pool of a difficulty level.
+        render(dif, kind, row): Renders the question of a given kind about a row.
+        question(dif, kind): Generates a question of a given kind and its correct answer.
+        rendered_question(dif, kind, seen): Generates a question with its choices, using the cache.
+        choices(dif, correct_answer, kind): Generates the answer choices of a question.
+        start_game(dif, n_round, player): Starts a new game.
+        next_question(session): Asks the next question of a game.
+        submit_answer(session, answer): Scores the answer to the pending question.
+        finish(session): Returns the summary of a finished game.
+    """
+
+    def __init__(
+        self, dataset=None, data_dir=".", question_cache=None, weighting="uniform", results=None
+    ):
+        """
+        Initializes the engine.
+
+        Args:
+            dataset: A pandas DataFrame containing the quiz dataset, converted to the types of
+                     schema.py. When it is not given, the prebuilt pool of each difficulty
+                     is loaded instead.
+            data_dir: Folder where the pools and the game_set are stored.
+            question_cache: A QuestionCache reused by next_question, None disables the cache.
+            weighting: How the rows of the questions are weighted (see sampler.py):
+                       'uniform', 'popularity' or 'recency'.
+            results: A ResultsStore (see results_store.py) the answers and the summaries of
+                     the games are recorded in, None records nothing.
+        """
+        if weighting not in WEIGHTINGS:
+            raise ValueError(f"unknown weighting '{weighting}'")
+        self.game_set = apply_schema(dataset) if dataset is not None else None
+        self.data_dir = data_dir
+        self.pools = {}
+        self.stores = {}
+        self.indexes = {}
+        self.question_cache = question_cache
+        self.levels = dict(LEVELS)
+        self.scoring = {dif: dif for dif in DIFFICULTIES}
+        self.index = None
+        self.weighting = weighting
+        self.samplers = {}
+        self.results = results
+
+    def add_level(self, name, quiz_filter, scoring="medium"):
+        """
+        Adds a custom level, e.g. the 90s horror movies with directors only.
+
+        Args:
+            name: Name of the level, used as the difficulty of its games.
+            quiz_filter: The QuizFilter selecting the questions of the level.
+            scoring: The difficulty level (easy, medium or hard) whose rules score the level.
+        """
+        if scoring not in DIFFICULTIES:
+            raise ValueError(f"unknown difficulty '{scoring}'")
+        self.levels[name] = quiz_filter
+        self.scoring[name] = scoring
+        for cache in (self.pools, self.stores, self.indexes, self.samplers):
+            cache.pop(name, None)  # the level may replace one already played
+
+    def category_index(self):
+        """
+        Returns the CategoryIndex of the game_set (the whole dataset when the prebuilt pools
+        are used), built the first time a pool is selected from it.
+        """
+        if self.index is None:
+            self.index = CategoryIndex(self.pool(None))
+        return self.index
+
+    def pool(self, dif):
+        """
+        Returns the pool of questions of a level.
+
+        The pool is selected from the game_set with the bitmap index (or loaded from its
+        prebuilt file for the easy, medium and hard levels) the first time the level is
+        played and then kept in memory, so replaying any level is instant.
+
+        Args:
+            dif: The level (easy, medium, hard or a custom level), None for the whole dataset.
+
+        Returns:
+            The pool as a pandas DataFrame.
+        """
+        if dif not in self.pools:
+            if dif is None:
+                self.pools[dif] = (
+                    self.game_set
+                    if self.game_set is not None
+                    else load_dataset("game_set", DATASET_COLUMNS, self.data_dir)
+                )
+            elif self.game_set is None and dif in DIFFICULTIES:
+                self.pools[dif] = load_pool(dif, self.data_dir)
+            else:
+                rows = self.category_index().rows(self.levels[dif])
+                self.pools[dif] = self.pool(None).iloc[rows]
+        return self.pools[dif]
+
+    def row_store(self, dif):
+        """
+        Returns the row store the questions of a difficulty level are generated from.
+
+        Like the pool, the store is built the first time the level is played.
+        """
+        if dif not in self.stores:
+            self.stores[dif] = RowStore(self.pool(dif))
+        return self.stores[dif]
+
+    def distractor_index(self, dif):
+        """
+        Returns the index the incorrect answers of a difficulty level are drawn from.
+
+        Like the pool, the index is built the first time the level is played.
+        """
+        if dif not in self.indexes:
+            self.indexes[dif] = DistractorIndex(self.row_store(dif))
+        return self.indexes[dif]
+
+    def sampler(self, dif):
+        """
+        Returns the sampler the rows of the questions of a difficulty level are drawn with.
+
+        Like the pool, the sampler is built the first time the level is played.
+        """
+        if dif not in self.samplers:
+            self.samplers[dif] = RowSampler(self.row_store(dif), self.weighting)
+        return self.samplers[dif]
+
+    def render(self, dif, kind, row):
+        """
+        Renders the question of a given kind about a row of the pool.
+
+        Args:
+            dif: The difficulty level, None for the whole dataset.
+            kind: The kind of answer the question asks for, one of ANSWER_KINDS.
+            row: Position of the row in the row store.
+
+        Returns:
+            The question string and the correct answer.
+        """
+        store = self.row_store(dif)
+        template, columns = QUESTION_TEMPLATES[kind]
+        question = template.format(*(store.get(column, row) for column in columns))
+        return question, store.get(kind, row)
+
+    def question(self, dif, kind):
+        """
+        Generates a question based on a random entry of the pool.
+
+        Args:
+            dif: The difficulty level, None for the whole dataset.
+            kind: The kind of answer the question asks for, one of ANSWER_KINDS.
+
+        Returns:
+            The question string and the correct answer.
+        """
+        row = self.sampler(dif).draw()  # select a random row
+        return self.render(dif, kind, row)
+
+    def rendered_question(self, dif, kind, seen=None):
+        """
+        Generates a question based on a random entry of the pool, with its answer choices.
+
+        With a question cache, a question already rendered for the same row is reused:
+        its choices are the same as the first time it was asked, in a new order.
+
+        Args:
+            dif: The difficulty level, None for the whole dataset.
+            kind: The kind of answer the question asks for, one of ANSWER_KINDS.
+            seen: The keys of the titles already asked in the game (see sampler.py),
+                  None allows repeats.
+
+        Returns:
+            The question string, the correct answer and the list of answer choices.
+        """
+        row = self.sampler(dif).draw(seen)  # select a random row
+        if self.question_cache is None:
+            question, correct_answer = self.render(dif, kind, row)
+            return question, correct_answer, self.choices(dif, correct_answer, kind)
+        key = (dif, kind, row)
+        entry = self.question_cache.get(key)
+        if entry is None:
+            question, correct_answer = self.render(dif, kind, row)
+            choices = tuple(self.choices(dif, correct_answer, kind))
+            entry = CachedQuestion(question, correct_answer, choices)
+            self.question_cache.put(key, entry)
+        return entry.question, entry.correct_answer, shuffled(entry.choices)
+
+    def choices(self, dif, correct_answer, kind):
+        """
+        Generates the answer choices of a question: the correct answer and three incorrect ones.
+
+        Args:
+            dif: The difficulty level, None for the whole dataset.
+            correct_answer: The correct answer for the question.
+            kind: The kind of answer, one of ANSWER_KINDS.
+
+        Returns:
+            A shuffled list of answer choices.
+        """
+        return self.distractor_index(dif).choices(correct_answer, kind)
+
+    def start_game(self, dif, n_round, player="anonymous"):
+        """
+        Starts a new game.
+
+        Args:
+            dif: The level (easy, medium, hard or a custom level).
+            n_round: Number of rounds to play.
+            player: Name of the player, recorded with the results of the game.
+
+        Returns:
+            The GameSession of the new game.
+        """
+        if dif not in self.levels:
+            raise ValueError(f"unknown difficulty '{dif}'")
+        if n_round <= 0:
+            raise ValueError("the number of rounds must be positive")
+        self.distractor_index(dif)  # prepare the pool before the clock starts
+        if self.row_store(dif).size == 0:
+            raise ValueError(f"no question matches the level '{dif}'")
+        n_titles = self.sampler(dif).n_titles
+        if n_round > n_titles:
+            # a game never asks twice about the same title
+            raise ValueError(f"the level '{dif}' has only {n_titles} titles to ask about")
+        # shuffle the kinds of question to randomize the types of questions asked
+        kinds = random.sample(ANSWER_KINDS, len(ANSWER_KINDS))
+        game_id = self.results.new_game_id() if self.results is not None else None
+        return GameSession(dif, n_round, kinds, player, game_id)
+
+    def next_question(self, session):
+        """
+        Asks the next question of a game.
+
+        Args:
+            session: The GameSession of the game.
+
+        Returns:
+            The Question to answer.
+        """
+        if session.round_number >= session.n_round:
+            raise ValueError("the game is over")
+        if session.correct_answer is not None:
+            raise ValueError("the previous question has not been answered yet")
+        kind = session.kinds[session.round_number % len(session.kinds)]
+        question, correct_answer, choices = self.rendered_question(
+            session.difficulty, kind, session.seen
+        )
+        session.correct_answer = correct_answer
+        session.choices = choices
+        session.round_number += 1
+        return Question(session.round_number, question, session.choices, kind)
+
+    def submit_answer(self, session, answer):
+        """
+        Scores the answer to the pending question of a game.
+
+        Args:
+            session: The GameSession of the game.
+            answer: The chosen answer, one of the choices of the question.
+
+        Returns:
+            The AnswerResult with the correct answer and the updated score.
+        """
+        if session.correct_answer is None:
+            raise ValueError("there is no question to answer")
+        correct_answer = session.correct_answer
+        correct = answer == correct_answer
+        session.score = update_score(session.score, correct, self.scoring[session.difficulty])
+        session.correct_answer = None
+        session.choices = None
+        if self.results is not None:  # queued, written in the background
+            kind = session.kinds[(session.round_number - 1) % len(session.kinds)]
+            self.results.record_answer(
+                session.game_id,
+                session.round_number,
+                kind,
+                correct,
+                answer,
+                correct_answer,
+                session.score,
+            )
+        return AnswerResult(
+            correct,
+            answer,
+            correct_answer,
+            session.score,
+            session.round_number >= session.n_round,
+        )
+
+    def finish(self, session):
+        """
+        Returns the summary of a finished game.
+
+        Args:
+            session: The GameSession of the game.
+
+        Returns:
+            The GameSummary with the final score, the time spent and the medal.
+        """
+        if session.round_number < session.n_round or session.correct_answer is not None:
+            # a partial game would be recorded as a finished one
+            raise ValueError("the game is not over, answer its last round first")
+        time_involved = time.time() - session.start_time  # calculate time spent
+        summary = GameSummary(
+            session.score,
+            session.n_round,
+            session.difficulty,
+            time_involved,
+            medal(session.score, session.n_round, time_involved),
+        )
+        if self.results is not None:
+            self.results.record_game(session.game_id, session.player, summary)
+        return summary
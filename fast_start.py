@@ -0,0 +1,118 @@
+"""
+fast_start.py
+
+This module starts the quiz game from the snapshot of the pools written by shared_dataset.py,
+so that the first prompt is shown at once instead of after importing pandas and loading a pool:
+- the levels are read from the 'meta.json' file of the snapshot, which is enough to ask for
+  the difficulty level.
+- an EngineLoader imports the engine and attaches the snapshot (memory-mapped, nothing is
+  parsed) in a background thread, while the player chooses the level.
+- once the level is chosen, the files of its pool are read ahead in the background while the
+  player chooses the number of rounds, so that the first question does not wait for the disk.
+
+    python game.py --snapshot
+"""
+
+import os  # type: ignore
+import json  # type: ignore
+import threading  # type: ignore
+
+SNAPSHOT_DIR = "snapshot"
+READ_SIZE = 1 << 20  # bytes read at once when the files are read ahead without posix_fadvise
+
+
+def snapshot_levels(path=SNAPSHOT_DIR):
+    """
+    Returns the levels of a snapshot, in the order they were published.
+
+    Args:
+        path: Folder of the snapshot.
+
+    Returns:
+        A list of level names, e.g. ['easy', 'medium', 'hard'].
+    """
+    with open(os.path.join(path, "meta.json")) as meta_file:
+        return list(json.load(meta_file))
+
+
+def read_ahead(folder):
+    """
+    Brings the files of a folder into the page cache of the operating system.
+    """
+    for name in os.listdir(folder):
+        with open(os.path.join(folder, name), "rb") as file:
+            if hasattr(os, "posix_fadvise"):
+                # asks the kernel to read the file, without waiting for it
+                os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+            else:
+                while file.read(READ_SIZE):
+                    pass
+
+
+class EngineLoader:
+    """
+    Builds the QuizEngine of a snapshot in a background thread.
+
+    Attributes:
+        path: Folder of the snapshot (the version it points to when the loader is created).
+        results: The ResultsStore given to the engine, None records nothing.
+        engine: The QuizEngine, None until it is ready.
+        error: The exception raised while building the engine, None if there was none.
+        thread: The thread building the engine.
+
+    Methods:
+        __init__(path, results): Starts building the engine.
+        load(): Imports the engine and attaches the snapshot (run by the thread).
+        prepare(dif): Reads the pool of a level ahead, in the background.
+        result(): Waits for the engine and returns it.
+    """
+
+    def __init__(self, path=SNAPSHOT_DIR, results=None):
+        """
+        Starts building the engine of a snapshot in a background thread.
+
+        Args:
+            path: Folder of the snapshot.
+            results: A ResultsStore for the engine (see results_store.py), None records nothing.
+        """
+        self.path = os.path.realpath(path)  # the version published when the game starts
+        self.results = results
+        self.engine = None
+        self.error = None
+        self.thread = threading.Thread(target=self.load, name="engine-loader", daemon=True)
+        self.thread.start()
+
+    def load(self):
+        """
+        Imports the engine (with pandas and NumPy) and attaches the snapshot.
+        """
+        try:
+            from shared_dataset import attach_engine  # type: ignore
+
+            engine = attach_engine(self.path)
+            engine.results = self.results
+            self.engine = engine
+        except Exception as error:  # raised again by result(), in the thread of the game
+            self.error = error
+
+    def prepare(self, dif):
+        """
+        Reads the files of the pool of a level ahead, in the background.
+
+        Args:
+            dif: The difficulty level.
+        """
+        folder = os.path.join(self.path, dif)
+        threading.Thread(target=read_ahead, args=(folder,), daemon=True).start()
+
+    def result(self):
+        """
+        Waits until the engine is built and returns it.
+
+        Returns:
+            The QuizEngine playing on the snapshot.
+        """
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.engine
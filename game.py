@@ -3,11 +3,71 @@ game.py
 
 This module is the main game execution file. Running this file launches 
 the quiz game interface, where users can play and answer questions.
+
+With --filter the game offers a custom level, e.g. the 90s horror movies with directors only:
+    python game.py --filter "type=movie; genre=Horror; first_profession=director; decade=1990"
+(see category_index.parse_filter for the syntax).
+
+With --metrics the game is instrumented (see instrumentation.py) and the latency of its
+methods is written to a file when it ends, as JSON or in the Prometheus format ('.prom').
+
+With --results the answers and the final score of every game are recorded in a SQLite
+database under the name given by --player (see results_store.py), e.g.
+    python game.py --results results.db --player alice
+
+With --snapshot the game plays on the snapshot of the pools built by dataset_merge.py (or
+shared_dataset.py): the difficulty prompt is shown at once and the engine is imported and
+attached in the background while the player answers it (see fast_start.py), e.g.
+    python game.py --snapshot
+Only the modules needed by the options given are imported before the first prompt.
 """
 
-import pandas as pd  # type: ignore
+import argparse  # type: ignore
 from quiz import QuizGame  # type: ignore
+from instrumentation import Instrumentation  # type: ignore
+from results_store import ResultsStore  # type: ignore
+from fast_start import SNAPSHOT_DIR  # type: ignore
+
+parser = argparse.ArgumentParser(description="Play the quiz game about movies and tv series")
+parser.add_argument(
+    "--metrics", help="file the latency histograms are written to (.json or .prom)"
+)
+parser.add_argument(
+    "--filter", help="conditions of a custom level, e.g. 'type=movie; decade=1990'"
+)
+parser.add_argument("--results", help="SQLite database the results of the games are recorded in")
+parser.add_argument("--player", default="anonymous", help="name recorded with the results")
+parser.add_argument(
+    "--snapshot",
+    nargs="?",
+    const=SNAPSHOT_DIR,
+    help=f"play on a snapshot of the pools, started in the background (default: {SNAPSHOT_DIR})",
+)
+args = parser.parse_args()
+if args.snapshot and args.filter:
+    parser.error("--filter needs the game_set, it cannot be used with --snapshot")
+
+instrumentation = Instrumentation() if args.metrics else None
+custom_filter = None
+if args.filter:
+    from category_index import parse_filter  # type: ignore
 
-game_set = pd.read_csv("./game_set.csv")  # load the game_set dataset
-game = QuizGame(game_set)  # initialize the QuizGame object with le loaded fataset
-game.quiz()  # start the quiz
+    try:
+        custom_filter = parse_filter(args.filter)
+    except ValueError as error:
+        parser.error(str(error))
+results = ResultsStore(args.results) if args.results else None
+game = QuizGame(
+    instrumentation=instrumentation,
+    custom_filter=custom_filter,
+    results=results,
+    player=args.player,
+    snapshot=args.snapshot,
+)  # initialize the QuizGame object, the pool of the chosen level is loaded on demand
+try:
+    game.quiz()  # start the quiz
+finally:
+    if instrumentation is not None:
+        instrumentation.write(args.metrics)
+    if results is not None:
+        results.close()  # write the results still queued
@@ -0,0 +1,496 @@
+"""
+incremental.py
+
+This module rebuilds the merge_set, the game_set and the regions from a new IMDb dump by only
+processing the rows that changed since the previous build.
+
+The previous build is kept in a state folder ('build_state' by default), keyed by
+'nconst' and 'tconst':
+- 'names.arrow', 'titles.arrow' and 'akas.arrow': the key and the text of every line of the
+  three TSV files.
+- 'roles.arrow', 'movies.arrow' and 'regions.arrow': the cleaned roles, movies and regions
+  (the regions of the movies and tv series only, as a full build loads them).
+- 'merge_rows.arrow': the rows of the join before the duplicates are removed,
+  with the person id ('name_id'), the 'movie_*' column they come from ('slot') and a hash
+  of the attributes of the person ('person_key').
+- 'game_rows.arrow': the same rows with the types of the game_set (see schema.py).
+
+The lines of a new dump are split without parsing their values (NumPy and pyarrow) and
+compared with the lines of the state to find the keys that were added, changed or removed.
+Only the lines of those keys are parsed and cleaned, and only their rows of the join are
+recomputed and typed: the rows of the other people and titles are reused as they are, and the
+categories of the new rows are merged into the sorted categories of the state without hashing
+the strings of the reused rows again. The merge_set, the game_set and the regions are identical
+to the ones of a full build.
+
+The work that does not depend on the size of the delta, and that an incremental build never
+takes less than, is:
+- reading and hashing every line of the three files (read_lines, diff_lines, diff_groups).
+- sorting all the rows of the join and all the regions in dump order, and removing the
+  duplicates of the join.
+- writing the whole state again (save_state).
+dataset_merge.py then writes every dataset, the pools, the snapshot and the lookup index again,
+except on a dump where nothing changed: it stops after the diff and writes nothing.
+Everything runs on the local TSV files, without downloading anything.
+
+Usage:
+    python dataset_merge.py --no-download --incremental --state-dir build_state
+"""
+
+import io  # type: ignore
+import os  # type: ignore
+from collections import namedtuple  # type: ignore
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+import pyarrow as pa  # type: ignore
+import pyarrow.compute as pc  # type: ignore
+import pyarrow.feather as feather  # type: ignore
+from schema import INTEGER_COLUMNS, apply_schema  # type: ignore
+from dataset_merge import (  # type: ignore
+    KNOWN_FOR_COLUMNS,
+    MOVIES_COLUMNS,
+    MOVIES_DTYPES,
+    PERSON_COLUMNS,
+    REGIONS_COLUMNS,
+    REGIONS_DTYPES,
+    ROLES_COLUMNS,
+    ROLES_DTYPES,
+    clean_movies,
+    clean_regions,
+    clean_roles,
+    read_tsv,
+)
+
+STATE_DIR = "build_state"
+STATE_TABLES = [
+    "names",
+    "titles",
+    "akas",
+    "roles",
+    "movies",
+    "regions",
+    "merge_rows",
+    "game_rows",
+]
+LINE_TABLES = ["names", "titles", "akas"]  # lines of the dump, the others are cleaned DataFrames
+JOIN_COLUMNS = ["name_id", "slot", "person_key"]  # columns of the join rows not in the merge_set
+
+# result of an incremental build, 'changed' is False when the dump is the one of the state
+IncrementalBuild = namedtuple(
+    "IncrementalBuild", ["merge_set", "game_set", "region_df", "changed", "state"]
+)
+
+
+def read_lines(path):
+    """
+    Reads the lines of a TSV file of the IMDb dump with their keys, without parsing them.
+
+    Args:
+        path: Path of the TSV file.
+
+    Returns:
+        A pyarrow Table with the key (first field) and the text of every line, in file order.
+    """
+    data = np.fromfile(path, dtype=np.uint8)
+    ends = np.flatnonzero(data == ord("\n")) + 1
+    if len(data) and data[-1] != ord("\n"):
+        ends = np.append(ends, len(data))  # last line without a newline
+    # line i goes from ends[i] to ends[i + 1], the header (before ends[0]) is skipped
+    lines = pa.LargeStringArray.from_buffers(
+        len(ends) - 1, pa.py_buffer(ends.astype(np.int64)), pa.py_buffer(data)
+    )
+    keys = pc.list_element(pc.split_pattern(lines, "\t", max_splits=1), 0)
+    return pa.table({"key": keys, "line": lines})
+
+
+def diff_lines(old, new):
+    """
+    Compares the lines of two versions of the same TSV file, with one line per key.
+
+    Args:
+        old: The lines of the previous dump, None if there is no previous build.
+        new: The lines of the new dump.
+
+    Returns:
+        The lines to process again (added or changed), as a pyarrow array, and the stale keys
+        of the previous build (changed or removed), as a pyarrow array.
+    """
+    if old is None:
+        return new["line"], pa.array([], type=new["key"].type)
+    position = pc.index_in(new["key"], value_set=old["key"])
+    same = pc.equal(new["line"], old["line"].take(pc.fill_null(position, 0)))
+    fresh = pc.invert(pc.and_(pc.is_valid(position), same))
+    stale = pc.invert(pc.is_in(old["key"], value_set=new["key"])).to_numpy(zero_copy_only=False)
+    stale[pc.filter(position, fresh).drop_null().to_numpy()] = True  # changed lines
+    return pc.filter(new["line"], fresh), pc.filter(old["key"], stale).combine_chunks()
+
+
+def diff_groups(old, new):
+    """
+    Compares the lines of two versions of the same TSV file, with several lines per key
+    ('title.akas.tsv' has one line for every release of a title).
+
+    A key is stale as soon as one of its lines was added, changed or removed, and all of its
+    lines are processed again.
+
+    Args:
+        old: The lines of the previous dump, None if there is no previous build.
+        new: The lines of the new dump.
+
+    Returns:
+        The lines of the stale keys in the new dump, as a pyarrow array, and the stale keys,
+        as a pyarrow array.
+    """
+    if old is None:
+        return new["line"], pa.array([], type=new["key"].type)
+    fresh = pc.invert(pc.is_in(new["line"], value_set=old["line"]))
+    gone = pc.invert(pc.is_in(old["line"], value_set=new["line"]))
+    stale = pc.unique(
+        pa.concat_arrays(
+            [
+                pc.filter(new["key"], fresh).combine_chunks(),
+                pc.filter(old["key"], gone).combine_chunks(),
+            ]
+        )
+    )
+    return pc.filter(new["line"], pc.is_in(new["key"], value_set=stale)), stale
+
+
+def parse_lines(path, lines, usecols, dtype):
+    """
+    Parses some lines of a TSV file exactly as read_tsv parses the whole file.
+
+    Args:
+        path: Path of the TSV file (for the header).
+        lines: pyarrow array of lines of the file.
+        usecols: Columns to read.
+        dtype: Dtypes used to read the columns.
+
+    Returns:
+        A DataFrame with the parsed lines, None if there are no lines
+        (a DataFrame read from no line has no dtypes to concatenate with).
+    """
+    if len(lines) == 0:
+        return None
+    with open(path) as tsv:
+        header = tsv.readline()
+    text = io.StringIO(header + "".join(lines.to_pylist()))
+    return next(read_tsv(text, usecols, dtype))
+
+
+def in_keys(column, keys):
+    """
+    Returns a NumPy mask of the values of a column that are in 'keys'.
+
+    The mask is computed by pyarrow: Series.isin goes through Python strings for the
+    columns backed by pyarrow, which would cost as much as the whole table for a few keys.
+
+    Args:
+        column: A pandas Series of strings.
+        keys: A pyarrow array of strings.
+
+    Returns:
+        A NumPy array of booleans.
+    """
+    values = pa.array(column)
+    mask = pc.is_in(values, value_set=keys.cast(values.type))
+    return mask.to_numpy(zero_copy_only=False)
+
+
+def concat_frames(frames):
+    """
+    Concatenates the DataFrames of a list, skipping the missing (None) ones.
+    """
+    frames = [frame for frame in frames if frame is not None]
+    return pd.concat([frame for frame in frames if len(frame)] or frames[:1], ignore_index=True)
+
+
+def join_rows(roles_df, movie_df):
+    """
+    Joins people and movies on the titles each person is known for, keeping the duplicates.
+
+    Args:
+        roles_df: Cleaned roles.
+        movie_df: Cleaned movies.
+
+    Returns:
+        One row per (person, title) pair, with the columns of the merge_set plus JOIN_COLUMNS,
+        None if there is no person or no movie.
+    """
+    if roles_df is None or movie_df is None or len(roles_df) == 0 or len(movie_df) == 0:
+        return None
+    movie_index = pd.Index(movie_df["movie_id"])
+    slots = np.repeat(np.arange(len(KNOWN_FOR_COLUMNS)), len(roles_df))
+    rows = np.tile(np.arange(len(roles_df)), len(KNOWN_FOR_COLUMNS))
+    movie_rows = np.concatenate(
+        [movie_index.get_indexer(roles_df[movie]) for movie in KNOWN_FOR_COLUMNS]
+    )
+    matched = movie_rows >= 0  # inner join
+
+    people = roles_df[["name_id"] + PERSON_COLUMNS].iloc[rows[matched]].reset_index(drop=True)
+    people["first_profession"] = people["first_profession"].str.replace("_", " ")
+    join = pd.concat(
+        [people, movie_df.iloc[movie_rows[matched]].reset_index(drop=True)], axis=1
+    )
+    join["start_year"] = (
+        pd.to_numeric(join["start_year"], errors="coerce").fillna(0).astype(int)
+    )  # as in build_merge_set
+    join["slot"] = slots[matched]
+    join["person_key"] = pd.util.hash_pandas_object(join[PERSON_COLUMNS], index=False).to_numpy()
+    return join
+
+
+def merge_categories(kept, new):
+    """
+    Concatenates two categorical Series into one whose categories are the sorted values of
+    its rows, as astype("category") gives them.
+
+    The categories of the new rows are inserted into the sorted categories of the kept rows
+    by binary search and the codes are shifted with NumPy, so the strings of the kept rows
+    are not hashed again.
+
+    Args:
+        kept: Categorical Series with sorted categories.
+        new: Categorical Series with sorted categories.
+
+    Returns:
+        The concatenated categorical Series.
+    """
+    categories = kept.cat.categories
+    values = new.cat.categories
+    position = categories.searchsorted(values)
+    found = position < len(categories)
+    found[found] = categories[position[found]] == values[found]
+    added = np.flatnonzero(~found)
+    inserted = position[added]  # sorted, as the values
+    merged = np.insert(
+        categories.to_numpy(dtype=object), inserted, values[added].to_numpy(dtype=object)
+    )
+    # new index of every value: its position among the categories, plus the values inserted
+    # before it (the values before it in 'added' for an added value)
+    index = position + np.searchsorted(inserted, position, side="right")
+    index[added] = inserted + np.arange(len(added))
+
+    kept_codes = kept.cat.codes.to_numpy().astype(np.int64)
+    new_codes = new.cat.codes.to_numpy().astype(np.int64)
+    shift = np.searchsorted(inserted, kept_codes, side="right")
+    codes = np.concatenate(
+        [
+            np.where(kept_codes >= 0, kept_codes + shift, -1),
+            np.where(new_codes >= 0, index[new_codes], -1),
+        ]
+    )
+    # the categories of the removed rows are dropped
+    used = np.bincount(codes[codes >= 0], minlength=len(merged)) > 0
+    codes = np.where(codes >= 0, (np.cumsum(used) - 1)[codes], -1)
+    dtype = values.dtype if len(values) else categories.dtype
+    categories = pd.Index(merged[used], dtype=dtype)
+    return pd.Series(pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(categories)))
+
+
+def concat_typed(kept, new):
+    """
+    Concatenates the rows of the state typed as the game_set with new rows.
+
+    Args:
+        kept: The rows of the state typed by apply_schema, None if there are none.
+        new: New rows, with the columns of the merge_set, None if there are none.
+
+    Returns:
+        The concatenated rows, typed as apply_schema would type all of them.
+    """
+    if new is None or len(new) == 0:
+        return kept
+    new = apply_schema(new.drop(JOIN_COLUMNS, axis=1))
+    if kept is None:
+        return new
+    rows = {}
+    for column in kept:
+        if isinstance(kept[column].dtype, pd.CategoricalDtype):
+            rows[column] = merge_categories(kept[column], new[column])
+        else:
+            rows[column] = pd.concat([kept[column], new[column]], ignore_index=True)
+            dtype = INTEGER_COLUMNS.get(column)
+            if dtype is not None and rows[column].dtype != dtype and not rows[column].hasnans:
+                rows[column] = rows[column].astype(dtype)  # no more missing values
+    return pd.DataFrame(rows)
+
+
+def load_state(state_dir=STATE_DIR):
+    """
+    Loads the state of the previous build.
+
+    Args:
+        state_dir: Folder of the state.
+
+    Returns:
+        A dictionary of tables by name (pyarrow Tables for the lines of the dump,
+        DataFrames otherwise), empty if there is no previous build.
+    """
+    paths = {table: os.path.join(state_dir, f"{table}.arrow") for table in STATE_TABLES}
+    if not all(os.path.exists(path) for path in paths.values()):
+        return {}
+    state = {}
+    for table, path in paths.items():
+        if table in LINE_TABLES:
+            state[table] = feather.read_table(path, memory_map=True)
+        else:
+            state[table] = feather.read_feather(path)
+    return state
+
+
+def save_state(state, state_dir=STATE_DIR):
+    """
+    Saves the state of a build as Arrow (feather) files.
+
+    Args:
+        state: A dictionary of tables by name.
+        state_dir: Folder of the state.
+    """
+    os.makedirs(state_dir, exist_ok=True)
+    for table in STATE_TABLES:
+        path = os.path.join(state_dir, f"{table}.arrow")
+        # the lines are written uncompressed so that they can be memory-mapped by the next build
+        compression = "uncompressed" if table in LINE_TABLES else "lz4"
+        feather.write_feather(state[table], path + ".tmp", compression=compression)
+        os.replace(path + ".tmp", path)
+
+
+def datasets(state, changed):
+    """
+    Returns the datasets of a state: the join rows without their duplicates and the regions.
+
+    Args:
+        state: A dictionary of tables by name.
+        changed: Whether the dump changed since the previous build.
+
+    Returns:
+        An IncrementalBuild.
+    """
+    merge_rows = state["merge_rows"]
+    game_rows = state["game_rows"]
+    # duplicates: same person and same title, the title compared by its code in the game rows
+    pairs = pd.DataFrame(
+        {"person": merge_rows["person_key"], "movie": game_rows["movie_id"].cat.codes}
+    )
+    first = ~pairs.duplicated().to_numpy()
+    return IncrementalBuild(
+        merge_rows[first].drop(JOIN_COLUMNS, axis=1).reset_index(drop=True),
+        game_rows[first].reset_index(drop=True),
+        state["regions"],
+        changed,
+        state,
+    )
+
+
+def incremental_build(data_dir, state_dir=STATE_DIR, save=True):
+    """
+    Updates the state of the previous build with a new dump and returns the new datasets.
+
+    Without a previous state every key is new, so the first run is a full build.
+
+    Args:
+        data_dir: Folder with the IMDb TSV files.
+        state_dir: Folder of the state.
+        save: Whether to save the new state, dataset_merge.py saves it once the datasets
+            are written, so that a build that fails is done again by the next one.
+
+    Returns:
+        An IncrementalBuild with the merge_set, the game_set (typed by apply_schema), the
+        regions of the movies and tv series, whether the dump changed and the new state.
+    """
+    state = load_state(state_dir)
+    names_path = os.path.join(data_dir, "name.basics.tsv")
+    titles_path = os.path.join(data_dir, "title.basics.tsv")
+    akas_path = os.path.join(data_dir, "title.akas.tsv")
+
+    names = read_lines(names_path)
+    titles = read_lines(titles_path)
+    akas = read_lines(akas_path)
+    fresh_names, stale_names = diff_lines(state.get("names"), names)
+    fresh_titles, stale_titles = diff_lines(state.get("titles"), titles)
+    fresh_akas, stale_akas = diff_groups(state.get("akas"), akas)
+    print(f"name.basics.tsv: {len(fresh_names)} added or changed, {len(stale_names)} stale")
+    print(f"title.basics.tsv: {len(fresh_titles)} added or changed, {len(stale_titles)} stale")
+    print(f"title.akas.tsv: {len(fresh_akas)} lines of {len(stale_akas)} stale titles")
+    deltas = [fresh_names, stale_names, fresh_titles, stale_titles, fresh_akas, stale_akas]
+    if state and not any(len(delta) for delta in deltas):
+        return datasets(state, False)  # the dump of the previous build: nothing to do
+
+    # parse and clean only the new and changed lines
+    new_roles = parse_lines(names_path, fresh_names, ROLES_COLUMNS, ROLES_DTYPES)
+    new_roles = None if new_roles is None else clean_roles(new_roles)
+    new_movies = parse_lines(titles_path, fresh_titles, MOVIES_COLUMNS, MOVIES_DTYPES)
+    new_movies = None if new_movies is None else clean_movies(new_movies)
+    roles_df = state.get("roles")
+    if roles_df is not None:
+        roles_df = roles_df[~in_keys(roles_df["name_id"], stale_names)]
+    movie_df = state.get("movies")
+    merge_rows = state.get("merge_rows")
+    game_rows = state.get("game_rows")
+    if merge_rows is not None:
+        movie_df = movie_df[~in_keys(movie_df["movie_id"], stale_titles)]
+        # the rows of the stale people and titles are recomputed below
+        kept = ~(
+            in_keys(merge_rows["name_id"], stale_names)
+            | in_keys(merge_rows["movie_id"], stale_titles)
+        )
+        merge_rows = merge_rows[kept]
+        game_rows = game_rows[kept]
+    movie_df = concat_frames([movie_df, new_movies])
+
+    new_rows = [join_rows(new_roles, movie_df)]  # new people with every title
+    if roles_df is not None and new_movies is not None and len(new_movies):
+        # unchanged people known for a new or changed title
+        movie_ids = pa.array(new_movies["movie_id"])
+        known_for = np.logical_or.reduce(
+            [in_keys(roles_df[movie], movie_ids) for movie in KNOWN_FOR_COLUMNS]
+        )
+        new_rows.append(join_rows(roles_df[known_for], new_movies))
+    roles_df = concat_frames([roles_df, new_roles])
+    new_rows = concat_frames(new_rows) if any(rows is not None for rows in new_rows) else None
+    game_rows = concat_typed(game_rows, new_rows)
+    merge_rows = concat_frames([merge_rows, new_rows])
+
+    # dump order: by 'movie_*' column, then by position of the person in name.basics.tsv
+    position = pc.index_in(
+        pa.array(merge_rows["name_id"]).cast(names["key"].type), value_set=names["key"]
+    ).to_numpy()
+    order = np.lexsort((position, merge_rows["slot"].to_numpy()))
+    merge_rows = merge_rows.iloc[order].reset_index(drop=True)
+    game_rows = game_rows.iloc[order].reset_index(drop=True)
+
+    # regions of the new and changed releases, and of the titles that became a movie
+    region_df = state.get("regions")
+    if new_movies is not None and len(new_movies):
+        movie_ids = pa.array(new_movies["movie_id"]).cast(stale_akas.type)
+        stale_akas = pc.unique(pa.concat_arrays([stale_akas, movie_ids]))
+    if region_df is not None:
+        stale = in_keys(region_df["movie_id"], stale_akas)
+        region_df = region_df[~(stale | in_keys(region_df["movie_id"], stale_titles))]
+    fresh_akas = pc.filter(akas["line"], pc.is_in(akas["key"], value_set=stale_akas))
+    new_regions = parse_lines(akas_path, fresh_akas, REGIONS_COLUMNS, REGIONS_DTYPES)
+    if new_regions is not None:
+        new_regions = clean_regions(new_regions)  # only movies and tv series, as load_regions
+        movie_ids = pa.array(movie_df["movie_id"])
+        new_regions = new_regions[in_keys(new_regions["movie_id"], movie_ids)]
+    region_df = concat_frames([region_df, new_regions])
+    # file order of title.akas.tsv: the lines of a title are next to each other
+    position = pc.index_in(
+        pa.array(region_df["movie_id"]).cast(akas["key"].type), value_set=akas["key"]
+    ).to_numpy()
+    region_df = region_df.iloc[np.argsort(position, kind="stable")].reset_index(drop=True)
+
+    state = {
+        "names": names,
+        "titles": titles,
+        "akas": akas,
+        "roles": roles_df,
+        "movies": movie_df,
+        "regions": region_df,
+        "merge_rows": merge_rows,
+        "game_rows": game_rows,
+    }
+    if save:
+        save_state(state, state_dir)
+    return datasets(state, True)
@@ -0,0 +1,343 @@
+"""
+instrumentation.py
+
+This module records where the time of a game goes, when it is enabled.
+
+Instrumentation.attach() wraps some methods of a QuizGame and of its QuizEngine, on the
+instances only: every call of a wrapped method is timed and added to a latency histogram.
+It also counts the copies of the dataset made by the engine (pools computed or loaded,
+row stores built) and records the peak memory of every game session. Nothing is wrapped
+when the instrumentation is not attached, so a game without it runs the plain methods.
+
+The results are written to a local file, as a JSON summary or in the Prometheus text format:
+    python game.py --metrics metrics.json
+    python game.py --metrics metrics.prom
+"""
+
+import math  # type: ignore
+import bisect  # type: ignore
+import json  # type: ignore
+import time  # type: ignore
+import resource  # type: ignore
+import functools  # type: ignore
+
+# upper bounds (seconds) of the latency buckets
+LATENCY_BUCKETS = [
+    0.00001,
+    0.00005,
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1,
+    5,
+    10,
+    60,
+    math.inf,
+]
+# methods timed on the QuizGame and on its QuizEngine: the path of quiz(), whose questions
+# come from next_question (QuizGame.first_question to fourth_question and gen_answers are not
+# called by a game)
+GAME_METHODS = ["difficulty", "score_fun"]
+ENGINE_METHODS = [
+    "pool",
+    "row_store",
+    "distractor_index",
+    "sampler",
+    "render",
+    "rendered_question",
+    "choices",
+    "next_question",
+    "submit_answer",
+]
+# engine methods timed per kind of question, with the position of their 'kind' argument:
+# their histograms are named '<object>.<method>.<kind>', e.g. 'engine.choices.title'
+KIND_METHODS = {"render": 1, "rendered_question": 1, "choices": 2}
+# engine methods that copy the dataset the first time a level is played, with their cache
+COPY_METHODS = {"pool": "pools", "row_store": "stores"}
+
+
+def reset_peak_memory():
+    """
+    Resets the peak resident memory of the process (Linux only, ignored elsewhere).
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        pass
+
+
+def peak_memory():
+    """
+    Returns the peak resident memory of the process in bytes, since the last
+    reset_peak_memory() on Linux, since the start of the process elsewhere.
+    """
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024  # kB
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # kB on Linux
+
+
+class LatencyHistogram:
+    """
+    A histogram of the durations of the calls of a method.
+
+    Attributes:
+        counts: Number of calls in every bucket of LATENCY_BUCKETS.
+        count: Total number of calls.
+        total: Total time spent in the calls, in seconds.
+
+    Methods:
+        observe(seconds): Adds the duration of a call.
+        quantile(q): Estimates a quantile of the durations from the buckets.
+        summary(): Returns the histogram as a dictionary.
+    """
+
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        """
+        Adds the duration of a call.
+        """
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q):
+        """
+        Estimates a quantile of the durations: the upper bound of the bucket it falls in.
+        """
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            seen += count
+            if seen >= rank and count:
+                return bound
+        return 0.0
+
+    def summary(self):
+        """
+        Returns the number of calls, the total and mean time, the estimated p50 and p99
+        and the cumulative count of every bucket.
+        """
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            cumulative += count
+            buckets["+Inf" if bound == math.inf else f"{bound:g}"] = cumulative
+        return {
+            "count": self.count,
+            "total_seconds": self.total,
+            "mean_seconds": self.total / self.count if self.count else 0.0,
+            "p50_seconds": self.quantile(0.5),
+            "p99_seconds": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+class Instrumentation:
+    """
+    Latency histograms, counters and session memory of an instrumented game.
+
+    Attributes:
+        histograms: The LatencyHistogram of every timed method, by '<object>.<method>' (and
+                    '<object>.<method>.<kind>' for the methods timed per kind of question).
+        counters: Counters by name ('dataset_copies', 'row_store_copies', 'sessions').
+        sessions: Difficulty, rounds, score, duration and peak memory of every finished session.
+
+    Methods:
+        timed(name, func): Returns a timed version of a function.
+        timed_by_kind(name, func, position): Returns a version of a function timed per kind.
+        attach(game): Instruments a QuizGame and its QuizEngine.
+        attach_engine(engine): Instruments a QuizEngine.
+        summary(): Returns the results as a dictionary.
+        prometheus(): Returns the results in the Prometheus text format.
+        write(path): Writes the results to a file.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {"dataset_copies": 0, "row_store_copies": 0, "sessions": 0}
+        self.sessions = []
+
+    def timed(self, name, func):
+        """
+        Returns a version of a function that adds the duration of every call to a histogram.
+
+        Args:
+            name: Name of the histogram.
+            func: The function (or bound method) to time.
+
+        Returns:
+            The wrapped function.
+        """
+        histogram = self.histograms.setdefault(name, LatencyHistogram())
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+
+        return wrapper
+
+    def timed_by_kind(self, name, func, position):
+        """
+        Returns a version of a function that adds the duration of every call to the histogram
+        of the kind of question it is called for.
+
+        Args:
+            name: Prefix of the names of the histograms, followed by '.<kind>'.
+            func: The function (or bound method) to time.
+            position: Position of the 'kind' argument among the positional arguments.
+
+        Returns:
+            The wrapped function.
+        """
+        histograms = {}
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            kind = kwargs["kind"] if "kind" in kwargs else args[position]
+            histogram = histograms.get(kind)
+            if histogram is None:
+                histogram = self.histograms.setdefault(f"{name}.{kind}", LatencyHistogram())
+                histograms[kind] = histogram
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+
+        return wrapper
+
+    def counted_copies(self, engine, name, func):
+        """
+        Returns a version of an engine method that counts the copies of the dataset it makes.
+        """
+        cache = COPY_METHODS[name]
+        counter = "dataset_copies" if name == "pool" else "row_store_copies"
+
+        @functools.wraps(func)
+        def wrapper(dif):
+            if dif not in getattr(engine, cache):
+                self.counters[counter] += 1
+            return func(dif)
+
+        return wrapper
+
+    def attach_engine(self, engine):
+        """
+        Instruments a QuizEngine: times its methods, counts the copies of the dataset and
+        records the peak memory of every game session.
+
+        Args:
+            engine: The QuizEngine.
+        """
+        for name in ENGINE_METHODS:
+            method = getattr(engine, name)
+            if name in COPY_METHODS:
+                method = self.counted_copies(engine, name, method)
+            if name in KIND_METHODS:
+                method = self.timed_by_kind(f"engine.{name}", method, KIND_METHODS[name])
+            else:
+                method = self.timed(f"engine.{name}", method)
+            setattr(engine, name, method)
+
+        start_game = engine.start_game
+        finish = engine.finish
+
+        @functools.wraps(start_game)
+        def start_game_wrapper(dif, n_round, *args, **kwargs):
+            reset_peak_memory()
+            return start_game(dif, n_round, *args, **kwargs)
+
+        @functools.wraps(finish)
+        def finish_wrapper(session):
+            summary = finish(session)
+            self.counters["sessions"] += 1
+            self.sessions.append(
+                {
+                    "difficulty": summary.difficulty,
+                    "n_round": summary.n_round,
+                    "score": summary.score,
+                    "seconds": summary.time_involved,
+                    "peak_memory_bytes": peak_memory(),
+                }
+            )
+            return summary
+
+        engine.start_game = start_game_wrapper
+        engine.finish = finish_wrapper
+
+    def attach(self, game):
+        """
+        Instruments a QuizGame and its QuizEngine (the engine of a game starting from a
+        snapshot is instrumented by the game once it is ready).
+
+        Args:
+            game: The QuizGame.
+        """
+        for name in GAME_METHODS:
+            setattr(game, name, self.timed(f"game.{name}", getattr(game, name)))
+        if game.engine is not None:
+            self.attach_engine(game.engine)
+
+    def summary(self):
+        """
+        Returns the histograms, the counters and the sessions as a dictionary.
+        """
+        return {
+            "calls": {name: histogram.summary() for name, histogram in self.histograms.items()},
+            "counters": dict(self.counters),
+            "sessions": list(self.sessions),
+        }
+
+    def prometheus(self):
+        """
+        Returns the histograms, the counters and the peak memory of the last session
+        in the Prometheus text exposition format.
+        """
+        lines = [
+            "# HELP quiz_call_seconds Duration of the calls of the instrumented methods.",
+            "# TYPE quiz_call_seconds histogram",
+        ]
+        for name, histogram in self.histograms.items():
+            for bound, count in histogram.summary()["buckets"].items():
+                lines.append(f'quiz_call_seconds_bucket{{call="{name}",le="{bound}"}} {count}')
+            lines.append(f'quiz_call_seconds_sum{{call="{name}"}} {histogram.total}')
+            lines.append(f'quiz_call_seconds_count{{call="{name}"}} {histogram.count}')
+        for name, value in self.counters.items():
+            lines.append(f"# TYPE quiz_{name}_total counter")
+            lines.append(f"quiz_{name}_total {value}")
+        if self.sessions:
+            lines.append("# HELP quiz_session_peak_memory_bytes Peak memory of the last session.")
+            lines.append("# TYPE quiz_session_peak_memory_bytes gauge")
+            lines.append(f"quiz_session_peak_memory_bytes {self.sessions[-1]['peak_memory_bytes']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Writes the results to a file: Prometheus text format for a '.prom' file, JSON otherwise.
+        """
+        with open(path, "w") as output:
+            if path.endswith(".prom"):
+                output.write(self.prometheus())
+            else:
+                json.dump(self.summary(), output, indent=2, default=str)
@@ -0,0 +1,229 @@
+"""
+lookup_index.py
+
+This module contains the lookup index of the names and titles of the game_set.
+
+For 'name_surname' and 'title' the index keeps the distinct values sorted by their casefolded
+form and, for every value, the positions of its rows in the game_set. A value is found by
+binary search instead of comparing every row of the column, and the values starting with a
+prefix form a contiguous range of the sorted values, which gives the prefix lookups and the
+completions of a type-ahead answer.
+
+dataset_merge.py saves the index next to the game_set, in 'lookup/':
+- '<column>.offsets.npy' and '<column>.data.npy': the sorted values as utf-8 bytes and offsets.
+- '<column>.row_offsets.npy' and '<column>.rows.npy': the row positions of every value.
+The arrays are memory-mapped when the index is loaded, so loading costs almost nothing and
+only the pages touched by the lookups are read.
+
+Running this file completes a prefix with the names and titles of the index:
+    python lookup_index.py "Steve Car"
+"""
+
+import os  # type: ignore
+import argparse  # type: ignore
+import numpy as np  # type: ignore
+from counting import category_codes  # type: ignore
+from shared_dataset import StringTable, encode_strings  # type: ignore
+
+LOOKUP_DIR = "lookup"
+LOOKUP_COLUMNS = ["name_surname", "title"]
+LAST_CHARACTER = "\U0010ffff"  # sorts after every character of a prefix
+
+
+class LookupIndex:
+    """
+    Sorted distinct values of a column with the positions of their rows.
+
+    Attributes:
+        values: The distinct values, sorted by their casefolded form (a StringTable).
+        row_offsets: Array of n + 1 offsets, the rows of value i are
+                     rows[row_offsets[i]:row_offsets[i + 1]].
+        rows: Positions of the rows of every value, in increasing order for each value.
+
+    Methods:
+        __init__(values, row_offsets, rows): Wraps existing arrays.
+        from_column(column): Builds the index of a pandas Series.
+        save(path, name): Saves the index as NumPy arrays.
+        load(path, name): Loads a saved index, memory-mapped.
+        exact(value): Returns the rows holding a value.
+        prefix(text): Returns the rows whose value starts with a prefix (case-insensitive).
+        complete(text, k): Returns the first values starting with a prefix (case-insensitive).
+    """
+
+    __slots__ = ("values", "row_offsets", "rows")
+
+    def __init__(self, values, row_offsets, rows):
+        self.values = values
+        self.row_offsets = row_offsets
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.row_offsets) - 1
+
+    @classmethod
+    def from_column(cls, column):
+        """
+        Builds the index of a column.
+
+        Args:
+            column: A pandas Series (categorical or not), missing values are not indexed.
+
+        Returns:
+            The LookupIndex.
+        """
+        codes, labels = category_codes(column)
+        labels = np.asarray(labels, dtype=object)
+        keys = np.array([label.casefold() for label in labels], dtype=object)
+        order = np.lexsort((labels, keys))  # by casefolded value, then by value
+        ranks = np.empty(len(order), dtype=np.int64)
+        ranks[order] = np.arange(len(order))
+        present = codes >= 0
+        row_ranks = ranks[codes[present]]
+        rows = np.flatnonzero(present)[np.argsort(row_ranks, kind="stable")]
+        row_offsets = np.zeros(len(order) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row_ranks, minlength=len(order)), out=row_offsets[1:])
+        offsets, data = encode_strings(labels[order])
+        return cls(StringTable(offsets, data), row_offsets, rows.astype(np.int32))
+
+    def save(self, path, name):
+        """
+        Saves the index as NumPy arrays in the folder 'path', prefixed by 'name'.
+        """
+        os.makedirs(path, exist_ok=True)
+        arrays = {
+            "offsets": self.values.offsets,
+            "data": self.values.data,
+            "row_offsets": self.row_offsets,
+            "rows": self.rows,
+        }
+        for suffix, array in arrays.items():
+            np.save(os.path.join(path, f"{name}.{suffix}.npy"), array)
+
+    @classmethod
+    def load(cls, path, name):
+        """
+        Loads an index saved by save(), without reading its arrays (memory-mapped).
+        """
+
+        def load(suffix):
+            return np.load(os.path.join(path, f"{name}.{suffix}.npy"), mmap_mode="r")
+
+        return cls(StringTable(load("offsets"), load("data")), load("row_offsets"), load("rows"))
+
+    def bisect(self, key):
+        """
+        Returns the position of the first value whose casefolded form is not below 'key'.
+        """
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self.values.decode(middle).casefold() < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def value_rows(self, start, end):
+        """
+        Returns the rows of the values from position 'start' to 'end' (excluded).
+        """
+        rows = self.rows[self.row_offsets[start] : self.row_offsets[end]]
+        return np.sort(rows) if end - start > 1 else np.asarray(rows)
+
+    def exact(self, value):
+        """
+        Returns the rows holding a value.
+
+        Args:
+            value: The value, e.g. 'Steve Carell'.
+
+        Returns:
+            The positions of the rows in the game_set, in increasing order.
+        """
+        position = self.bisect(value.casefold())
+        # the values equal once casefolded are next to each other
+        while position < len(self):
+            found = self.values.decode(position)
+            if found.casefold() != value.casefold():
+                break
+            if found == value:
+                return self.value_rows(position, position + 1)
+            position += 1
+        return np.array([], dtype=self.rows.dtype)
+
+    def prefix_range(self, text):
+        """
+        Returns the positions (start, end) of the values starting with a prefix.
+        """
+        key = text.casefold()
+        return self.bisect(key), self.bisect(key + LAST_CHARACTER)
+
+    def prefix(self, text):
+        """
+        Returns the rows whose value starts with a prefix, ignoring the case.
+
+        Args:
+            text: The prefix, e.g. 'steve car'.
+
+        Returns:
+            The positions of the rows in the game_set, in increasing order.
+        """
+        return self.value_rows(*self.prefix_range(text))
+
+    def complete(self, text, k=10):
+        """
+        Returns the first values starting with a prefix, ignoring the case, e.g. the
+        suggestions of a type-ahead answer.
+
+        Args:
+            text: The prefix.
+            k: Maximum number of values.
+
+        Returns:
+            A list of values, in the order of the index.
+        """
+        start, end = self.prefix_range(text)
+        return [self.values.decode(i) for i in range(start, min(end, start + k))]
+
+
+def build_lookup(game_set, data_dir="."):
+    """
+    Builds the lookup index of every column of LOOKUP_COLUMNS and saves it in 'lookup/'.
+
+    Args:
+        game_set: The game_set DataFrame, in the order of its saved files.
+        data_dir: Folder where the game_set is saved.
+    """
+    for column in LOOKUP_COLUMNS:
+        index = LookupIndex.from_column(game_set[column].reset_index(drop=True))
+        index.save(os.path.join(data_dir, LOOKUP_DIR), column)
+
+
+def load_lookup(column, data_dir="."):
+    """
+    Loads the lookup index of a column of the game_set, built by build_lookup().
+
+    Args:
+        column: 'name_surname' or 'title'.
+        data_dir: Folder where the game_set is saved.
+
+    Returns:
+        The LookupIndex.
+    """
+    return LookupIndex.load(os.path.join(data_dir, LOOKUP_DIR), column)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Complete a name or a title of the game_set")
+    parser.add_argument("prefix", help="beginning of a name or a title")
+    parser.add_argument("--data-dir", default=".", help="folder with the game_set")
+    parser.add_argument("-k", type=int, default=10, help="number of completions")
+    args = parser.parse_args()
+    for column in LOOKUP_COLUMNS:
+        index = load_lookup(column, args.data_dir)
+        for value in index.complete(args.prefix, args.k):
+            print(f"{column}: {value} ({len(index.exact(value))} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+pools.py
+
+This module builds and loads the question pools of the quiz game.
+
+A pool is the subset of the game_set used at a given difficulty level (easy, medium or hard).
+The pools are materialized once, as 'pool_<difficulty>.parquet' files holding only the
+columns used by the game, so the game loads just the pool of the chosen level instead of
+filtering the whole game_set every time a game starts.
+Every level is a QuizFilter (see category_index.py) on the game_set, in LEVELS.
+
+Running this file builds the pools from an existing game_set:
+    python pools.py
+"""
+
+import os  # type: ignore
+import pandas as pd  # type: ignore
+from dataset_io import GAME_COLUMNS, load_dataset, to_columnar  # type: ignore
+from schema import apply_schema  # type: ignore
+from category_index import QuizFilter, filter_mask  # type: ignore
+
+DIFFICULTIES = ["easy", "medium", "hard"]
+# most popular professions, used by the easy and medium levels
+POPULAR_PROFESSIONS = ["actor", "actress", "writer", "producer", "director"]
+# genres excluded from the easy level
+HARD_GENRES = [
+    "Documentary",
+    "Talk-Show",
+    "Game-Show",
+    "Sci-Fi",
+    "News",
+    "History",
+    "Reality-TV",
+    "Short",
+    "Adult",
+]
+
+
+# the difficulty levels as filters of the game_set (see category_index.py)
+LEVELS = {
+    # recent movies(2005 and later) and most popular professions and genres
+    "easy": QuizFilter(
+        where={"first_profession": POPULAR_PROFESSIONS},
+        exclude={"genre_1": HARD_GENRES},
+        years=(2005, None),
+    ),
+    # medium difficulty movies(1975-2004) and most popular professions
+    "medium": QuizFilter(where={"first_profession": POPULAR_PROFESSIONS}, years=(1975, 2004)),
+    # older movies(older than 1974)
+    "hard": QuizFilter(years=(None, 1974)),
+}
+
+
+def difficulty_mask(dataset, dif):
+    """
+    Computes which rows of the dataset belong to the pool of a difficulty level,
+    by scanning the columns of the filter of the level.
+
+    Args:
+        dataset: A pandas DataFrame with the game_set columns.
+        dif: The difficulty level (easy, medium or hard).
+
+    Returns:
+        A boolean NumPy array.
+    """
+    if dif not in LEVELS:
+        raise ValueError(f"unknown difficulty '{dif}'")
+    return filter_mask(dataset, LEVELS[dif])
+
+
+def pool_path(dif, data_dir="."):
+    """
+    Returns the path of the pool file of a difficulty level.
+    """
+    return os.path.join(data_dir, f"pool_{dif}.parquet")
+
+
+def build_pools(game_set, data_dir="."):
+    """
+    Builds the pools of every difficulty level and saves them as Parquet files.
+
+    Args:
+        game_set: The game_set DataFrame.
+        data_dir: Folder where the pool files are written.
+
+    Returns:
+        The dictionary of the pools by difficulty level.
+    """
+    game_set = to_columnar(game_set[GAME_COLUMNS])
+    pools = {}
+    for dif in DIFFICULTIES:
+        pool = game_set[difficulty_mask(game_set, dif)].reset_index(drop=True)
+        for column in pool.select_dtypes("category"):
+            # a pool file only stores the names and titles of its own rows
+            pool[column] = pool[column].cat.remove_unused_categories()
+        pool.to_parquet(pool_path(dif, data_dir), index=False)
+        pools[dif] = pool
+    return pools
+
+
+def load_pool(dif, data_dir="."):
+    """
+    Loads the pool of a difficulty level.
+
+    When the pool file has not been built yet, the pool is computed from the game_set.
+
+    Args:
+        dif: The difficulty level (easy, medium or hard).
+        data_dir: Folder where the pool files are stored.
+
+    Returns:
+        The pool as a pandas DataFrame.
+    """
+    path = pool_path(dif, data_dir)
+    if os.path.exists(path):
+        return apply_schema(pd.read_parquet(path))
+    game_set = load_dataset("game_set", columns=GAME_COLUMNS, data_dir=data_dir)
+    return game_set[difficulty_mask(game_set, dif)].reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    build_pools(load_dataset("game_set", columns=GAME_COLUMNS))
@@ -0,0 +1,146 @@
+"""
+question_cache.py
+
+This module contains the cache of rendered questions used by the QuizEngine.
+
+A rendered question is the question string, its correct answer and its answer choices,
+stored under the key (difficulty, kind of question, row of the pool). The popular rows come
+back across games, so a question already rendered is served from the cache instead of
+formatting the question and drawing the incorrect answers again.
+
+The cache keeps at most 'max_size' questions in memory and evicts the least recently used
+one when it is full. With a spill file the evicted questions are written to disk (shelve)
+and brought back to memory when they are asked again. The spill file is emptied when the
+cache is created, since the rows it refers to change when the pools are rebuilt.
+"""
+
+import random  # type: ignore
+import shelve  # type: ignore
+from itertools import permutations  # type: ignore
+from collections import OrderedDict, namedtuple  # type: ignore
+
+DEFAULT_SIZE = 100_000  # questions kept in memory
+# every order of up to four choices, so that a cached question is shuffled with a single draw
+ORDERS = {n: list(permutations(range(n))) for n in range(5)}
+
+CachedQuestion = namedtuple("CachedQuestion", ["question", "correct_answer", "choices"])
+
+
+def shuffled(choices):
+    """
+    Returns the choices of a question in a new random order.
+    """
+    orders = ORDERS.get(len(choices))
+    if orders is None:
+        return random.sample(choices, len(choices))
+    order = orders[int(random.random() * len(orders))]
+    return [choices[i] for i in order]
+
+
+class QuestionCache:
+    """
+    A bounded LRU cache of rendered questions, with an optional spill file on disk.
+
+    Attributes:
+        max_size: Maximum number of questions kept in memory.
+        entries: The questions in memory, from the least to the most recently used.
+        spill: The shelve the evicted questions are written to, None without spill file.
+        hits: Number of questions found in memory.
+        spill_hits: Number of questions found in the spill file.
+        misses: Number of questions not found.
+        evictions: Number of questions evicted from memory.
+
+    Methods:
+        __init__(max_size, spill_path): Creates an empty cache.
+        get(key): Returns the question of a key, None if it is not cached.
+        put(key, entry): Adds a question to the cache.
+        stats(): Returns the counters of the cache.
+        close(): Closes the spill file.
+    """
+
+    def __init__(self, max_size=DEFAULT_SIZE, spill_path=None):
+        """
+        Creates an empty cache.
+
+        Args:
+            max_size: Maximum number of questions kept in memory.
+            spill_path: Path of the spill file, None keeps the cache in memory only.
+        """
+        if max_size <= 0:
+            raise ValueError("the size of the cache must be positive")
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.spill = shelve.open(spill_path, flag="n") if spill_path else None
+        self.hits = 0
+        self.spill_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """
+        Returns the question of a key and marks it as the most recently used.
+
+        Args:
+            key: The (difficulty, kind, row) of the question.
+
+        Returns:
+            The CachedQuestion, None if it is neither in memory nor in the spill file.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        if self.spill is not None:
+            entry = self.spill.get(repr(key))
+            if entry is not None:
+                self.spill_hits += 1
+                self.put(key, entry)  # back to memory
+                return entry
+        self.misses += 1
+        return None
+
+    def put(self, key, entry):
+        """
+        Adds a question to the cache, evicting the least recently used one when it is full.
+
+        Args:
+            key: The (difficulty, kind, row) of the question.
+            entry: The CachedQuestion.
+        """
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            old_key, old_entry = self.entries.popitem(last=False)
+            self.evictions += 1
+            if self.spill is not None:
+                self.spill[repr(old_key)] = old_entry
+
+    def stats(self):
+        """
+        Returns the counters of the cache.
+
+        Returns:
+            A dictionary with the hits, spill hits, misses, evictions, the number of
+            questions in memory and the hit rate.
+        """
+        lookups = self.hits + self.spill_hits + self.misses
+        return {
+            "hits": self.hits,
+            "spill_hits": self.spill_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+            "hit_rate": (self.hits + self.spill_hits) / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        """
+        Closes the spill file.
+        """
+        if self.spill is not None:
+            self.spill.close()
+            self.spill = None
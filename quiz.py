@@ -1,15 +1,18 @@
 """
 quiz.py
 
-This module contains the logic for a quiz application.
-It includes functions to ask questions, validate answers, calculate scores, 
-and display results to the user.
+This module contains the terminal interface of the quiz application.
+It asks questions, reads the answers of the user and displays scores and results,
+while the questions, the scoring and the state of the game are handled by the
+headless QuizEngine of engine.py.
+
+The engine (and so pandas) is imported when the game is created, or in the background when the
+game starts from a snapshot of the pools (see fast_start.py), so that the first prompt is shown
+before the engine is ready.
 """
 
-import time  # type: ignore
-import random  # type: ignore
-import pandas as pd  # type: ignore
 from termcolor import cprint  # type: ignore
+from fast_start import EngineLoader, snapshot_levels  # type: ignore
 
 
 class QuizGame:
@@ -17,103 +20,125 @@ class QuizGame:
     A class to represent a quiz game with various questions and scoring.
 
     Attributes:
+        engine: The QuizEngine running the game, None until it is ready when the game starts
+                from a snapshot.
+        loader: The EngineLoader building the engine of a snapshot, None without snapshot.
+        levels: The names of the levels that can be played.
         dataset: A pandas DataFrame containing movie and TV series data, with details like
-                 title, start_year, genre, etc.
+                 title, start_year, genre, etc. (the pool of the current difficulty level),
+                 None when the game plays on a snapshot.
+        dif: The difficulty level of the current game, None before it is chosen.
         score: Tracks the user's score throughout the game.
+        instrumentation: The Instrumentation timing the game, None when it is disabled.
+        player: The name of the player, recorded with the results of the games.
 
     Methods:
-        __init__(dataset): Initializes the quiz game with a given dataset.
-        difficulty(): Prompts the user to choose a difficulty level (easy, medium, or hard),
-                      and filters the dataset accordingly.
+        __init__(dataset, instrumentation, custom_filter, results, player, snapshot): Initializes the quiz game with a given dataset.
+        ready_engine(): Returns the engine, waiting for it when it is built in the background.
+        difficulty(): Prompts the user to choose a difficulty level (easy, medium, hard, or
+                      custom when a custom filter is given), and selects the pool of that level.
         first_question(): Generates the first question based on a random entry from the dataset.
         second_question(): Generates the second question based on a random entry from the dataset.
         third_question(): Generates the third question based on a random entry from the dataset.
         fourth_question(): Generates the fourth question based on a random entry from the dataset.
-        score_fun(my_answer, correct_answer, dif): Calculates and updates the score based on the user's answer.
-        gen_answers(correct_answer): Generates answer choices (including the correct one and 3 incorrect options).
-        ask_question(question, correct_answer, choices): Displays the question and choices, and gets the user's answer.
+        score_fun(result): Displays the outcome of an answer and returns the updated score.
+        gen_answers(correct_answer, kind): Generates answer choices (including the correct one and 3 incorrect options).
+        ask_question(question, choices): Displays the question and choices, and gets the user's answer.
         rounds(): Prompts the user for the number of rounds they want to play.
         quiz(): Main function to conduct the quiz game, handle rounds, and display results.
     """
 
-    def __init__(self, dataset):
+    def __init__(
+        self,
+        dataset=None,
+        instrumentation=None,
+        custom_filter=None,
+        results=None,
+        player="anonymous",
+        snapshot=None,
+    ):
         """
         Initializes the quiz game with the provided dataset.
 
         Args:
-            dataset: A pandas DataFrame containing the quiz dataset.
+            dataset: A pandas DataFrame containing the quiz dataset. When it is not given,
+                     the prebuilt pool of the chosen difficulty is loaded instead.
+            instrumentation: An Instrumentation recording the latency of the game methods
+                             (see instrumentation.py), None runs the game without it.
+            custom_filter: A QuizFilter (see category_index.py) offered as the 'custom' level,
+                           scored with the medium rules.
+            results: A ResultsStore (see results_store.py) the answers and the final scores are
+                     recorded in, None does not keep them.
+            player: The name of the player, recorded with the results.
+            snapshot: Folder of a snapshot of the pools (see shared_dataset.py) the game plays
+                      on, built in the background while the first prompts are shown.
         """
-        self.dataset = dataset  # store the dataset as a class attribute
+        self.loader = None
+        self.engine = None
+        if snapshot is not None:
+            self.loader = EngineLoader(snapshot, results)  # imports and attaches in a thread
+            self.levels = snapshot_levels(self.loader.path)
+        else:
+            from engine import QuizEngine  # type: ignore
+
+            # the engine handles questions and scoring, and records the results
+            self.engine = QuizEngine(dataset, results=results)
+            if custom_filter is not None:
+                self.engine.add_level("custom", custom_filter)
+            self.levels = list(self.engine.levels)
+        # dataset of the current game, typed by the engine
+        self.dataset = self.engine.game_set if self.engine is not None else None
+        self.dif = None  # difficulty of the current game
         self.score = 0  # initialize the score to 0
+        self.instrumentation = instrumentation
+        self.player = player
+        if instrumentation is not None:
+            instrumentation.attach(self)  # time the methods of this game only
+
+    def ready_engine(self):
+        """
+        Returns the engine of the game, waiting for it when it is built in the background.
+        """
+        if self.engine is None:
+            self.engine = self.loader.result()
+            if self.instrumentation is not None:
+                self.instrumentation.attach_engine(self.engine)
+        return self.engine
 
     def difficulty(self):
         """
-        Prompts the user to choose a difficulty level and filters the dataset accordingly.
+        Prompts the user to choose a difficulty level and selects the pool of that level.
 
-        The user selects between easy, medium, and hard difficulty.
-        The dataset is then filtered based on the selected difficulty level.
+        The user selects between easy, medium, and hard difficulty (or custom, when the game
+        has a custom filter).
+        The dataset of the game is then the pool of the selected difficulty level.
 
         Returns:
             The filtered dataset and the chosen difficulty level.
         """
+        levels = self.levels
+        choices = ", ".join(levels[:-1]) + " and " + levels[-1]
         while True:
             # ask the user to input a difficulty level (easy, medium, hard)
             dif = (
-                str(
-                    input(
-                        "🔸 Please choose the difficulty between easy, medium and hard: "
-                    )
-                )
+                str(input(f"🔸 Please choose the difficulty between {choices}: "))
                 .strip()
                 .lower()
             )
             # ensure a valid difficulty level is entered
-            if dif not in ["hard", "medium", "easy"]:  # validate the input
+            if dif not in levels:  # validate the input
                 print("🔸 Please insert a proper difficulty ")
+            elif self.ready_engine().row_store(dif).size == 0:
+                print(f"🔸 No question matches the {dif} level, please choose another one ")
             else:
-                # filter the dataset based on the chosen difficulty level
-                if dif == "hard":
-                    # filter for older movies(older than 1974)
-                    self.dataset = self.dataset[(self.dataset["start_year"] <= 1974)]
-                    print("🔸 Rules: +1 if you are correct, -1 otherwise")
-                elif dif == "medium":
-                    # filter for medium difficulty movies(1975-2004) and most popular professions
-                    self.dataset = self.dataset[
-                        (self.dataset["start_year"] >= 1975)
-                        & (self.dataset["start_year"] <= 2004)
-                        & (
-                            self.dataset["first_profession"].isin(
-                                ["actor", "actress", "writer", "producer", "director"]
-                            )
-                        )
-                    ]
-                    print("🔸 Rules: +1 if you are correct, -0.5 otherwise")
-                elif dif == "easy":
-                    # filter for recent movies(2005 and later) and most popular professions and genres
-                    self.dataset = self.dataset[
-                        (self.dataset["start_year"] >= 2005)
-                        & (
-                            self.dataset["first_profession"].isin(
-                                ["actor", "actress", "writer", "producer", "director"]
-                            )
-                        )
-                        & (
-                            ~self.dataset["genre_1"].isin(
-                                [
-                                    "Documentary",
-                                    "Talk-Show",
-                                    "Game-Show",
-                                    "Sci-Fi",
-                                    "News",
-                                    "History",
-                                    "Reality-TV",
-                                    "Short",
-                                    "Adult",
-                                ]
-                            )
-                        )
-                    ]
-                    print("🔸 Rules: +1 if you are correct, 0 otherwise")
+                from engine import RULES  # type: ignore
+
+                print(f"🔸 Rules: {RULES[self.engine.scoring[dif]]}")
+                self.dif = dif
+                if self.loader is not None:
+                    self.loader.prepare(dif)  # read the pool while the rounds are chosen
+                # questions of the chosen difficulty level (kept by the engine)
+                self.dataset = self.engine.pools.get(dif)
                 return self.dataset, dif  # return filtered dataset and difficulty
 
     def first_question(self):
@@ -125,22 +150,7 @@ class QuizGame:
         Returns:
             The question string and the correct answer (production year).
         """
-        self.dataset = self.dataset.reset_index(
-            drop=True
-        )  # reset the index of the dataset
-        indices = random.choice(self.dataset.index)  # select a random row
-        title = self.dataset["title"].iloc[indices]
-        name_surname = self.dataset["name_surname"].iloc[indices]
-        role = self.dataset["first_profession"].iloc[indices]
-        movie_type = self.dataset["type"].iloc[indices]
-        correct_answer = self.dataset["start_year"].iloc[
-            indices
-        ]  # correct answer: production year
-        question = f"In which year was the {movie_type} '{title}' of {name_surname} as a {role} component produced ?"
-        return (
-            question,
-            correct_answer,
-        )  # return the generated question and the correct answer
+        return self.engine.question(self.dif, "start_year")
 
     def second_question(self):
         """
@@ -151,21 +161,7 @@ class QuizGame:
         Returns:
             The question string and the correct answer (genre).
         """
-        self.dataset = self.dataset.reset_index(
-            drop=True
-        )  # reset the index of the dataset
-        indices = random.choice(self.dataset.index)  # select a random row
-        title = self.dataset["title"].iloc[indices]
-        name_surname = self.dataset["name_surname"].iloc[indices]
-        role = self.dataset["first_profession"].iloc[indices]
-        movie_type = self.dataset["type"].iloc[indices]
-        year = self.dataset["start_year"].iloc[indices]
-        correct_answer = self.dataset["genre_1"].iloc[indices]  # correct answer: genre
-        question = f"What genre is the {movie_type} '{title}' made in {year} of {name_surname} as a {role} component ?"
-        return (
-            question,
-            correct_answer,
-        )  # return the generated question and the correct answer
+        return self.engine.question(self.dif, "genre_1")
 
     def third_question(self):
         """
@@ -176,20 +172,7 @@ class QuizGame:
         Returns:
             The question string and the correct answer (movie title).
         """
-        self.dataset = self.dataset.reset_index(
-            drop=True
-        )  # reset the index of the dataset
-        indices = random.choice(self.dataset.index)  # select a random row
-        movie_type = self.dataset["type"].iloc[indices]
-        name_surname = self.dataset["name_surname"].iloc[indices]
-        role = self.dataset["first_profession"].iloc[indices]
-        year = self.dataset["start_year"].iloc[indices]
-        correct_answer = self.dataset["title"].iloc[indices]  # correct answer: title
-        question = f"What was the title of the {movie_type} made in {year} with {name_surname} as a {role} component ?"
-        return (
-            question,
-            correct_answer,
-        )  # return the generated question and the correct answer
+        return self.engine.question(self.dif, "title")
 
     def fourth_question(self):
         """
@@ -200,152 +183,66 @@ class QuizGame:
         Returns:
             The question string and the correct answer (person's name).
         """
-        self.dataset = self.dataset.reset_index(
-            drop=True
-        )  # reset the index of the dataset
-        indices = random.choice(self.dataset.index)  # select a random row
-        movie_type = self.dataset["type"].iloc[indices]
-        title = self.dataset["title"].iloc[indices]
-        role = self.dataset["first_profession"].iloc[indices]
-        year = self.dataset["start_year"].iloc[indices]
-        correct_answer = self.dataset["name_surname"].iloc[
-            indices
-        ]  # correct answer: name of the person
-        question = (
-            f"Who was the {role} of the {movie_type} named '{title}' made in {year} ?"
-        )
-        return (
-            question,
-            correct_answer,
-        )  # return the generated question and the correct answer
+        return self.engine.question(self.dif, "name_surname")
 
-    def score_fun(self, my_answer, correct_answer, dif):
+    def score_fun(self, result):
         """
-        Calculates and updates the score based on the user's answer.
+        Displays the outcome of an answer and returns the updated score.
 
-        The score is updated according to the correctness of the answer:
+        The score is updated by the engine according to the correctness of the answer:
         - For correct answers: +1 point.
         - For incorrect answers: a penalty based on the difficulty level.
 
         Args:
-            my_answer: The user's answer.
-            correct_answer: The correct answer to the question.
-            dif: The difficulty level of the quiz.
+            result: The AnswerResult returned by the engine.
 
         Returns:
             The updated score.
         """
+        self.score = result.score
         # if the answer is correct
-        if my_answer == correct_answer:
-            self.score += 1  # increase the score by 1
+        if result.correct:
             cprint(
-                f"✅ You are correct, '{correct_answer}' is the right answer", "green"
+                f"✅ You are correct, '{result.correct_answer}' is the right answer",
+                "green",
             )
-            print(f"Your current score is: {self.score}")
         else:
             cprint(
-                f"❌ Your answer was '{my_answer}' but the correct one is '{correct_answer}'",
+                f"❌ Your answer was '{result.chosen_answer}' but the correct one is '{result.correct_answer}'",
                 "red",
             )
-            # apply penalty based on difficulty level
-            if dif == "hard":
-                self.score -= 1  # penalize by 1 for incorrect answer on hard
-            elif dif == "medium":
-                self.score -= 0.5  # penalize by 0.5 for incorrect answer on medium
-
-            if self.score < 0:
-                self.score = 0  # ensure score doesn't go below 0
-            print(f"Your current score is: {self.score}")
+        print(f"Your current score is: {self.score}")
         return self.score
 
-    def gen_answers(self, correct_answer):
+    def gen_answers(self, correct_answer, kind):
         """
         Generates a list of answer choices including the correct answer and three incorrect answers.
 
-        The incorrect answers are randomly selected based on the correct answer's type (year, genre, title, etc.).
+        The incorrect answers are randomly selected based on the kind of answer (year, genre, title, etc.).
 
         Args:
             correct_answer: The correct answer for the question.
+            kind: The kind of answer: 'start_year', 'genre_1', 'title' or 'name_surname'.
 
         Returns:
             A list of four answer choices (one correct, three incorrect).
         """
-        if correct_answer in self.dataset["start_year"].values:
-            # if the correct answer is a year, generate incorrect answers by slightly modifying the correct year
-            incorrect_ans = [
-                # adding random noise for incorrect answers(subtract or add small values)
-                correct_answer - random.choice([1, 2, 3, 4, 5, 6, 7, 8, 9]),
-                correct_answer + random.choice([1, 2, 3, 4, 5, 6, 7, 8, 9]),
-                correct_answer - random.choice([10, 15, 20, 25, 30, 35, 40, 45, 50]),
-            ]
-            adjusted_incorrect_ans = []
-            for i in incorrect_ans:
-                # ensuring that the option years do not exceed the current year
-                while i >= time.localtime().tm_year:
-                    i -= 1
-                adjusted_incorrect_ans.append(i)
-            options = [correct_answer] + adjusted_incorrect_ans
-            random.shuffle(options)  # shuffle the choices to randomize thei order
-            return options
-
-        # if the correct answer is a genre, generate incorrect answers from other genres
-        if correct_answer in self.dataset["genre_1"].values:
-            incorrect_ans = random.sample(list(self.dataset["genre_1"].unique()), 3)
-            # ensure the correct answer is not among the incorrect answers
-            if correct_answer in incorrect_ans:
-                while correct_answer in incorrect_ans:
-                    incorrect_ans = random.sample(
-                        list(self.dataset["genre_1"].unique()), 3
-                    )
-            options = [correct_answer] + incorrect_ans
-            random.shuffle(options)  # shuffle the choices to randomize thei order
-            return options
-
-        # if the correct answer is a title, generate incorrect answers from other titles
-        if correct_answer in self.dataset["title"].values:
-            incorrect_ans = random.sample(list(self.dataset["title"].unique()), 3)
-            # ensure the correct answer is not among the incorrect answers
-            if correct_answer in incorrect_ans:
-                while correct_answer in incorrect_ans:
-                    incorrect_ans = random.sample(
-                        list(self.dataset["title"].unique()), 3
-                    )
-            options = [correct_answer] + incorrect_ans
-            random.shuffle(options)  # shuffle the choices to randomize thei order
-            return options
-
-        # if the correct answer is the name and surname, generate incorrect answers from other names and surnames
-        if correct_answer in self.dataset["name_surname"].values:
-            incorrect_ans = random.sample(
-                list(self.dataset["name_surname"].unique()), 3
-            )
-            # ensure the correct answer is not among the incorrect answers
-            if correct_answer in incorrect_ans:
-                while correct_answer in incorrect_ans:
-                    incorrect_ans = random.sample(
-                        list(self.dataset["name_surname"].unique()), 3
-                    )
-            options = [correct_answer] + incorrect_ans
-            random.shuffle(options)  # shuffle the choices to randomize thei order
-            return options
-
-    def ask_question(self, question, correct_answer, choices):
+        return self.engine.choices(self.dif, correct_answer, kind)
+
+    def ask_question(self, question, choices):
         """
         Displays the question, answer choices, and prompts the user for an answer.
 
         Args:
             question: The question to be asked.
                 - A string that represents the question to display.
-            correct_answer: The correct answer to the question.
-                - The correct answer is compared to the user's input.
             choices: A list of answer choices.
                 - A list of possible answers to the question, including the correct answer.
 
         Returns:
-            - The user's selected answer (chosen_answer).
-            - The correct answer (correct_answer).
+            The user's selected answer (chosen_answer).
         """
-        letters = ["A", "B", "C", "D"]
+        letters = ["A", "B", "C", "D"][: len(choices)]
         print(question)
         # display each choice with a corresponding letter (A, B, C, D)
         for j, choice in zip(letters, choices):
@@ -361,7 +258,7 @@ class QuizGame:
         # find the index of the selected answer
         chosen_index = letters.index(my_answer)
         chosen_answer = choices[chosen_index]
-        return chosen_answer, correct_answer
+        return chosen_answer
 
     def rounds(self):
         """Prompts the user for the number of rounds they wish to play.
@@ -396,21 +293,18 @@ class QuizGame:
             # select difficulty and prepare dataset
             self.dataset, dif = self.difficulty()
             # get the number of rounds the user wants to play
-            n_round = self.rounds()
+            while True:
+                n_round = self.rounds()
+                try:
+                    # start the game and the clock
+                    session = self.engine.start_game(dif, n_round, self.player)
+                    break
+                except ValueError as error:
+                    print(f"🔸 {error}")  # more rounds than titles to ask about
             cprint(
                 f"👉 You are going to play for {n_round} rounds at {dif} level",
                 attrs=["bold"],
             )
-            start_time = time.time()  # record start time for the quiz
-
-            # shuffle question functions to randomize the types of questions asked
-            question_funcs = [
-                self.first_question,
-                self.second_question,
-                self.third_question,
-                self.fourth_question,
-            ]
-            random.shuffle(question_funcs)
 
             # iterate over the number of rounds and ask questions
             for round_number in range(n_round):
@@ -419,30 +313,26 @@ class QuizGame:
                     attrs=["bold"],
                 )
                 cprint(f"Round {round_number + 1}", attrs=["bold"])
-                question_func = question_funcs[round_number % len(question_funcs)]
-                question, correct_answer = (
-                    question_func()
-                )  # get question and correct answer
-                choices = self.gen_answers(correct_answer)  # generate answer choices
-                chosen_answer, correct_answer = self.ask_question(
-                    question, correct_answer, choices
+                question = self.engine.next_question(session)  # get the next question
+                chosen_answer = self.ask_question(
+                    question.question, question.choices
                 )  # ask the user for an answer
-                self.score = self.score_fun(
-                    chosen_answer, correct_answer, dif
-                )  # update score
-            end_time = time.time()  # Rrcord end time for the quiz
-            time_involved = end_time - start_time  # calculate time spent
+                result = self.engine.submit_answer(session, chosen_answer)
+                self.score = self.score_fun(result)  # display the updated score
+            summary = self.engine.finish(session)
             cprint(
                 "*----------------------------------------------------------------------------------------------------*",
                 attrs=["bold"],
             )
-            print(f"⌛ It took you {time_involved:.2f} seconds to solve the quiz")
+            print(
+                f"⌛ It took you {summary.time_involved:.2f} seconds to solve the quiz"
+            )
             # provide feedback based on performance
-            if self.score / n_round > 0.6 and time_involved / n_round < 10:
+            if summary.medal == "gold":
                 print(
                     f"🥇 Good job! Your final score is {self.score}/{n_round} and you were preatty fast!"
                 )
-            elif self.score / n_round > 0.6 and time_involved / n_round > 10:
+            elif summary.medal == "silver":
                 print(
                     f"🥈 Good job! Your final score is {self.score}/{n_round}. Try again to complete the quiz faster!"
                 )
@@ -466,7 +356,6 @@ class QuizGame:
                 break
             if play_again == "yes":
                 self.score = 0  # reset score
-                self.dataset = pd.read_csv("./game_set.csv")  # reload dataset
                 cprint(
                     "*----------------------------------------------------------------------------------------------------*",
                     attrs=["bold"],
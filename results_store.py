@@ -0,0 +1,399 @@
+"""
+results_store.py
+
+This module contains the store the results of the games are kept in, a local SQLite database.
+
+Two tables hold the results:
+- games: one row per finished game, with the player, the difficulty, the final score, the
+  number of rounds, the time spent, the medal and the time the game ended.
+- answers: one row per answered question, with the kind of question, whether the answer was
+  correct, the chosen and the correct answers and the score after the answer.
+The leaderboard queries are answered from indexes: (difficulty, score, time_involved) for the
+best games of a difficulty and (player, finished_at) for the history of a player, so they read
+a few pages whatever the number of games.
+
+The results are written asynchronously: record_answer() and record_game() only put the row
+in a queue and return, and a writer thread inserts the rows of the queue in batches, one
+transaction per batch (every 'batch_size' rows, or 'flush_interval' seconds after the first
+row of a batch). The database is in WAL mode, so the leaderboard can be read while the
+writer inserts, and with synchronous=NORMAL a commit does not wait for the disk (a power
+failure may lose the last batches, a crash of the game does not).
+A batch that cannot be written (e.g. the database stays locked, or the disk is full) is
+logged and dropped, and the writer goes on with the next batches; the error is raised again
+by the next flush() or close(). When a game id is already taken, the rows of the batch are
+inserted one by one so that only the rows of that game are dropped: the rows are never
+replaced.
+
+Running this file prints the leaderboard of a difficulty or the history of a player:
+    python results_store.py --top easy
+    python results_store.py --player alice
+"""
+
+import os  # type: ignore
+import time  # type: ignore
+import queue  # type: ignore
+import sqlite3  # type: ignore
+import logging  # type: ignore
+import argparse  # type: ignore
+import itertools  # type: ignore
+import threading  # type: ignore
+from collections import namedtuple  # type: ignore
+
+RESULTS_PATH = "results.db"
+BATCH_SIZE = 1000  # rows inserted per transaction at most
+FLUSH_INTERVAL = 0.5  # seconds a row waits in the queue at most
+# epoch of the game ids (2024-01-01 UTC, in ms): 41 bits of milliseconds since then last until
+# 2093, the ids stay in the signed 64-bit range of an SQLite INTEGER
+ID_EPOCH_MS = 1_704_067_200_000
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    game_id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    score REAL NOT NULL,
+    n_round INTEGER NOT NULL,
+    time_involved REAL NOT NULL,
+    medal TEXT NOT NULL,
+    finished_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS answers (
+    game_id INTEGER NOT NULL,
+    round_number INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    correct INTEGER NOT NULL,
+    chosen_answer TEXT,
+    correct_answer TEXT,
+    score REAL NOT NULL,
+    PRIMARY KEY (game_id, round_number)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS games_leaderboard ON games (difficulty, score DESC, time_involved);
+CREATE INDEX IF NOT EXISTS games_player ON games (player, finished_at DESC);
+"""
+INSERT_GAME = "INSERT INTO games VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+INSERT_ANSWER = "INSERT INTO answers VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+logger = logging.getLogger("results_store")
+
+GameResult = namedtuple(
+    "GameResult",
+    [
+        "game_id",
+        "player",
+        "difficulty",
+        "score",
+        "n_round",
+        "time_involved",
+        "medal",
+        "finished_at",
+    ],
+)
+AnswerRecord = namedtuple(
+    "AnswerRecord",
+    ["game_id", "round_number", "kind", "correct", "chosen_answer", "correct_answer", "score"],
+)
+
+
+def connect(path):
+    """
+    Opens the results database, in WAL mode, and creates its tables if they do not exist.
+
+    Args:
+        path: Path of the database file.
+
+    Returns:
+        The sqlite3 Connection.
+    """
+    connection = sqlite3.connect(path, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def as_text(value):
+    """
+    Converts an answer (a string, or a NumPy scalar such as a year) to the text it is stored as.
+    """
+    return None if value is None else str(value)
+
+
+class ResultsStore:
+    """
+    The results of the games, written in batches by a background thread.
+
+    Attributes:
+        path: Path of the database file.
+        batch_size: Maximum number of rows inserted per transaction.
+        flush_interval: Maximum number of seconds a row waits before being inserted.
+        queue: The rows waiting to be inserted, with the flush and close requests.
+        connection: The connection the leaderboard is read with.
+        writer: The thread inserting the rows.
+        n_written: Number of rows inserted so far.
+        n_dropped: Number of rows that could not be inserted.
+        error: The last error of the writer not raised yet by flush() or close(), None if none.
+        process_bits: Random bits of the game ids of this store, told apart from the ids of the
+                      other processes writing to the database.
+        counter: Number of game ids given so far.
+
+    Methods:
+        __init__(path, batch_size, flush_interval): Opens the store and starts the writer.
+        new_game_id(): Returns a new game id.
+        record_answer(game_id, round_number, kind, correct, chosen, correct_answer, score):
+            Queues an answered question.
+        record_game(game_id, player, summary): Queues the summary of a finished game.
+        write_batch(connection, batch): Inserts a batch of rows, in one transaction.
+        flush(): Waits until every queued row is inserted, raises the last error of the writer.
+        raise_error(): Raises the last error of the writer, once.
+        close(): Inserts the queued rows and stops the writer, raises the last error of the writer.
+        top(difficulty, n): Returns the best games of a difficulty.
+        history(player, n): Returns the last games of a player.
+        answers(game_id): Returns the answers of a game.
+    """
+
+    def __init__(self, path=RESULTS_PATH, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        """
+        Opens the store, creating the database if needed, and starts the writer thread.
+
+        Args:
+            path: Path of the database file.
+            batch_size: Maximum number of rows inserted per transaction.
+            flush_interval: Maximum number of seconds a row waits before being inserted.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.SimpleQueue()
+        self.connection = connect(path)
+        self.n_written = 0
+        self.n_dropped = 0
+        self.error = None
+        self.process_bits = int.from_bytes(os.urandom(2), "little") & 0x3FF
+        self.counter = itertools.count()
+        self.writer = threading.Thread(target=self.write_rows, name="results-writer", daemon=True)
+        self.writer.start()
+
+    def new_game_id(self):
+        """
+        Returns a new 63-bit game id, without asking the database for it: the milliseconds
+        since ID_EPOCH_MS, the random bits of the store (so that the processes writing to the same
+        database, e.g. the workers of server.py, give different ids) and a counter.
+        The ids increase with time, so the rows of the new games are appended at the end of
+        the tables instead of being inserted at random places of their B-trees.
+        """
+        milliseconds = time.time_ns() // 1_000_000 - ID_EPOCH_MS
+        return (milliseconds << 22) | (self.process_bits << 12) | (next(self.counter) & 0xFFF)
+
+    def record_answer(self, game_id, round_number, kind, correct, chosen, correct_answer, score):
+        """
+        Queues an answered question, without waiting for it to be written.
+
+        Args:
+            game_id: The id of the game (new_game_id()).
+            round_number: Number of the question in the game, from 1.
+            kind: The kind of answer the question asked for.
+            correct: Whether the answer is correct.
+            chosen: The chosen answer.
+            correct_answer: The correct answer.
+            score: The score after the answer.
+        """
+        record = AnswerRecord(
+            game_id,
+            round_number,
+            kind,
+            int(correct),
+            as_text(chosen),
+            as_text(correct_answer),
+            float(score),
+        )
+        self.queue.put((INSERT_ANSWER, record))
+
+    def record_game(self, game_id, player, summary):
+        """
+        Queues the summary of a finished game, without waiting for it to be written.
+
+        Args:
+            game_id: The id of the game (new_game_id()).
+            player: The name of the player.
+            summary: The GameSummary returned by the engine.
+        """
+        result = GameResult(
+            game_id,
+            player,
+            summary.difficulty,
+            float(summary.score),
+            summary.n_round,
+            summary.time_involved,
+            summary.medal,
+            time.time(),
+        )
+        self.queue.put((INSERT_GAME, result))
+
+    def write_rows(self):
+        """
+        Inserts the queued rows in batches until the store is closed (run by the writer thread).
+        """
+        connection = connect(self.path)
+        closed = False
+        while not closed:
+            batch = {INSERT_GAME: [], INSERT_ANSWER: []}
+            events = []
+            n_rows = 0
+            item = self.queue.get()  # wait for the first row of the batch
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                statement, row = item
+                if statement is None:  # a flush (an Event) or close (None) request
+                    if row is None:
+                        closed = True
+                    else:
+                        events.append(row)
+                    break
+                batch[statement].append(row)
+                n_rows += 1
+                if n_rows >= self.batch_size:
+                    break
+                try:
+                    item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+            try:
+                if n_rows:
+                    self.write_batch(connection, batch)
+            except Exception as error:  # the writer must survive, e.g. a locked database
+                logger.error("%d results could not be written: %s", n_rows, error)
+                self.n_dropped += n_rows
+                self.error = error
+            finally:
+                for event in events:
+                    event.set()  # the flush requests never wait for a failed batch
+        connection.close()
+
+    def write_batch(self, connection, batch):
+        """
+        Inserts a batch of rows in one transaction. When a row breaks a key (a game id already
+        taken), the rows are inserted one by one instead and the rows breaking a key are dropped.
+
+        Args:
+            connection: The connection of the writer thread.
+            batch: The lists of rows to insert, by INSERT statement.
+        """
+        try:
+            with connection:  # one transaction per batch
+                for statement, rows in batch.items():
+                    if rows:
+                        connection.executemany(statement, rows)
+            self.n_written += sum(len(rows) for rows in batch.values())
+            return
+        except sqlite3.IntegrityError:
+            pass  # rolled back, the other rows are inserted below
+        for statement, rows in batch.items():
+            for row in rows:
+                try:
+                    with connection:
+                        connection.execute(statement, row)
+                    self.n_written += 1
+                except sqlite3.IntegrityError as error:
+                    logger.error("result of game %d not written: %s", row[0], error)
+                    self.n_dropped += 1
+                    self.error = error
+
+    def flush(self):
+        """
+        Waits until every row queued so far is written, e.g. before reading the leaderboard.
+        """
+        if self.writer.is_alive():
+            done = threading.Event()
+            self.queue.put((None, done))
+            done.wait()
+        self.raise_error()
+
+    def raise_error(self):
+        """
+        Raises the last error of the writer, once.
+        """
+        error, self.error = self.error, None
+        if error is not None:
+            raise error
+
+    def close(self):
+        """
+        Writes the queued rows, stops the writer thread and closes the database.
+        """
+        if self.writer.is_alive():
+            self.queue.put((None, None))
+            self.writer.join()
+        self.connection.close()
+        self.raise_error()
+
+    def top(self, difficulty, n=10):
+        """
+        Returns the best games of a difficulty level, by score then by time spent.
+
+        Args:
+            difficulty: The difficulty level (or custom level).
+            n: Number of games.
+
+        Returns:
+            A list of GameResult.
+        """
+        rows = self.connection.execute(
+            "SELECT * FROM games WHERE difficulty = ? ORDER BY score DESC, time_involved LIMIT ?",
+            (difficulty, n),
+        )
+        return [GameResult(*row) for row in rows]
+
+    def history(self, player, n=10):
+        """
+        Returns the last games of a player, from the most recent one.
+
+        Args:
+            player: The name of the player.
+            n: Number of games.
+
+        Returns:
+            A list of GameResult.
+        """
+        rows = self.connection.execute(
+            "SELECT * FROM games WHERE player = ? ORDER BY finished_at DESC LIMIT ?",
+            (player, n),
+        )
+        return [GameResult(*row) for row in rows]
+
+    def answers(self, game_id):
+        """
+        Returns the answers of a game, in the order of the questions.
+        """
+        rows = self.connection.execute(
+            "SELECT * FROM answers WHERE game_id = ? ORDER BY round_number", (game_id,)
+        )
+        return [AnswerRecord(*row) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the leaderboard of the quiz game")
+    parser.add_argument("--results", default=RESULTS_PATH, help="the results database")
+    parser.add_argument("--top", help="difficulty level whose best games are shown")
+    parser.add_argument("--player", help="player whose last games are shown")
+    parser.add_argument("-n", type=int, default=10, help="number of games")
+    args = parser.parse_args()
+
+    store = ResultsStore(args.results)
+    try:
+        if args.top:
+            games = store.top(args.top, args.n)
+        elif args.player:
+            games = store.history(args.player, args.n)
+        else:
+            parser.error("use --top <difficulty> or --player <name>")
+        for rank, game in enumerate(games, 1):
+            finished = time.strftime("%Y-%m-%d %H:%M", time.localtime(game.finished_at))
+            print(
+                f"{rank:>3}. {game.player:<20} {game.difficulty:<8} {game.score:g}/{game.n_round}"
+                f"  {game.time_involved:7.1f} s  {game.medal:<7} {finished}"
+            )
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+row_store.py
+
+This module contains the compact row store the quiz questions are generated from.
+
+The store keeps one NumPy array per column used by the questions, built once per pool:
+categorical columns are kept as their integer codes plus the array of categories,
+the other columns as plain arrays. Generating a question then costs one random integer
+and a few array reads, instead of copying and indexing the pandas DataFrame.
+"""
+
+import random  # type: ignore
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+
+# columns read by the questions
+QUESTION_COLUMNS = ["title", "name_surname", "first_profession", "type", "start_year", "genre_1"]
+
+
+class RowStore:
+    """
+    A read-only, column oriented copy of the question columns of a dataset.
+
+    Attributes:
+        size: Number of rows.
+        codes: Integer codes of the categorical columns, by column name.
+        values: Values of every column by column name (the categories for categorical columns).
+
+    Methods:
+        __init__(dataset): Builds the store from a pandas DataFrame.
+        from_arrays(size, codes, values): Builds the store from existing arrays.
+        random_row(): Returns the position of a random row.
+        get(column, row): Returns the value of a column at a given row.
+    """
+
+    __slots__ = ("size", "codes", "values")
+
+    def __init__(self, dataset):
+        """
+        Builds the store from the question columns of a dataset.
+
+        Args:
+            dataset: A pandas DataFrame with the columns in QUESTION_COLUMNS.
+        """
+        self.size = len(dataset)
+        self.codes = {}
+        self.values = {}
+        for column in QUESTION_COLUMNS:
+            series = dataset[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                self.codes[column] = series.cat.codes.to_numpy()
+                # missing values have code -1, which reads the NaN appended at the end
+                self.values[column] = np.append(
+                    series.cat.categories.to_numpy(dtype=object), np.nan
+                )
+            else:
+                self.values[column] = series.to_numpy()
+
+    @classmethod
+    def from_arrays(cls, size, codes, values):
+        """
+        Builds a store on top of existing arrays, without copying them
+        (e.g. arrays memory-mapped from a shared snapshot, see shared_dataset.py).
+
+        Args:
+            size: Number of rows.
+            codes: Integer codes of the categorical columns, by column name.
+            values: Values of every column by column name (the categories for categorical columns).
+
+        Returns:
+            The RowStore.
+        """
+        store = cls.__new__(cls)
+        store.size = size
+        store.codes = codes
+        store.values = values
+        return store
+
+    def random_row(self):
+        """
+        Returns the position of a random row.
+        """
+        return random.randrange(self.size)
+
+    def get(self, column, row):
+        """
+        Returns the value of a column at a given row.
+
+        Args:
+            column: Name of the column.
+            row: Position of the row.
+
+        Returns:
+            The value stored in the column at that row.
+        """
+        codes = self.codes.get(column)
+        if codes is None:
+            return self.values[column][row]
+        return self.values[column][codes[row]]
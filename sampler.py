@@ -0,0 +1,198 @@
+"""
+sampler.py
+
+This module contains the sampler the rows of the questions are drawn with.
+
+A RowSampler is built once per pool, from its row store:
+- the rows are drawn with a weight given by a weighting ('uniform', 'popularity' or
+  'recency'). The weighted draws use an alias table (Walker/Vose), built in O(n), so every
+  draw costs one random position and one coin flip whatever the size of the pool.
+- every row has a key, the title it asks about, so that a game never asks twice about the
+  same title: the keys already drawn by a game are kept in a small set owned by its session,
+  and a draw falling on one of them is drawn again (a few times at most, as long as the game
+  has used a small part of the pool). After MAX_REDRAWS draws, the row is drawn uniformly
+  among the titles the game has not seen.
+
+Weightings:
+- uniform: every row is equally likely, as before.
+- popularity: a row weighs the number of people linked to its title in the pool, so the
+  titles everybody knows come up more often.
+- recency: a row weighs its number of years since the oldest title of the pool plus one.
+"""
+
+import random  # type: ignore
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+
+WEIGHTINGS = ["uniform", "popularity", "recency"]
+MAX_REDRAWS = 64  # weighted draws of a game before drawing among the unseen keys
+SEQUENTIAL_ROWS = 4096  # small rows left when the alias table is finished row by row
+
+
+def alias_table(weights):
+    """
+    Builds the alias table of a discrete distribution (Vose's method, in vectorized batches).
+
+    Row i is drawn by picking a position j uniformly, then keeping j with probability
+    prob[j] and taking alias[j] otherwise.
+
+    Args:
+        weights: Non-negative weights of the rows, with a positive sum.
+
+    Returns:
+        The prob (float64) and alias (int64) NumPy arrays.
+    """
+    n = len(weights)
+    scaled = np.asarray(weights, dtype=np.float64) * (n / np.sum(weights))
+    prob = np.ones(n)
+    alias = np.arange(n)
+    small = np.flatnonzero(scaled < 1)
+    large = np.flatnonzero(scaled > 1)  # the rows at exactly 1 are done
+    while len(small) > SEQUENTIAL_ROWS and len(large):
+        # the deficits of the small rows are filled by the surplus of the large rows in order:
+        # a small row takes its alias from the large row whose surplus covers its start
+        deficits = 1 - scaled[small]
+        starts = np.cumsum(deficits) - deficits
+        surplus = scaled[large] - 1
+        owner = np.searchsorted(np.cumsum(surplus), starts, side="right")
+        filled = owner < len(large)
+        if not filled.any():
+            break  # the surplus left is zero: the deficits left are rounding errors
+        prob[small[filled]] = scaled[small[filled]]
+        alias[small[filled]] = large[owner[filled]]
+        used = np.bincount(owner[filled], weights=deficits[filled], minlength=len(large))
+        scaled[large] = 1 + surplus - used
+        # a large row which gave more than its surplus becomes small, one which gave all of
+        # it is done
+        now_small = scaled[large] < 1
+        small = np.concatenate([small[~filled], large[now_small]])
+        large = large[scaled[large] > 1]
+    # the last rows (often a chain of large rows filling each other) one at a time
+    small = small.tolist()
+    large = large.tolist()
+    while small and large:
+        less, more = small.pop(), large[-1]
+        prob[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1 - scaled[less]
+        if scaled[more] < 1:
+            small.append(large.pop())
+        elif scaled[more] == 1:
+            large.pop()
+    prob[small] = 1  # rounding leftovers
+    prob[large] = 1
+    return prob, alias
+
+
+def row_weights(store, weighting):
+    """
+    Computes the weight of every row of a row store.
+
+    Args:
+        store: The RowStore of a pool.
+        weighting: One of WEIGHTINGS.
+
+    Returns:
+        A NumPy array of weights, None for uniform draws.
+    """
+    if weighting == "uniform":
+        return None
+    if weighting == "popularity":
+        keys = title_keys(store)
+        return np.bincount(keys)[keys].astype(np.float64)
+    if weighting == "recency":
+        years = np.asarray(store.values["start_year"], dtype=np.float64)
+        return years - years.min() + 1
+    raise ValueError(f"unknown weighting '{weighting}'")
+
+
+def title_keys(store):
+    """
+    Returns the key of the title of every row: the same integer for the rows of a title.
+    """
+    codes = store.codes.get("title")
+    if codes is not None:
+        return codes  # not copied, e.g. memory-mapped from a shared snapshot
+    return pd.factorize(store.values["title"])[0].astype(np.int64)
+
+
+class RowSampler:
+    """
+    Weighted draws of the rows of a pool, without repeating a title within a game.
+
+    Attributes:
+        size: Number of rows.
+        prob: Probability of keeping a drawn position (alias table), None for uniform draws.
+        alias: Row taken instead of a drawn position (alias table), None for uniform draws.
+        keys: Title key of every row.
+        n_titles: Number of distinct titles, the most rounds a game can play.
+
+    Methods:
+        __init__(store, weighting): Builds the sampler of a row store.
+        draw(seen): Draws a row, whose title is not in 'seen'.
+        draw_unseen(seen, row): Draws a row among the titles not in 'seen', uniformly.
+    """
+
+    __slots__ = ("size", "prob", "alias", "keys", "n_titles")
+
+    def __init__(self, store, weighting="uniform"):
+        """
+        Builds the sampler of a row store.
+
+        Args:
+            store: The RowStore of a pool.
+            weighting: One of WEIGHTINGS.
+        """
+        self.size = store.size
+        self.prob = None
+        self.alias = None
+        self.keys = title_keys(store)
+        self.n_titles = len(np.unique(self.keys))
+        weights = row_weights(store, weighting)
+        if weights is not None and self.size:
+            self.prob, self.alias = alias_table(weights)
+
+    def draw(self, seen=None):
+        """
+        Draws a row.
+
+        Args:
+            seen: The set of the title keys already drawn by a game, updated with the key of
+                  the drawn row. None draws with repeats.
+
+        Returns:
+            The position of the row.
+        """
+        for _ in range(MAX_REDRAWS):
+            row = int(random.random() * self.size)  # faster than random.randrange
+            if self.prob is not None and random.random() >= self.prob[row]:
+                row = int(self.alias[row])
+            if seen is None:
+                return row
+            key = int(self.keys[row])
+            if key not in seen:
+                seen.add(key)
+                return row
+        return self.draw_unseen(seen, row)
+
+    def draw_unseen(self, seen, row):
+        """
+        Draws a row among the titles a game has not seen, uniformly, once the weighted draws
+        keep falling on seen titles (the game has seen most titles of the pool).
+
+        Args:
+            seen: The set of the title keys already drawn by the game, updated with the key of
+                  the drawn row.
+            row: The last row drawn, returned when the game has seen every title.
+
+        Returns:
+            The position of the row.
+        """
+        unseen = np.flatnonzero(~np.isin(self.keys, np.fromiter(seen, np.int64, len(seen))))
+        if len(unseen) == 0:
+            return row  # every title was asked, start_game does not allow it
+        keys = np.unique(self.keys[unseen])
+        key = int(keys[int(random.random() * len(keys))])
+        rows = unseen[self.keys[unseen] == key]
+        seen.add(key)
+        return int(rows[int(random.random() * len(rows))])
@@ -0,0 +1,98 @@
+"""
+schema.py
+
+This module declares the in-memory types of the columns of the datasets built by
+dataset_merge.py, so that every loader gets the same compact representation:
+- the low-cardinality columns ('type', the professions, the genres and 'region') are
+  categoricals: one small integer code per row plus the list of categories.
+- the high-cardinality text columns repeated across rows ('name_surname', 'title' and
+  'movie_id') are interned: stored as categoricals too, every distinct string is held once
+  and the rows only keep a code.
+- the numeric columns use the smallest integer type that holds their values
+  ('adult' is 0 or 1, years fit in 16 bits), a nullable integer type when values are missing.
+Parquet saves the categoricals with dictionary encoding and keeps the integer types, so
+a dataset read back from its Parquet file already has the schema.
+"""
+
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+
+# low-cardinality columns stored as categoricals (dictionary encoded in Parquet)
+CATEGORY_COLUMNS = [
+    "type",
+    "first_profession",
+    "second_profession",
+    "third_profession",
+    "genre_1",
+    "genre_2",
+    "genre_3",
+    "region",
+]
+# text columns repeated across rows, interned as categoricals
+INTERNED_COLUMNS = ["name_surname", "title", "movie_id"]
+# integer columns and their types
+INTEGER_COLUMNS = {
+    "birth": np.int16,
+    "adult": np.int8,
+    "start_year": np.int16,
+    "minutes_runtimes": np.int32,  # a few titles last more than 32767 minutes
+}
+NULLABLE_INTEGERS = {np.int8: "Int8", np.int16: "Int16", np.int32: "Int32"}
+
+
+def csv_dtypes(columns=None):
+    """
+    Returns the dtypes pd.read_csv can parse the text columns with, so that the categoricals
+    are built while reading instead of after (the integer columns are converted afterwards,
+    since they may have missing values).
+
+    Args:
+        columns: Columns that are read, None for all of them.
+
+    Returns:
+        A dictionary of dtypes by column name.
+    """
+    names = CATEGORY_COLUMNS + INTERNED_COLUMNS
+    return {column: "category" for column in names if columns is None or column in columns}
+
+
+def integer_column(series, dtype):
+    """
+    Converts a column to an integer type, the nullable version of it when values are missing.
+
+    Args:
+        series: A pandas Series of numbers or numeric strings.
+        dtype: The numpy integer type.
+
+    Returns:
+        The converted Series.
+    """
+    if str(series.dtype) in (np.dtype(dtype).name, NULLABLE_INTEGERS[dtype]):
+        return series
+    series = pd.to_numeric(series, errors="coerce")
+    if series.isna().any():
+        return series.astype(NULLABLE_INTEGERS[dtype])
+    return series.astype(dtype)
+
+
+def apply_schema(frame):
+    """
+    Converts the columns of a dataset to the types of the schema.
+
+    The columns that already have their type are not copied, and the columns
+    the schema does not know are left as they are.
+
+    Args:
+        frame: A pandas DataFrame (merge_set, game_set, region_set, region_counts or a pool).
+
+    Returns:
+        A DataFrame with the columns of the schema converted.
+    """
+    frame = frame.copy(deep=False)
+    for column, dtype in INTEGER_COLUMNS.items():
+        if column in frame:
+            frame[column] = integer_column(frame[column], dtype)
+    for column in CATEGORY_COLUMNS + INTERNED_COLUMNS:
+        if column in frame and not isinstance(frame[column].dtype, pd.CategoricalDtype):
+            frame[column] = frame[column].astype("category")
+    return frame
@@ -0,0 +1,229 @@
+"""
+server.py
+
+This module serves the quiz game to many concurrent players over a line based protocol,
+on TCP or on a Unix socket, using asyncio.
+
+A single QuizEngine, with its read-only pools, row stores and distractor indexes,
+is shared by every connection. Each connection only owns a small GameSession
+(difficulty, rounds, score and pending question), so thousands of games can run at once.
+
+Protocol: the client sends one command per line, the server answers every command
+with one JSON object per line.
+    START <difficulty> <rounds> [player]  starts a game   -> {"difficulty", "n_round", "rules"}
+    NEXT                          asks the next question  -> {"number", "question", "choices", "kind"}
+    ANSWER <A|B|C|D>              answers the question    -> {"correct", "chosen_answer", "correct_answer", "score", "finished"}
+    FINISH                        ends the game           -> {"score", "n_round", "difficulty", "time_involved", "medal"}
+    QUIT                          closes the connection
+Errors are answered with {"error": <message>}. A game is started once per connection at a
+time: START is refused until the running game is finished, and FINISH until its last round
+has been answered.
+
+Running this file starts the server:
+    python server.py --port 8765
+    python server.py --unix /tmp/quiz.sock
+    python server.py --port 8765 --shared snapshot --workers 4
+    python server.py --port 8765 --question-cache 100000 --question-spill questions.db
+    python server.py --port 8765 --weighting popularity
+With --shared the pools are attached from a snapshot written by shared_dataset.py instead of
+being loaded, and with --workers the server runs in several processes sharing the port
+(SO_REUSEPORT) and the memory-mapped snapshot. With --question-cache the rendered questions
+are kept in an LRU cache (see question_cache.py), optionally spilled to --question-spill.
+With --weighting the rows of the questions are drawn by popularity or recency (see sampler.py).
+With --results the answers and the summaries of the games are recorded in a SQLite database,
+written in the background by every process (see results_store.py):
+    python server.py --port 8765 --results results.db
+"""
+
+import os  # type: ignore
+import json  # type: ignore
+import asyncio  # type: ignore
+import argparse  # type: ignore
+from engine import RULES, QuizEngine  # type: ignore
+from pools import DIFFICULTIES  # type: ignore
+from shared_dataset import attach_engine  # type: ignore
+from question_cache import QuestionCache  # type: ignore
+from sampler import WEIGHTINGS  # type: ignore
+from results_store import ResultsStore  # type: ignore
+
+LETTERS = ["A", "B", "C", "D"]
+
+
+def to_json(value):
+    """
+    Converts the NumPy scalars found in answers (e.g. years) to plain Python values.
+    """
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class QuizServer:
+    """
+    An asyncio server running independent quiz games on a shared QuizEngine.
+
+    Attributes:
+        engine: The QuizEngine shared by every connection.
+        n_sessions: Number of connections currently open.
+
+    Methods:
+        __init__(engine): Initializes the server.
+        handle_command(session, line): Runs a command and returns the new session and the answer.
+        handle_client(reader, writer): Serves a single connection.
+        serve(host, port, unix_path, reuse_port): Starts serving connections.
+    """
+
+    def __init__(self, engine):
+        """
+        Initializes the server and prepares the pools of every difficulty level.
+
+        Args:
+            engine: The QuizEngine shared by every connection.
+        """
+        self.engine = engine
+        self.n_sessions = 0
+        for dif in DIFFICULTIES:
+            self.engine.distractor_index(dif)  # load every pool once, before serving
+
+    def handle_command(self, session, line):
+        """
+        Runs a command of the protocol.
+
+        Args:
+            session: The GameSession of the connection, None before the first START.
+            line: The command line sent by the client.
+
+        Returns:
+            The (possibly new) session and the answer to send back.
+        """
+        command, *args = line.split() or [""]
+        command = command.upper()
+        try:
+            if command == "START":
+                if session is not None:
+                    # the answers of the running game would be lost
+                    return session, {"error": "a game is running, play it and send FINISH"}
+                dif, n_round = args[0].lower(), int(args[1])
+                player = args[2] if len(args) > 2 else "anonymous"
+                session = self.engine.start_game(dif, n_round, player)
+                rules = RULES[self.engine.scoring[dif]]  # a custom level uses the rules of a level
+                return session, {"difficulty": dif, "n_round": n_round, "rules": rules}
+            if session is None:
+                return session, {"error": "no game started, send START <difficulty> <rounds>"}
+            if command == "NEXT":
+                return session, self.engine.next_question(session)._asdict()
+            if command == "ANSWER":
+                if session.choices is None:
+                    return session, {"error": "there is no question to answer"}
+                letter = args[0].upper()
+                if letter not in LETTERS[: len(session.choices)]:
+                    return session, {"error": "answer with A, B, C or D"}
+                answer = session.choices[LETTERS.index(letter)]
+                return session, self.engine.submit_answer(session, answer)._asdict()
+            if command == "FINISH":
+                return None, self.engine.finish(session)._asdict()
+        except (IndexError, ValueError) as error:
+            return session, {"error": str(error) or "invalid arguments"}
+        return session, {"error": f"unknown command '{command}'"}
+
+    async def handle_client(self, reader, writer):
+        """
+        Serves a single connection until the client sends QUIT or disconnects.
+
+        Args:
+            reader: The asyncio StreamReader of the connection.
+            writer: The asyncio StreamWriter of the connection.
+        """
+        self.n_sessions += 1
+        session = None
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    # a line longer than the limit of the reader, which drops it
+                    answer = {"error": "line too long"}
+                    writer.write((json.dumps(answer) + "\n").encode())
+                    await writer.drain()
+                    continue
+                if not line:
+                    break
+                # bytes that are not utf-8 are replaced, the command is then answered with an error
+                line = line.decode(errors="replace").strip()
+                if line.upper() == "QUIT":
+                    break
+                session, answer = self.handle_command(session, line)
+                writer.write((json.dumps(answer, default=to_json) + "\n").encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.n_sessions -= 1
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765, unix_path=None, reuse_port=False):
+        """
+        Starts serving connections, forever.
+
+        Args:
+            host: Address to listen on (TCP).
+            port: Port to listen on (TCP).
+            unix_path: Path of the Unix socket, used instead of TCP when given.
+            reuse_port: Whether other processes can listen on the same port (TCP).
+        """
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_client, path=unix_path)
+        else:
+            server = await asyncio.start_server(
+                self.handle_client, host, port, reuse_port=reuse_port or None
+            )
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the quiz game to many players")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="path of a Unix socket to listen on instead of TCP")
+    parser.add_argument("--data-dir", default=".", help="folder with the question pools")
+    parser.add_argument("--shared", help="snapshot of the pools written by shared_dataset.py")
+    parser.add_argument("--workers", type=int, default=1, help="number of server processes (TCP)")
+    parser.add_argument(
+        "--question-cache", type=int, help="rendered questions kept in memory (LRU cache)"
+    )
+    parser.add_argument(
+        "--question-spill", help="file the questions evicted from the cache are written to"
+    )
+    parser.add_argument(
+        "--weighting", choices=WEIGHTINGS, default="uniform", help="weights of the questions"
+    )
+    parser.add_argument("--results", help="SQLite database the results are recorded in")
+    args = parser.parse_args()
+
+    if args.shared:
+        engine = attach_engine(args.shared, weighting=args.weighting)
+    else:
+        engine = QuizEngine(data_dir=args.data_dir, weighting=args.weighting)
+    server = QuizServer(engine)
+    reuse_port = args.workers > 1 and not args.unix
+    if reuse_port:
+        for _ in range(args.workers - 1):
+            if os.fork() == 0:  # the workers share the pages of the parent pools
+                break
+    if args.question_cache:
+        spill_path = args.question_spill
+        if spill_path and reuse_port:
+            spill_path = f"{spill_path}.{os.getpid()}"  # one spill file per process
+        engine.question_cache = QuestionCache(args.question_cache, spill_path)
+    if args.results:
+        engine.results = ResultsStore(args.results)  # a writer thread in every process
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix, reuse_port))
+    finally:
+        if engine.results is not None:
+            engine.results.close()  # write the results still queued
+
+
+if __name__ == "__main__":
+    main()
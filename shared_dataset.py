@@ -0,0 +1,226 @@
+"""
+shared_dataset.py
+
+This module publishes the question pools once, as a snapshot of memory-mapped arrays,
+so that many worker processes can attach to it without copying the data.
+
+Every column used by the questions is stored per pool:
+- 'start_year' as a small integer array.
+- the text columns ('title', 'name_surname', 'type', 'first_profession', 'genre_1')
+  dictionary encoded: an int32 array of codes (-1 for missing values) plus the dictionary
+  of unique strings, stored as utf-8 bytes and their offsets.
+Workers open the arrays with np.load(..., mmap_mode="r"): the pages are shared through the
+operating system page cache, so N workers use about one copy of the dataset plus a small
+per-worker overhead, and the dictionaries double as the distractor index.
+
+The snapshot is never rewritten in place, since its files are mapped by the running workers:
+publish() writes every version in a new folder next to it ('<path>.version-<random>') and
+then points the path, a symbolic link, to the new version at once. The workers attached to
+the previous version keep reading its files; the previous version is kept until the next
+publication and the older ones are deleted.
+
+Running this file publishes the snapshot from the prebuilt pools:
+    python shared_dataset.py --output snapshot
+"""
+
+import os  # type: ignore
+import json  # type: ignore
+import time  # type: ignore
+import shutil  # type: ignore
+import argparse  # type: ignore
+import tempfile  # type: ignore
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+from pools import DIFFICULTIES, load_pool  # type: ignore
+from row_store import QUESTION_COLUMNS, RowStore  # type: ignore
+from distractors import DistractorIndex  # type: ignore
+from engine import QuizEngine  # type: ignore
+
+INTEGER_COLUMNS = ["start_year"]
+VERSION_MARK = ".version-"  # folders of the versions of a snapshot: '<path>.version-<random>'
+
+
+class StringTable:
+    """
+    A read-only array of strings stored as utf-8 bytes plus offsets.
+
+    Indexing with an integer returns a str (NaN for -1, the code of missing values),
+    indexing with an array of integers returns an object array of the same shape.
+
+    Attributes:
+        offsets: Array of n + 1 offsets, string i is data[offsets[i]:offsets[i + 1]].
+        data: Array of utf-8 bytes.
+    """
+
+    __slots__ = ("offsets", "data")
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        return (self.decode(i) for i in range(len(self)))
+
+    def decode(self, i):
+        """
+        Returns the string at position i, NaN for a missing value (-1).
+        """
+        if i < 0:
+            return np.nan
+        return self.data[self.offsets[i] : self.offsets[i + 1]].tobytes().decode()
+
+    def __getitem__(self, index):
+        if isinstance(index, np.ndarray):
+            result = np.empty(index.shape, dtype=object)
+            for position, i in np.ndenumerate(index):
+                result[position] = self.decode(i)
+            return result
+        return self.decode(index)
+
+
+def encode_strings(values):
+    """
+    Encodes strings as utf-8 bytes plus offsets.
+
+    Args:
+        values: A sequence of strings.
+
+    Returns:
+        The offsets (int64) and data (uint8) arrays.
+    """
+    encoded = [str(value).encode() for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def write_snapshot(pools, path):
+    """
+    Writes the question columns of the pools in a new folder.
+
+    Args:
+        pools: Dictionary of pool DataFrames by difficulty level.
+        path: Folder of the snapshot.
+    """
+    meta = {}
+    for dif, pool in pools.items():
+        folder = os.path.join(path, dif)
+        os.makedirs(folder, exist_ok=True)
+        for column in QUESTION_COLUMNS:
+            series = pool[column]
+            if column in INTEGER_COLUMNS:
+                np.save(os.path.join(folder, f"{column}.npy"), series.to_numpy(np.int32))
+                continue
+            codes, uniques = pd.factorize(series)  # missing values get the code -1
+            offsets, data = encode_strings(uniques)
+            np.save(os.path.join(folder, f"{column}.codes.npy"), codes.astype(np.int32))
+            np.save(os.path.join(folder, f"{column}.offsets.npy"), offsets)
+            np.save(os.path.join(folder, f"{column}.data.npy"), data)
+        meta[dif] = {"size": len(pool)}
+    with open(os.path.join(path, "meta.json"), "w") as meta_file:
+        json.dump(meta, meta_file)
+
+
+def publish(pools, path):
+    """
+    Publishes a new version of the snapshot of the question columns of the pools.
+
+    The version is written in a new folder, then the path (a symbolic link to the current
+    version) is replaced by a link to it in one step, so that attach() always finds a whole
+    version and the workers attached to the previous one keep their files.
+    A snapshot published as a plain folder by an older version of this module is moved
+    aside first.
+
+    Args:
+        pools: Dictionary of pool DataFrames by difficulty level.
+        path: Path of the snapshot.
+    """
+    path = os.path.abspath(path)
+    parent, name = os.path.split(path)
+    os.makedirs(parent, exist_ok=True)
+    version = tempfile.mkdtemp(prefix=name + VERSION_MARK, dir=parent)
+    os.chmod(version, 0o755)  # readable by the workers of other users, like a plain folder
+    write_snapshot(pools, version)
+    previous = None
+    if os.path.islink(path):
+        previous = os.path.realpath(path)
+    elif os.path.isdir(path):
+        previous = f"{path}{VERSION_MARK}{time.time_ns()}"
+        os.rename(path, previous)
+    link = f"{version}.link"
+    os.symlink(os.path.basename(version), link)
+    os.replace(link, path)  # atomic: the path is the previous version or the new one
+    for entry in os.listdir(parent):
+        folder = os.path.join(parent, entry)
+        if not entry.startswith(name + VERSION_MARK) or folder in (version, previous):
+            continue
+        if os.path.isdir(folder) and not os.path.islink(folder):
+            shutil.rmtree(folder, ignore_errors=True)  # older versions, or an aborted one
+
+
+def attach(path):
+    """
+    Attaches to a snapshot without copying it.
+
+    Args:
+        path: Folder of the snapshot.
+
+    Returns:
+        Dictionaries of RowStore and DistractorIndex by difficulty level, backed by
+        memory-mapped arrays.
+    """
+    path = os.path.realpath(path)  # every file from the same version
+    with open(os.path.join(path, "meta.json")) as meta_file:
+        meta = json.load(meta_file)
+    stores = {}
+    indexes = {}
+    for dif, info in meta.items():
+        folder = os.path.join(path, dif)
+
+        def load(name):
+            return np.load(os.path.join(folder, f"{name}.npy"), mmap_mode="r")
+
+        codes = {}
+        values = {}
+        for column in QUESTION_COLUMNS:
+            if column in INTEGER_COLUMNS:
+                values[column] = load(column)
+            else:
+                codes[column] = load(f"{column}.codes")
+                values[column] = StringTable(load(f"{column}.offsets"), load(f"{column}.data"))
+        stores[dif] = RowStore.from_arrays(info["size"], codes, values)
+        # every entry of a dictionary appears in its pool: the dictionaries are the distractors
+        indexes[dif] = DistractorIndex(stores[dif], values)
+    return stores, indexes
+
+
+def attach_engine(path, question_cache=None, weighting="uniform"):
+    """
+    Returns a QuizEngine playing on a snapshot, without copying it.
+
+    Args:
+        path: Folder of the snapshot.
+        question_cache: A QuestionCache for the engine, None disables the cache.
+        weighting: How the rows of the questions are weighted (see sampler.py).
+
+    Returns:
+        The QuizEngine.
+    """
+    engine = QuizEngine(question_cache=question_cache, weighting=weighting)
+    engine.stores, engine.indexes = attach(path)
+    return engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish the question pools as a shared snapshot")
+    parser.add_argument("--data-dir", default=".", help="folder with the question pools")
+    parser.add_argument("--output", default="snapshot", help="folder of the snapshot")
+    args = parser.parse_args()
+    publish({dif: load_pool(dif, args.data_dir) for dif in DIFFICULTIES}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+stats_cache.py
+
+This module computes the aggregates shown by descriptive_analysis.ipynb once and keeps them
+in a small JSON file ('stats_cache.json'), so the notebook and any report render from it
+instead of recomputing them over the whole game_set.
+
+The cache holds the counts of every category (type, professions, genres, adult, regions),
+the summary statistics of the numeric columns for the whole game_set, the movies and the
+tv series, and the histograms and boxplot statistics drawn by the notebook.
+It is keyed by a hash of the files it was computed from (game_set.csv and
+region_counts.csv): dataset_merge.py rebuilds it after every build and load_stats rebuilds
+it only when those files changed.
+
+Running this file prints a report of the cached statistics:
+    python stats_cache.py
+"""
+
+import os  # type: ignore
+import json  # type: ignore
+import hashlib  # type: ignore
+import argparse  # type: ignore
+import numpy as np  # type: ignore
+from dataset_io import load_dataset, to_columnar  # type: ignore
+from counting import as_dict, count_by, frequency_table  # type: ignore
+
+STATS_FILE = "stats_cache.json"
+SOURCES = ["game_set", "region_counts"]  # datasets the statistics are computed from
+TYPES = ["movie", "tv series"]
+ACTORS = ["actor", "actress"]
+HISTOGRAM_BINS = 50  # as in the histograms of the notebook
+RUNTIME_QUANTILE = 0.99  # the runtime plots only keep the movies shorter than this quantile
+
+
+def source_paths(data_dir="."):
+    """
+    Returns the paths of the csv files the statistics are computed from.
+    """
+    return [os.path.join(data_dir, f"{name}.csv") for name in SOURCES]
+
+
+def file_stamps(paths):
+    """
+    Returns the size and modification time of every file, to detect changes without hashing.
+    """
+    stamps = {}
+    for path in paths:
+        stat = os.stat(path)
+        stamps[os.path.basename(path)] = [stat.st_size, stat.st_mtime_ns]
+    return stamps
+
+
+def dataset_hash(paths):
+    """
+    Computes a hash of the content of some files.
+
+    Args:
+        paths: Paths of the files.
+
+    Returns:
+        The hexadecimal BLAKE2 digest of the files, in order.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        with open(path, "rb") as source:
+            for block in iter(lambda: source.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def counts(frame, column, where=None):
+    """
+    Counts the occurrences of every value of a column, missing values excluded.
+
+    Returns:
+        A dictionary {value: count} sorted by decreasing count.
+    """
+    table = frequency_table(frame, column, where)
+    return {str(value): int(count) for value, count in as_dict(table).items()}
+
+
+def counts_by_region(region_counts, where=None):
+    """
+    Sums the frequencies of the region_counts by region.
+
+    Returns:
+        A dictionary {region: frequency} sorted by decreasing frequency.
+    """
+    table = count_by(region_counts, ["region"], where, weights="frequency")
+    return {str(value): int(count) for value, count in as_dict(table).items()}
+
+
+def describe(values):
+    """
+    Returns the count, minimum, maximum, mean and sum of a numeric Series.
+    """
+    return {
+        "count": int(values.count()),
+        "min": values.min().item(),
+        "max": values.max().item(),
+        "mean": float(values.mean()),
+        "sum": values.sum().item(),
+    }
+
+
+def histogram(values, bins=HISTOGRAM_BINS):
+    """
+    Computes a histogram with equal-width bins, as plt.hist does.
+
+    Returns:
+        A dictionary with the bin 'edges' and the 'counts' of every bin.
+    """
+    bin_counts, edges = np.histogram(values.dropna(), bins=bins)
+    return {"edges": edges.tolist(), "counts": bin_counts.tolist()}
+
+
+def box_stats(values, whis=1.5):
+    """
+    Computes the statistics of a boxplot, as plt.boxplot does.
+
+    Args:
+        values: A numeric Series.
+        whis: Length of the whiskers as a multiple of the interquartile range.
+
+    Returns:
+        A dictionary accepted by plt.bxp. The outliers are kept once per distinct value,
+        which draws the same markers with far fewer points.
+    """
+    values = values.dropna().to_numpy()
+    q1, med, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    low = values[values >= q1 - whis * iqr]
+    high = values[values <= q3 + whis * iqr]
+    whislo = low.min() if len(low) else values.min()
+    whishi = high.max() if len(high) else values.max()
+    fliers = np.unique(values[(values < whislo) | (values > whishi)])
+    return {
+        "med": float(med),
+        "q1": float(q1),
+        "q3": float(q3),
+        "whislo": whislo.item(),
+        "whishi": whishi.item(),
+        "mean": float(values.mean()),
+        "fliers": fliers.tolist(),
+    }
+
+
+def compute_stats(game_set, region_counts):
+    """
+    Computes every statistic shown by the notebook.
+
+    Args:
+        game_set: The game_set DataFrame.
+        region_counts: The region_counts DataFrame.
+
+    Returns:
+        A dictionary of JSON-serializable statistics.
+    """
+    game_set = to_columnar(game_set)
+    subsets = {"all": game_set}
+    for kind in TYPES:
+        subsets[kind] = game_set.loc[game_set["type"] == kind]
+    actors = game_set.loc[game_set["first_profession"].isin(ACTORS)]
+
+    movie_runtimes = subsets["movie"]["minutes_runtimes"]
+    quantile = float(movie_runtimes.quantile(RUNTIME_QUANTILE))
+    short_runtimes = movie_runtimes[movie_runtimes < quantile]
+    longest = game_set.loc[game_set["minutes_runtimes"] == game_set["minutes_runtimes"].max()]
+
+    regions = {"all": counts_by_region(region_counts)}
+    for kind in TYPES:
+        regions[kind] = counts_by_region(region_counts, {"type": kind})
+
+    return {
+        "rows": len(game_set),
+        "counts": {
+            "type": counts(game_set, "type"),
+            "first_profession": counts(game_set, "first_profession"),
+            "second_profession": counts(game_set, "second_profession"),
+            "adult": counts(game_set, "adult"),
+            "genre_1": {kind: counts(game_set, "genre_1", {"type": kind}) for kind in TYPES},
+        },
+        "regions": regions,
+        "summary": {
+            kind: {
+                "start_year": describe(subset["start_year"]),
+                "minutes_runtimes": describe(subset["minutes_runtimes"]),
+            }
+            for kind, subset in subsets.items()
+        },
+        "actors": {"birth": describe(actors["birth"])},
+        "longest": json.loads(longest.to_json(orient="records")),
+        "movie_runtime_quantile": quantile,
+        "histograms": {
+            "movie_minutes_runtimes": histogram(short_runtimes),
+            "start_year": histogram(game_set["start_year"]),
+            "movie_start_year": histogram(subsets["movie"]["start_year"]),
+            "tv_series_start_year": histogram(subsets["tv series"]["start_year"]),
+        },
+        "boxplots": {
+            "movie_minutes_runtimes": box_stats(short_runtimes),
+            "start_year": box_stats(game_set["start_year"]),
+        },
+    }
+
+
+def save_stats(stats, key, stamps, data_dir="."):
+    """
+    Writes the statistics with the hash and the stamps of their source files.
+    """
+    path = os.path.join(data_dir, STATS_FILE)
+    with open(path + ".tmp", "w") as cache:
+        json.dump({"key": key, "stamps": stamps, "stats": stats}, cache)
+    os.replace(path + ".tmp", path)
+
+
+def build_stats_cache(data_dir=".", game_set=None, region_counts=None):
+    """
+    Computes the statistics of the datasets saved in a folder and writes the cache.
+
+    Args:
+        data_dir: Folder of the datasets and of the cache.
+        game_set: The game_set DataFrame if already in memory, loaded from data_dir otherwise.
+        region_counts: The region_counts DataFrame if already in memory.
+
+    Returns:
+        The statistics.
+    """
+    if game_set is None:
+        game_set = load_dataset("game_set", data_dir=data_dir)
+    if region_counts is None:
+        region_counts = load_dataset("region_counts", data_dir=data_dir)
+    paths = source_paths(data_dir)
+    stats = compute_stats(game_set, region_counts)
+    save_stats(stats, dataset_hash(paths), file_stamps(paths), data_dir)
+    return stats
+
+
+def load_stats(data_dir="."):
+    """
+    Returns the cached statistics, rebuilding the cache only if the datasets changed.
+
+    The datasets are only hashed when their size or modification time differ from the
+    ones recorded in the cache.
+
+    Args:
+        data_dir: Folder of the datasets and of the cache.
+
+    Returns:
+        The statistics.
+    """
+    path = os.path.join(data_dir, STATS_FILE)
+    paths = source_paths(data_dir)
+    if os.path.exists(path):
+        with open(path) as cache:
+            cached = json.load(cache)
+        stamps = file_stamps(paths)
+        if cached["stamps"] == stamps:
+            return cached["stats"]
+        if cached["key"] == dataset_hash(paths):  # files touched but not changed
+            save_stats(cached["stats"], cached["key"], stamps, data_dir)
+            return cached["stats"]
+    return build_stats_cache(data_dir)
+
+
+def report(stats):
+    """
+    Formats the main statistics as text.
+    """
+    lines = [f"game_set rows: {stats['rows']}"]
+    for kind, summary in stats["summary"].items():
+        years = summary["start_year"]
+        runtimes = summary["minutes_runtimes"]
+        lines.append(
+            f"{kind}: {years['count']} rows, start year {years['min']}-{years['max']}, "
+            f"mean runtime {round(runtimes['mean'])} min, total {runtimes['sum']} min"
+        )
+    lines.append(f"mean year of birth of actors: {round(stats['actors']['birth']['mean'])}")
+    for name in ["type", "first_profession", "second_profession", "adult"]:
+        top = list(stats["counts"][name].items())[:5]
+        lines.append(f"{name}: " + ", ".join(f"{value} {count}" for value, count in top))
+    for kind in TYPES:
+        top = list(stats["counts"]["genre_1"][kind].items())[:5]
+        lines.append(f"{kind} genres: " + ", ".join(f"{value} {count}" for value, count in top))
+    top = sorted(stats["regions"]["all"].items(), key=lambda item: item[1], reverse=True)[:5]
+    lines.append("regions: " + ", ".join(f"{value} {count}" for value, count in top))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the cached statistics of the datasets")
+    parser.add_argument("--data-dir", default=".", help="folder of the datasets")
+    args = parser.parse_args()
+    print(report(load_stats(args.data_dir)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+world_map.py
+
+This module draws the maps of descriptive_analysis.ipynb: choropleths of the number of
+titles released in every country.
+
+The Natural Earth shapefile ('map/ne_110m_admin_0_countries.shp') is read once: only the
+ISO2 code of every country ('ISO_A2_EH') and its geometry are kept, projected to the
+requested coordinate reference system (optionally simplified), with the country borders
+precomputed, and saved next to the shapefile as a GeoParquet file. The following loads read
+that file, and the map stays in memory for the next renders, so a render only joins the
+counts to the countries and plots them.
+
+GeoPandas and Matplotlib are only imported when a map is loaded or drawn.
+"""
+
+import os  # type: ignore
+import pandas as pd  # type: ignore
+
+MAP_PATH = os.path.join("map", "ne_110m_admin_0_countries.shp")
+ISO_COLUMN = "ISO_A2_EH"  # ISO2 code of the country, as in the 'region' column of the datasets
+DEFAULT_CRS = "EPSG:4326"  # longitude and latitude, as in the notebook
+REGION_COLUMNS = ["country", "region"]  # names of the ISO2 column in the region count tables
+
+# maps already loaded, by (path, crs, tolerance)
+WORLDS = {}
+
+
+def cache_path(path=MAP_PATH, crs=DEFAULT_CRS, tolerance=None):
+    """
+    Returns the path of the GeoParquet file caching a projection of the map.
+    """
+    suffix = crs.lower().replace(":", "_")
+    if tolerance:
+        suffix += f"_simplified_{tolerance:g}"
+    return f"{os.path.splitext(path)[0]}.{suffix}.parquet"
+
+
+def read_world(path=MAP_PATH, crs=DEFAULT_CRS, tolerance=None):
+    """
+    Reads the countries of the shapefile and prepares them for the maps.
+
+    Args:
+        path: Path of the Natural Earth shapefile.
+        crs: Coordinate reference system the geometries are projected to.
+        tolerance: Tolerance (in units of the crs) of the simplification of the borders,
+            None keeps them as they are.
+
+    Returns:
+        A GeoDataFrame indexed by ISO2 code, with the 'geometry' and the 'boundary'
+        of every country.
+    """
+    import geopandas as gpd  # type: ignore
+
+    world = gpd.read_file(path)[[ISO_COLUMN, "geometry"]].to_crs(crs)
+    if tolerance:
+        world["geometry"] = world.simplify(tolerance, preserve_topology=True)
+    world["boundary"] = world.boundary  # borders drawn on top of the countries
+    return world.set_index(ISO_COLUMN)
+
+
+def load_world(path=MAP_PATH, crs=DEFAULT_CRS, tolerance=None):
+    """
+    Loads the countries of the world map, from memory or from the GeoParquet cache.
+
+    The cache is written on the first load and rebuilt when the shapefile is newer.
+
+    Args:
+        path: Path of the Natural Earth shapefile.
+        crs: Coordinate reference system of the map.
+        tolerance: Tolerance of the simplification of the borders, None keeps them as they are.
+
+    Returns:
+        A GeoDataFrame indexed by ISO2 code, with the 'geometry' and the 'boundary'
+        of every country.
+    """
+    key = (path, crs, tolerance)
+    if key not in WORLDS:
+        import geopandas as gpd  # type: ignore
+
+        cache = cache_path(path, crs, tolerance)
+        if os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(path):
+            WORLDS[key] = gpd.read_parquet(cache)
+        else:
+            world = read_world(path, crs, tolerance)
+            world.to_parquet(cache + ".tmp")
+            os.replace(cache + ".tmp", cache)
+            WORLDS[key] = world
+    return WORLDS[key]
+
+
+def region_series(counts, column="frequency"):
+    """
+    Turns a table of counts by region into a Series indexed by ISO2 code.
+
+    Args:
+        counts: A dictionary {region: count}, a Series indexed by region or a DataFrame with a
+            'country' or 'region' column (rows of the same region are summed, so a
+            region_counts table with every type gives the total of every region).
+        column: Name of the column of the counts.
+
+    Returns:
+        A pandas Series named 'column'.
+    """
+    if isinstance(counts, dict):
+        return pd.Series(counts, name=column, dtype="float64")
+    if isinstance(counts, pd.Series):
+        return counts.rename(column)
+    key = next(name for name in REGION_COLUMNS if name in counts)
+    return counts.groupby(key)[column].sum()
+
+
+def choropleth(
+    counts,
+    title,
+    column="frequency",
+    ax=None,
+    cmap="summer",
+    path=MAP_PATH,
+    crs=DEFAULT_CRS,
+    tolerance=None,
+):
+    """
+    Draws the countries of the world colored by a count.
+
+    Countries without a count are drawn in white.
+
+    Args:
+        counts: The counts by region (see region_series), e.g. the region_counts of the movies.
+        title: Title of the map.
+        column: Name of the column of the counts.
+        ax: The Matplotlib axes to draw on, None creates a new figure.
+        cmap: Matplotlib colormap.
+        path: Path of the Natural Earth shapefile.
+        crs: Coordinate reference system of the map.
+        tolerance: Tolerance of the simplification of the borders.
+
+    Returns:
+        The Matplotlib axes.
+    """
+    from matplotlib import pyplot as plt  # type: ignore
+
+    world = load_world(path, crs, tolerance)
+    # how='left' keeps every country of the map, even without a count
+    merged = world.join(region_series(counts, column), how="left")
+    if ax is None:
+        _, ax = plt.subplots(1, 1, figsize=(18, 12))
+
+    merged["boundary"].plot(ax=ax, linewidth=1, color="black")  # borders of the countries
+    merged.plot(
+        column=column,
+        ax=ax,
+        legend=True,
+        legend_kwds={"label": column, "orientation": "horizontal"},
+        cmap=cmap,
+        edgecolor="black",
+        missing_kwds={"color": "white"},
+    )
+    ax.set_title(title, fontsize=18)
+    ax.set_xlabel("longitude")
+    ax.set_ylabel("latitude")
+    return ax